@@ -0,0 +1,552 @@
+import argparse
+import contextlib
+import importlib.util
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import pandas as pd
+
+from invoice_export import InvoiceExporter
+from ocr_engines import OCR_ENGINES
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Paper sizes in millimetres (width, height), portrait
+PAPER_SIZES_MM = {
+    "A4": (210, 297),
+    "A3": (297, 420),
+}
+
+# Manufacturing table layout rendered on synthetic invoices, with relative
+# column widths matching the Excel export
+TABLE_HEADERS = ["SI No.", "Part No", "Description of Goods", "HSN/SAC",
+                 "Quantity", "Rate", "per", "Disc. %", "Amount"]
+TABLE_COLUMN_WIDTHS = [5, 25, 30, 10, 10, 10, 5, 10, 15]
+
+# test.py invocations checked by --startup, with their wall-time budgets in
+# seconds; "-o <temporary directory>" is appended to each
+STARTUP_COMMANDS = {
+    "help": (["--help"], 0.2),
+    "export_only": (["--export-only"], 0.5),
+    "json_input": (["--input", "sample_invoice.json"], 0.5),
+}
+# Modules the fast-start CLI paths must not import
+HEAVY_MODULES = ["cv2", "pandas", "pytesseract", "pdf2image", "tkinter"]
+
+
+class StubOCREngine:
+    """
+    OCR engine that returns canned text without running tesseract, so the
+    benchmark measures the OpenCV and Python work around OCR
+    """
+
+    name = "stub"
+    # Calls across all instances, for counting OCR invocations per stage
+    calls = 0
+    LINE = "LC-{0:04d} Laser cut bracket {1} 125.00 {2:.2f}"
+
+    def __init__(self, lang: str = "eng"):
+        self.lang = lang
+
+    def image_to_string(self, image: np.ndarray, config: str = "") -> str:
+        StubOCREngine.calls += 1
+        # Roughly one item line per 60 pixels of height, like a real table
+        lines = max(1, image.shape[0] // 60)
+        return "\n".join(self.LINE.format(i, i % 50 + 1, (i % 50 + 1) * 125.0) for i in range(lines))
+
+    def image_to_data(self, image: np.ndarray, config: str = "") -> Dict[str, List[Any]]:
+        StubOCREngine.calls += 1
+        return {key: [] for key in ("level", "block_num", "par_num", "line_num", "word_num",
+                                    "left", "top", "width", "height", "conf", "text")}
+
+    def close(self):
+        pass
+
+
+def make_items(rows: int, rng: np.random.Generator) -> List[Dict[str, Any]]:
+    """Random laser-cutting line items like the default template data"""
+    items = []
+    for i in range(rows):
+        quantity = int(rng.integers(1, 200))
+        rate = round(float(rng.uniform(5, 500)), 2)
+        discount = int(rng.choice([0, 5, 10]))
+        items.append({
+            "partNo": f"LC-MIT-EA{int(rng.integers(100, 999))}B{i:03d}",
+            "description": f"Laser Cutting {['MS', 'SS', 'AL'][i % 3]} {int(rng.integers(1, 12))}mm",
+            "hsn": "998898",
+            "quantity": f"{quantity} Nos.",
+            "rate": f"{rate:.2f}",
+            "per": "Nos.",
+            "discountPercentage": str(discount) if discount else "",
+            "amount": f"{quantity * rate * (1 - discount / 100):.2f}",
+        })
+    return items
+
+
+def _fit_text(text: str, width: int, scale: float, thickness: int) -> str:
+    """Truncate text so it fits within width pixels"""
+    while text and cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)[0][0] > width:
+        text = text[:-1]
+    return text
+
+
+def render_invoice(paper: str = "A4", dpi: int = 200, rows: int = 20, noise: float = 0.0,
+                   skew: float = 0.0, seed: int = 0) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Render a synthetic laser-cutting invoice
+
+    Args:
+        paper: Key of PAPER_SIZES_MM
+        dpi: Rendering resolution
+        rows: Number of line items
+        noise: Standard deviation of additive Gaussian noise (0-255 scale)
+        skew: Rotation in degrees
+        seed: Random seed for the item values
+
+    Returns:
+        Tuple of (BGR page image, invoice data rendered on it)
+    """
+    rng = np.random.default_rng(seed)
+    width_mm, height_mm = PAPER_SIZES_MM[paper]
+    width, height = int(width_mm / 25.4 * dpi), int(height_mm / 25.4 * dpi)
+    page = np.full((height, width, 3), 255, np.uint8)
+
+    margin = int(0.5 * dpi)
+    thickness = max(1, dpi // 100)
+    black = (0, 0, 0)
+
+    invoice = {
+        "invoiceNumber": f"INV-{seed:06d}",
+        "date": "2024-03-31",
+        "stateName": "Karnataka, Code : 29",
+        "termsOfDelivery": "As per terms",
+        "items": make_items(rows, rng),
+    }
+
+    # Header block
+    header_scale = dpi / 100
+    y = margin + int(0.4 * dpi)
+    cv2.putText(page, "TAX INVOICE", (margin, y), cv2.FONT_HERSHEY_SIMPLEX, header_scale, black, thickness * 2)
+    for text in (f"Invoice No: {invoice['invoiceNumber']}", f"Dated: {invoice['date']}",
+                 f"State Name: {invoice['stateName']}"):
+        y += int(0.3 * dpi)
+        cv2.putText(page, text, (margin, y), cv2.FONT_HERSHEY_SIMPLEX, header_scale / 2, black, thickness)
+
+    # Table: header row plus item rows, shrunk to fit the page if needed
+    top = y + int(0.4 * dpi)
+    table_width = width - 2 * margin
+    row_height = min(int(0.3 * dpi), (height - margin - top) // (rows + 1))
+    font_scale = row_height / 60
+    column_edges = np.concatenate([[0], np.cumsum(TABLE_COLUMN_WIDTHS)])
+    xs = (margin + column_edges / column_edges[-1] * table_width).astype(int)
+    ys = top + np.arange(rows + 2) * row_height
+
+    # Every cell is a box of its own, a millimetre inside its grid slot.
+    # Joined ruling lines would form one contour around the whole table,
+    # leaving cell detection, triage and per-cell OCR with nothing to do.
+    gutter = max(5, round(dpi / 25.4))
+    for r in range(rows + 1):
+        for c in range(len(xs) - 1):
+            cv2.rectangle(page, (xs[c] + gutter, ys[r] + gutter), (xs[c + 1] - gutter, ys[r + 1] - gutter),
+                          black, thickness)
+
+    fields = ["partNo", "description", "hsn", "quantity", "rate", "per", "discountPercentage", "amount"]
+    table = [TABLE_HEADERS] + [[str(i)] + [item[field] for field in fields]
+                               for i, item in enumerate(invoice["items"], 1)]
+    pad = max(2, row_height // 6)
+    for r, values in enumerate(table):
+        baseline = ys[r] + row_height - 2 * pad
+        for c, text in enumerate(values):
+            text = _fit_text(text, xs[c + 1] - xs[c] - 2 * pad, font_scale, thickness)
+            cv2.putText(page, text, (xs[c] + pad, baseline), cv2.FONT_HERSHEY_SIMPLEX,
+                        font_scale, black, thickness)
+
+    if skew:
+        rotation = cv2.getRotationMatrix2D((width / 2, height / 2), skew, 1.0)
+        page = cv2.warpAffine(page, rotation, (width, height), flags=cv2.INTER_LINEAR,
+                              borderValue=(255, 255, 255))
+    if noise:
+        page = np.clip(page + rng.normal(0, noise, page.shape), 0, 255).astype(np.uint8)
+
+    return page, invoice
+
+
+def time_call(func: Callable[[], Any], repeat: int) -> Tuple[Dict[str, float], Any]:
+    """
+    Time a call several times, after one untimed warm-up call
+
+    Returns:
+        Tuple of (wall/CPU timing statistics in seconds, result of the last call)
+    """
+    wall = []
+    cpu = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func()
+    for _ in range(repeat):
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = func()
+        wall.append(time.perf_counter() - start_wall)
+        cpu.append(time.process_time() - start_cpu)
+
+    return {
+        "min": min(wall),
+        "median": statistics.median(wall),
+        "mean": statistics.fmean(wall),
+        "cpuMedian": statistics.median(cpu),
+    }, result
+
+
+def load_excel_exporter():
+    """
+    Load the InvoiceExporter that implements create_manufacturing_excel
+    from test.py, next to this file
+
+    Returns:
+        An exporter instance, or None if test.py cannot be imported
+    """
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test.py")
+    spec = importlib.util.spec_from_file_location("invoice_excel_export", path)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            spec.loader.exec_module(module)
+    except ImportError as e:
+        print(f"Warning: create_manufacturing_excel will not be benchmarked ({e})")
+        return None
+    return module.InvoiceExporter()
+
+
+def imported_modules(command: List[str], cwd: str) -> List[str]:
+    """Top-level packages imported by a Python command, from -X importtime output"""
+    result = subprocess.run([sys.executable, "-X", "importtime"] + command,
+                            capture_output=True, text=True, cwd=cwd)
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            modules.add(line.rsplit("|", 1)[1].strip().split(".")[0])
+    return sorted(modules)
+
+
+def measure_startup(runs: int) -> Dict[str, Any]:
+    """
+    Time the fast-start CLI paths of test.py in fresh interpreters
+
+    Args:
+        runs: Number of timed runs per command
+
+    Returns:
+        Per-command median/min wall time, budget and heavy modules imported
+    """
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    script = os.path.join(package_dir, "test.py")
+    results = {}
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        for name, (args, budget) in STARTUP_COMMANDS.items():
+            command = [script] + args + ["-o", output_dir]
+            wall = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                subprocess.run([sys.executable] + command, capture_output=True, cwd=package_dir, check=True)
+                wall.append(time.perf_counter() - start)
+
+            heavy = [module for module in imported_modules(command, package_dir) if module in HEAVY_MODULES]
+            median = statistics.median(wall)
+            results[name] = {
+                "command": args,
+                "median": median,
+                "min": min(wall),
+                "budget": budget,
+                "heavyModules": heavy,
+                "withinBudget": median <= budget and not heavy,
+            }
+
+    return results
+
+
+def peak_rss() -> Optional[int]:
+    """
+    Peak resident set size of this process in bytes, or None where unavailable
+
+    On Linux this is VmHWM, which starts afresh in an exec'd process;
+    ru_maxrss would carry over the peak of the process it was forked from.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    # ru_maxrss is in bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _page_memory(path: str, decode_mode: str) -> Dict[str, Any]:
+    """Extract one page file and report peak RSS; runs in a fresh interpreter"""
+    OCR_ENGINES[StubOCREngine.name] = StubOCREngine
+    exporter = InvoiceExporter(ocr_engine=StubOCREngine.name, decode_mode=decode_mode)
+    with contextlib.redirect_stdout(io.StringIO()):
+        before = peak_rss()
+        page = exporter.load_page(path)
+        decoded_shape = list(page["image"].shape[:2])
+        page = exporter.read_page(exporter.prepare_page(page))
+        after = peak_rss()
+    exporter.close()
+    return {
+        "decodedShape": decoded_shape,
+        "fullResolutionDecoded": page["full_res"] is not None and page["full_res"].decoded,
+        "items": len(page["result"].get("items", [])),
+        "peakRssBefore": before,
+        "peakRss": after,
+    }
+
+
+def measure_decode_memory(papers: List[str], dpi: int, rows: int) -> Dict[str, Any]:
+    """
+    Peak RSS of extracting one rendered page from a PNG file, per decode mode
+
+    Each extraction runs in a freshly spawned interpreter, so the peak is
+    that of one page and not of anything measured before it.
+
+    Args:
+        papers: Keys of PAPER_SIZES_MM
+        dpi: Rendering resolution
+        rows: Number of line items
+
+    Returns:
+        Per paper and decode mode: decoded page shape, whether the
+        full-resolution page was decoded for re-crops, items found, and the
+        peak RSS in bytes before and after extraction
+    """
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as page_dir, context.Pool(1, maxtasksperchild=1) as pool:
+        for paper in papers:
+            path = os.path.join(page_dir, f"{paper}_{dpi}.png")
+            cv2.imwrite(path, render_invoice(paper, dpi, rows)[0])
+            results[paper] = {mode: pool.apply(_page_memory, (path, mode)) for mode in ("full", "reduced")}
+            results[paper]["size"] = list(cv2.imread(path, cv2.IMREAD_UNCHANGED).shape[:2])
+    return results
+
+
+def run_case(exporter: InvoiceExporter, excel_exporter, output_dir: str, paper: str, dpi: int,
+             rows: int, noise: float, skew: float, repeat: int) -> Dict[str, Any]:
+    """Render one synthetic invoice and time every stage on it"""
+    image, invoice = render_invoice(paper, dpi, rows, noise, skew)
+    height, width = image.shape[:2]
+    timings = {}
+    ocr_calls = {}
+
+    def timed(stage: str, func: Callable[[], Any]) -> Any:
+        calls = StubOCREngine.calls
+        timings[stage], result = time_call(func, repeat)
+        ocr_calls[stage] = (StubOCREngine.calls - calls) // (repeat + 1)
+        return result
+
+    # Same decision as extract_data_from_image for what detection gets to see
+    preprocessed = timed("preprocess_large_image", lambda: exporter.preprocess_large_image(image))
+    large = width > exporter.LARGE_IMAGE_THRESHOLD or height > exporter.LARGE_IMAGE_THRESHOLD
+    table_input = preprocessed if large else image
+
+    table = timed("detect_and_extract_table", lambda: exporter.detect_and_extract_table(table_input))
+    timed("advanced_ocr_extraction", lambda: exporter.advanced_ocr_extraction(table_input))
+
+    if excel_exporter is not None:
+        data = {"manufacturingTableData": [invoice]}
+        timed("create_manufacturing_excel",
+              lambda: excel_exporter.create_manufacturing_excel(data, output_dir=output_dir,
+                                                                export_name="benchmark"))
+
+    return {
+        "paper": paper,
+        "dpi": dpi,
+        "rows": rows,
+        "noise": noise,
+        "skew": skew,
+        "width": width,
+        "height": height,
+        "itemsRendered": rows,
+        "itemsDetected": len(table.get("items", [])),
+        # Surplus items (e.g. header lines read as rows) do not raise recall
+        "recall": min(len(table.get("items", [])), rows) / rows if rows else 1.0,
+        "ocrCalls": ocr_calls,
+        "timings": timings,
+    }
+
+
+def case_key(case: Dict[str, Any]) -> Tuple:
+    return case["paper"], case["dpi"], case["rows"], case["noise"], case["skew"]
+
+
+def environment_info() -> Dict[str, Any]:
+    """Versions and revision recorded alongside the results"""
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                  text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        revision = ""
+    return {
+        "revision": revision or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "cpuCount": os.cpu_count(),
+    }
+
+
+def compare_results(results: Dict[str, Any], baseline: Dict[str, Any],
+                    tolerance: float) -> List[str]:
+    """
+    Find stages that got slower than a baseline run
+
+    Args:
+        results: Output of this run
+        baseline: Output of an earlier run
+        tolerance: Allowed relative slowdown of the median wall time
+
+    Returns:
+        One message per regression
+    """
+    baseline_cases = {case_key(case): case for case in baseline.get("cases", [])}
+    regressions = []
+    for case in results["cases"]:
+        previous = baseline_cases.get(case_key(case))
+        if previous is None:
+            continue
+        for stage, timing in case["timings"].items():
+            before = previous["timings"].get(stage)
+            if before is None or before["median"] <= 0:
+                continue
+            ratio = timing["median"] / before["median"]
+            if ratio > 1 + tolerance:
+                regressions.append(f"{stage} on {'/'.join(str(v) for v in case_key(case))}: "
+                                   f"{before['median'] * 1000:.1f} ms -> {timing['median'] * 1000:.1f} ms "
+                                   f"({ratio:.2f}x)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark extraction hot paths on synthetic invoices')
+    parser.add_argument('--papers', nargs='+', choices=sorted(PAPER_SIZES_MM), default=['A4', 'A3'])
+    parser.add_argument('--dpis', nargs='+', type=int, default=[150, 300])
+    parser.add_argument('--rows', nargs='+', type=int, default=[10, 40])
+    parser.add_argument('--noise', nargs='+', type=float, default=[0.0, 12.0],
+                        help='Gaussian noise standard deviations')
+    parser.add_argument('--skew', nargs='+', type=float, default=[0.0, 2.0], help='Rotations in degrees')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per stage')
+    parser.add_argument('--quality-tier', choices=sorted(InvoiceExporter.QUALITY_TIERS), default='fast',
+                        help='Quality tier used by advanced_ocr_extraction')
+    parser.add_argument('--output', '-o', default='benchmark_results.json', help='Output JSON file')
+    parser.add_argument('--baseline', help='Earlier results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed relative slowdown before a stage counts as a regression')
+    parser.add_argument('--min-recall', type=float, default=0.9,
+                        help='Fail if table detection recovers a smaller fraction of the rendered rows '
+                             'on any noise-free case; noisy cases are only reported')
+    parser.add_argument('--startup', action='store_true',
+                        help='Check the CLI startup budget instead of benchmarking the stages')
+    parser.add_argument('--decode-memory', type=int, metavar='DPI',
+                        help='Measure the peak RSS of extracting one page of each paper size, rendered '
+                             'at DPI and read from a file, in both decode modes, instead of benchmarking '
+                             'the stages')
+    args = parser.parse_args()
+
+    if args.decode_memory:
+        memory = measure_decode_memory(args.papers, args.decode_memory, max(args.rows))
+        with open(args.output, "w") as f:
+            json.dump({"created": pd.Timestamp.now().isoformat(), "environment": environment_info(),
+                       "dpi": args.decode_memory, "decodeMemory": memory}, f, indent=2)
+        for paper, modes in memory.items():
+            for mode in ("full", "reduced"):
+                result = modes[mode]
+                peak = "n/a" if result["peakRss"] is None else f"{result['peakRss'] / 2 ** 20:.0f} MB"
+                recrop = ", full-resolution re-crop" if result["fullResolutionDecoded"] else ""
+                print(f"{paper} at {args.decode_memory} dpi, {mode} decode "
+                      f"{result['decodedShape'][1]}x{result['decodedShape'][0]}: peak RSS {peak}{recrop}")
+        print(f"Results written to: {args.output}")
+        return
+
+    if args.startup:
+        startup = measure_startup(max(args.repeat, 5))
+        with open(args.output, "w") as f:
+            json.dump({"created": pd.Timestamp.now().isoformat(), "environment": environment_info(),
+                       "startup": startup}, f, indent=2)
+        for name, result in startup.items():
+            heavy = f", imports {', '.join(result['heavyModules'])}" if result["heavyModules"] else ""
+            print(f"{name}: {result['median'] * 1000:.0f} ms (budget {result['budget'] * 1000:.0f} ms){heavy}")
+        print(f"Results written to: {args.output}")
+        if not all(result["withinBudget"] for result in startup.values()):
+            sys.exit(1)
+        return
+
+    OCR_ENGINES[StubOCREngine.name] = StubOCREngine
+    exporter = InvoiceExporter(ocr_engine=StubOCREngine.name, quality_tier=args.quality_tier)
+    excel_exporter = load_excel_exporter()
+
+    cases = []
+    grid = list(itertools.product(args.papers, args.dpis, args.rows, args.noise, args.skew))
+    with tempfile.TemporaryDirectory() as output_dir:
+        for n, (paper, dpi, rows, noise, skew) in enumerate(grid, 1):
+            case = run_case(exporter, excel_exporter, output_dir, paper, dpi, rows, noise, skew, args.repeat)
+            cases.append(case)
+            summary = ", ".join(f"{stage} {timing['median'] * 1000:.1f} ms"
+                                for stage, timing in case["timings"].items())
+            print(f"[{n}/{len(grid)}] {paper} {dpi} dpi, {rows} rows, noise {noise}, skew {skew}: "
+                  f"{case['itemsDetected']}/{rows} items, {summary}")
+    exporter.close()
+
+    results = {
+        "created": pd.Timestamp.now().isoformat(),
+        "environment": environment_info(),
+        "repeat": args.repeat,
+        "qualityTier": args.quality_tier,
+        "cases": cases,
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to: {args.output}")
+
+    failures = []
+    for case in cases:
+        if case["recall"] < args.min_recall:
+            message = (f"table detection found {case['itemsDetected']}/{case['itemsRendered']} items on "
+                       f"{'/'.join(str(v) for v in case_key(case))}")
+            if case["noise"]:
+                print(f"Low recall: {message}")
+            else:
+                failures.append(f"Low recall: {message}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures += [f"Regression: {message}"
+                         for message in compare_results(results, json.load(f), args.tolerance)]
+
+    for message in failures:
+        print(message)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
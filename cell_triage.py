@@ -0,0 +1,35 @@
+import cv2
+import numpy as np
+
+# Cells with less grey-level contrast than this, or with a smaller fraction
+# of dark pixels after Otsu binarization, are blank and not OCRed
+MIN_CONTRAST = 40
+INK_RATIO = 0.01
+# Pixels trimmed from each edge first, so ruling lines at the cell edges do
+# not count as ink
+BORDER = 3
+
+
+def is_blank_cell(roi: np.ndarray, min_contrast: int = MIN_CONTRAST, ink_ratio: float = INK_RATIO,
+                  border: int = BORDER) -> bool:
+    """
+    Ink-density check used to skip OCR of empty cells
+
+    Args:
+        roi: Grayscale cell crop
+        min_contrast: Smallest grey-level range of a cell with text
+        ink_ratio: Smallest fraction of dark pixels of a cell with text
+        border: Pixels trimmed from each edge before measuring
+
+    Returns:
+        True if the cell holds no text worth OCRing
+    """
+    if min(roi.shape[:2]) > 2 * border:
+        roi = roi[border:-border, border:-border]
+    if roi.size == 0:
+        return True
+    # Otsu splits even a uniform cell in two, so require some contrast first
+    if int(roi.max()) - int(roi.min()) < min_contrast:
+        return True
+    _, ink = cv2.threshold(roi, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    return cv2.countNonZero(ink) < ink_ratio * roi.size
@@ -0,0 +1,210 @@
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import Dict, Any, Iterable, List, Optional
+
+import pandas as pd
+
+from normalization import clean_numeric_text, split_quantity
+
+# Typed column layout shared by all columnar writers
+STRING_COLUMNS = ["partNo", "description", "hsn", "per"]
+DECIMAL_COLUMNS = ["rate", "discountPercentage", "amount"]
+COLUMNS = ["siNo", "partNo", "description", "hsn", "quantity", "quantityUnit",
+           "rate", "per", "discountPercentage", "amount"]
+
+# Scale used for decimal columns in typed (Parquet) output
+DECIMAL_PRECISION = 18
+DECIMAL_SCALE = 3
+
+
+def _to_decimal(value: Any) -> Optional[Decimal]:
+    if pd.isna(value):
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        return None
+
+
+def parse_decimal_column(values: pd.Series) -> pd.Series:
+    """
+    Parse a column of amount strings such as "2,268.125" into Decimals
+
+    Args:
+        values: Raw values (strings or numbers)
+
+    Returns:
+        Series of Decimal objects, None where no number was found
+    """
+    numbers = clean_numeric_text(values)
+    return pd.Series([_to_decimal(number) for number in numbers], index=values.index, dtype=object)
+
+
+def parse_quantity_column(values: pd.Series) -> pd.DataFrame:
+    """
+    Split quantities such as "25 Nos." into a number and a unit
+
+    Args:
+        values: Raw quantity values (strings or numbers)
+
+    Returns:
+        DataFrame with a nullable float "quantity" and a string "quantityUnit"
+    """
+    parts = split_quantity(values)
+    return pd.DataFrame({
+        "quantity": pd.to_numeric(parts["number"], errors="coerce").astype("Float64"),
+        "quantityUnit": parts["unit"],
+    }, index=values.index)
+
+
+def items_to_frame(items: List[Dict[str, Any]], first_si_no: int = 1) -> pd.DataFrame:
+    """
+    Convert manufacturing items into a typed DataFrame
+
+    Args:
+        items: Manufacturing item dictionaries
+        first_si_no: SI No. of the first item
+
+    Returns:
+        DataFrame with the COLUMNS layout
+    """
+    raw = pd.DataFrame.from_records(items, columns=STRING_COLUMNS + ["quantity"] + DECIMAL_COLUMNS)
+
+    frame = pd.DataFrame({"siNo": pd.RangeIndex(first_si_no, first_si_no + len(raw))})
+    for column in STRING_COLUMNS:
+        frame[column] = raw[column].astype("string")
+    frame = frame.join(parse_quantity_column(raw["quantity"]))
+    for column in DECIMAL_COLUMNS:
+        frame[column] = parse_decimal_column(raw[column])
+
+    return frame[COLUMNS]
+
+
+class CsvItemWriter:
+    """Writes typed item chunks to a CSV file"""
+
+    extension = "csv"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._header = True
+
+    def write(self, frame: pd.DataFrame):
+        frame.to_csv(self._file, header=self._header, index=False)
+        self._header = False
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlItemWriter:
+    """Writes typed item chunks to a JSON-Lines file, one item per line"""
+
+    extension = "jsonl"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8")
+
+    @staticmethod
+    def _json_value(value: Any) -> Any:
+        # Decimals are written as strings so their exact value survives
+        if isinstance(value, Decimal):
+            return str(value)
+        if value is pd.NA:
+            return None
+        return str(value)
+
+    def write(self, frame: pd.DataFrame):
+        for record in frame.astype(object).where(frame.notna(), None).to_dict("records"):
+            self._file.write(json.dumps(record, default=self._json_value) + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetItemWriter:
+    """Writes typed item chunks as row groups of a Parquet file (requires pyarrow)"""
+
+    extension = "parquet"
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow (pip install pyarrow)")
+
+        self.pa = pa
+        self.path = path
+        decimal = pa.decimal128(DECIMAL_PRECISION, DECIMAL_SCALE)
+        self.schema = pa.schema([
+            ("siNo", pa.int64()),
+            ("partNo", pa.string()),
+            ("description", pa.string()),
+            ("hsn", pa.string()),
+            ("quantity", pa.float64()),
+            ("quantityUnit", pa.string()),
+            ("rate", decimal),
+            ("per", pa.string()),
+            ("discountPercentage", decimal),
+            ("amount", decimal),
+        ])
+        self._writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, frame: pd.DataFrame):
+        frame = frame.copy()
+        exponent = Decimal(1).scaleb(-DECIMAL_SCALE)
+        for column in DECIMAL_COLUMNS:
+            frame[column] = frame[column].map(lambda value: value.quantize(exponent)
+                                              if value is not None else None)
+        table = self.pa.Table.from_pandas(frame, schema=self.schema, preserve_index=False)
+        self._writer.write_table(table)
+
+    def close(self):
+        self._writer.close()
+
+
+ITEM_WRITERS = {
+    "csv": CsvItemWriter,
+    "jsonl": JsonlItemWriter,
+    "parquet": ParquetItemWriter,
+}
+
+
+def export_items(items: Iterable[Dict[str, Any]], output_path: str, fmt: str,
+                 chunk_size: int = 10000) -> str:
+    """
+    Write manufacturing items to a typed columnar file, chunk by chunk
+
+    Args:
+        items: Manufacturing item dictionaries, consumed lazily
+        output_path: Destination file
+        fmt: One of ITEM_WRITERS ("csv", "jsonl" or "parquet")
+        chunk_size: Number of items converted and written at a time
+
+    Returns:
+        Path to the created file
+    """
+    if fmt not in ITEM_WRITERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    writer = ITEM_WRITERS[fmt](output_path)
+    try:
+        items = iter(items)
+        si_no = 1
+        while True:
+            chunk = list(islice(items, chunk_size))
+            # The first chunk is written even if empty so the file gets its header/schema
+            if not chunk and si_no > 1:
+                break
+            writer.write(items_to_frame(chunk, first_si_no=si_no))
+            si_no += len(chunk)
+            if len(chunk) < chunk_size:
+                break
+    finally:
+        writer.close()
+
+    return output_path
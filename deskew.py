@@ -0,0 +1,183 @@
+from typing import Optional
+
+import cv2
+import numpy as np
+
+# Width of the downscaled copy used for skew and orientation estimates
+WORK_WIDTH = 800
+# Largest skew searched, and the search steps, in degrees
+MAX_SKEW = 15.0
+COARSE_STEP = 0.5
+FINE_STEP = 0.05
+# Smaller skews are left alone, as rotating would only blur the page
+MIN_SKEW = 0.2
+# Ink pixels used for the projection search
+MAX_SAMPLE_POINTS = 40000
+# A page is sideways when tall word blobs outnumber wide ones by this factor
+SIDEWAYS_RATIO = 2.0
+MIN_WORD_BLOBS = 10
+
+
+def _ink(gray: np.ndarray) -> np.ndarray:
+    """Binarized (ink = 255) downscaled copy of a grayscale page"""
+    height, width = gray.shape[:2]
+    scale = min(1.0, WORK_WIDTH / max(height, width))
+    if scale < 1:
+        gray = cv2.resize(gray, (max(1, round(width * scale)), max(1, round(height * scale))),
+                          interpolation=cv2.INTER_AREA)
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 15, 10)
+
+
+def _projection_score(xs: np.ndarray, ys: np.ndarray, angle: float) -> float:
+    """Variance of the row profile of the points after rotating them by angle"""
+    theta = np.deg2rad(angle)
+    rows = ys * np.cos(theta) - xs * np.sin(theta)
+    profile = np.bincount((rows - rows.min()).astype(np.int64))
+    return float(profile.var())
+
+
+def estimate_skew(gray: np.ndarray, max_skew: float = MAX_SKEW) -> float:
+    """
+    Estimate page skew with a projection-variance search
+
+    Text lines and ruling lines make the row profile of the ink sharpest
+    when they are horizontal. The search runs over the ink pixels of a
+    downscaled copy, first coarsely and then around the best angle.
+
+    Args:
+        gray: Grayscale page
+        max_skew: Largest skew searched, in degrees
+
+    Returns:
+        Angle in degrees (counter-clockwise positive, as for
+        cv2.getRotationMatrix2D) that straightens the page
+    """
+    return _skew_from_ink(_ink(gray), max_skew)
+
+
+def _skew_from_ink(ink: np.ndarray, max_skew: float = MAX_SKEW) -> float:
+    ys, xs = np.nonzero(ink)
+    if len(xs) < 100:
+        return 0.0
+    if len(xs) > MAX_SAMPLE_POINTS:
+        keep = np.random.default_rng(0).choice(len(xs), MAX_SAMPLE_POINTS, replace=False)
+        xs, ys = xs[keep], ys[keep]
+    xs = xs.astype(np.float64)
+    ys = ys.astype(np.float64)
+
+    def best(angles):
+        return max(angles, key=lambda angle: _projection_score(xs, ys, angle))
+
+    coarse = best(np.arange(-max_skew, max_skew + COARSE_STEP / 2, COARSE_STEP))
+    fine = best(np.arange(coarse - COARSE_STEP, coarse + COARSE_STEP + FINE_STEP / 2, FINE_STEP))
+    # Rotating the points by `fine` levels the lines, and so does rotating the image
+    return float(round(fine, 2))
+
+
+def estimate_quarter_turn(gray: np.ndarray) -> Optional[int]:
+    """
+    Detect a page lying on its side
+
+    Words dilated into blobs are wider than tall on an upright page and
+    taller than wide on a sideways one. The turn direction comes from the
+    left-aligned starts of text lines, which end up at the top or bottom.
+
+    Args:
+        gray: Grayscale page
+
+    Returns:
+        cv2.ROTATE_90_CLOCKWISE or cv2.ROTATE_90_COUNTERCLOCKWISE to put
+        the page upright, or None if it is not sideways (or the direction
+        is unclear)
+    """
+    return _quarter_turn_from_ink(_ink(gray))
+
+
+def _quarter_turn_from_ink(ink: np.ndarray) -> Optional[int]:
+    height, width = ink.shape
+
+    # Drop ruling lines so table text does not merge into the grid
+    length = max(height, width) // 10
+    rules = (cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (length, 1))) |
+             cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, length))))
+    text = cv2.bitwise_and(ink, cv2.bitwise_not(cv2.dilate(rules, np.ones((3, 3), np.uint8))))
+
+    words = cv2.dilate(text, np.ones((3, 3), np.uint8))
+    _, _, stats, _ = cv2.connectedComponentsWithStats(words, connectivity=8)
+    w, h = stats[1:, cv2.CC_STAT_WIDTH], stats[1:, cv2.CC_STAT_HEIGHT]
+    # Ignore specks and anything larger than a word
+    words_only = (w < width // 4) & (h < height // 4) & (np.maximum(w, h) > 8)
+    wide = int(np.count_nonzero(words_only & (w > 2 * h)))
+    tall = int(np.count_nonzero(words_only & (h > 2 * w)))
+    if tall < MIN_WORD_BLOBS or tall < SIDEWAYS_RATIO * wide:
+        return None
+
+    # Sideways text lines become columns of ink; find where each one starts and ends
+    lines = cv2.dilate(text, cv2.getStructuringElement(cv2.MORPH_RECT, (3, max(3, height // 40))))
+    _, _, stats, _ = cv2.connectedComponentsWithStats(lines, connectivity=8)
+    tops = stats[1:, cv2.CC_STAT_TOP]
+    bottoms = tops + stats[1:, cv2.CC_STAT_HEIGHT]
+    if len(tops) < 3:
+        return None
+    tolerance = height / 50
+    aligned_tops = int(np.count_nonzero(np.abs(tops - np.median(tops)) < tolerance))
+    aligned_bottoms = int(np.count_nonzero(np.abs(bottoms - np.median(bottoms)) < tolerance))
+    if aligned_tops == aligned_bottoms:
+        return None
+    # Line starts at the top: the page was turned clockwise, so turn it back
+    return cv2.ROTATE_90_COUNTERCLOCKWISE if aligned_tops > aligned_bottoms else cv2.ROTATE_90_CLOCKWISE
+
+
+def rotate_page(image: np.ndarray, angle: float, expand: bool = False) -> np.ndarray:
+    """
+    Rotate a page by a small angle about its centre
+
+    Args:
+        image: Page image (grayscale or BGR)
+        angle: Counter-clockwise rotation in degrees
+        expand: Enlarge the canvas to keep the corners; by default the page
+            keeps its size, so size-relative thresholds further on still
+            apply and only the (normally blank) corners are cut
+
+    Returns:
+        The rotated page with a white background
+    """
+    height, width = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    new_width, new_height = width, height
+    if expand:
+        cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+        new_width = int(np.ceil(height * sin + width * cos))
+        new_height = int(np.ceil(height * cos + width * sin))
+        matrix[0, 2] += (new_width - width) / 2
+        matrix[1, 2] += (new_height - height) / 2
+    white = (255,) * (1 if image.ndim == 2 else image.shape[2])
+    return cv2.warpAffine(image, matrix, (new_width, new_height), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=white)
+
+
+def straighten_page(image: np.ndarray) -> tuple:
+    """
+    Put a page upright and remove its skew
+
+    Args:
+        image: Page image (grayscale or BGR)
+
+    Returns:
+        Tuple of (corrected image, quarter turn applied or None, skew
+        angle corrected in degrees, 0.0 if none)
+    """
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    ink = _ink(gray)
+
+    turn = _quarter_turn_from_ink(ink)
+    if turn is not None:
+        image = cv2.rotate(image, turn)
+        ink = cv2.rotate(ink, turn)
+
+    angle = _skew_from_ink(ink)
+    if abs(angle) < MIN_SKEW:
+        angle = 0.0
+    else:
+        image = rotate_page(image, angle)
+    return image, turn, angle
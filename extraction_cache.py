@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional
+
+
+class ExtractionCache:
+    """
+    On-disk, content-addressed cache of extraction results.
+
+    Entries are keyed by a hash of the image bytes and the settings that
+    affect extraction, and evicted least-recently-used first once the cache
+    grows past its size bound. The store is a SQLite database in WAL mode,
+    so several worker processes can read and write it concurrently.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 256 * 1024 * 1024,
+                 max_entries: Optional[int] = None):
+        """
+        Initialize the cache
+
+        Args:
+            cache_dir: Directory holding the cache database
+            max_bytes: Upper bound on the total size of stored results
+            max_entries: Optional upper bound on the number of entries
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "extraction_cache.sqlite3")
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, reopening it after a fork"""
+        local = self._local
+        if getattr(local, "conn", None) is None or local.pid != os.getpid():
+            # Connections are only used by their own thread; close() may run elsewhere
+            local.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                         check_same_thread=False)
+            local.conn.execute("PRAGMA journal_mode=WAL")
+            local.conn.execute("PRAGMA synchronous=NORMAL")
+            local.pid = os.getpid()
+            with self._lock:
+                self._connections.append((local.pid, local.conn))
+        return local.conn
+
+    @staticmethod
+    def make_key(image_bytes: bytes, params: Dict[str, Any]) -> str:
+        """
+        Build a cache key from image content and extraction settings
+
+        Args:
+            image_bytes: Raw bytes of the image file
+            params: Preprocessing parameters and OCR config strings
+
+        Returns:
+            Hex digest identifying the extraction
+        """
+        digest = hashlib.sha256(image_bytes)
+        digest.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached result, marking it as recently used
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        conn = self._connection()
+        row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+
+        conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Dict[str, Any]):
+        """
+        Store a result and evict old entries beyond the size bound
+
+        Args:
+            key: Cache key from make_key
+            value: JSON-serialisable result
+        """
+        payload = json.dumps(value)
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT OR REPLACE INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                         (key, payload, size, time.time()))
+            self._evict(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Delete least-recently-used entries until within bounds"""
+        total_bytes, total_entries = conn.execute(
+            "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM entries").fetchone()
+
+        excess_entries = 0
+        if self.max_entries is not None:
+            excess_entries = max(0, total_entries - self.max_entries)
+        if total_bytes <= self.max_bytes and excess_entries == 0:
+            return
+
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_access"):
+            if total_bytes <= self.max_bytes and len(doomed) >= excess_entries:
+                break
+            doomed.append((key,))
+            total_bytes -= size
+        conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+
+    def clear(self):
+        """Remove all entries"""
+        self._connection().execute("DELETE FROM entries")
+
+    def close(self):
+        """Close the connections opened by this process"""
+        with self._lock:
+            for pid, conn in self._connections:
+                if pid == os.getpid():
+                    conn.close()
+            self._connections = []
+        self._local = threading.local()
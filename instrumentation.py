@@ -0,0 +1,168 @@
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+
+class Trace:
+    """
+    Per-document record of stage timings and counters.
+
+    Stage timings accumulate wall time and the CPU time of the calling
+    thread, so they stay meaningful when documents are processed by
+    several threads at once.
+    """
+
+    enabled = True
+
+    def __init__(self, document: str):
+        self.document = document
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.peak_image_bytes = 0
+        self.created = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a with-block as one call of a stage"""
+        start_wall, start_cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start_wall
+            cpu = time.thread_time() - start_cpu
+            with self._lock:
+                stage = self.stages.setdefault(name, {"calls": 0, "wall": 0.0, "cpu": 0.0})
+                stage["calls"] += 1
+                stage["wall"] += wall
+                stage["cpu"] += cpu
+
+    def count(self, name: str, n: int = 1):
+        """Add n to a counter"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def track_images(self, *images: Optional[np.ndarray]):
+        """Record the combined size of image arrays that are held at the same time"""
+        unique = {id(image): image for image in images if image is not None}
+        size = sum(image.nbytes for image in unique.values())
+        with self._lock:
+            self.peak_image_bytes = max(self.peak_image_bytes, size)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "document": self.document,
+                "wallTime": time.perf_counter() - self.created,
+                "stages": {name: dict(stage) for name, stage in self.stages.items()},
+                "counters": dict(self.counters),
+                "peakImageBytes": self.peak_image_bytes,
+            }
+
+
+class NullTrace:
+    """Trace that records nothing, used when tracing is disabled"""
+
+    enabled = False
+
+    @contextmanager
+    def stage(self, name: str):
+        yield
+
+    def count(self, name: str, n: int = 1):
+        pass
+
+    def track_images(self, *images: Optional[np.ndarray]):
+        pass
+
+
+NULL_TRACE = NullTrace()
+
+_current_trace = contextvars.ContextVar("current_trace", default=NULL_TRACE)
+
+
+def current_trace():
+    """The trace of the document being processed by this thread or task"""
+    return _current_trace.get()
+
+
+@contextmanager
+def activate(trace):
+    """Make trace the current trace for the duration of a with-block"""
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+class TraceSummary:
+    """
+    Aggregate of the per-document traces of a batch run.
+
+    Only totals and one wall time per document are kept, so the summary stays
+    small for large batches.
+    """
+
+    def __init__(self, slowest: int = 5):
+        """
+        Initialize the summary
+
+        Args:
+            slowest: Number of slowest documents to list
+        """
+        self.documents = 0
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.peak_image_bytes = 0
+        self.wall_times: List[float] = []
+        self.slowest_count = slowest
+        self.slowest: List[tuple] = []
+        self._lock = threading.Lock()
+
+    def add(self, trace: Dict[str, Any]):
+        """Add one document's trace (as returned by Trace.to_dict)"""
+        with self._lock:
+            self.documents += 1
+            for name, stage in trace["stages"].items():
+                total = self.stages.setdefault(name, {"calls": 0, "wall": 0.0, "cpu": 0.0})
+                for key in total:
+                    total[key] += stage[key]
+            for name, value in trace["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            self.peak_image_bytes = max(self.peak_image_bytes, trace["peakImageBytes"])
+
+            self.wall_times.append(trace["wallTime"])
+            self.slowest.append((trace["wallTime"], trace["document"]))
+            self.slowest = sorted(self.slowest, reverse=True)[:self.slowest_count]
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            wall_times = np.array(self.wall_times) if self.wall_times else np.zeros(1)
+            stage_wall = sum(stage["wall"] for stage in self.stages.values()) or 1.0
+            return {
+                "documents": self.documents,
+                "wallTime": {
+                    "total": float(wall_times.sum()),
+                    "mean": float(wall_times.mean()),
+                    "p50": float(np.percentile(wall_times, 50)),
+                    "p95": float(np.percentile(wall_times, 95)),
+                    "max": float(wall_times.max()),
+                },
+                "stages": {name: dict(stage, share=stage["wall"] / stage_wall)
+                           for name, stage in self.stages.items()},
+                "counters": dict(self.counters),
+                "fallbackRate": self.counters.get("fallbacks", 0) / max(1, self.documents),
+                "peakImageBytes": self.peak_image_bytes,
+                "slowest": [{"document": document, "wallTime": wall}
+                            for wall, document in self.slowest],
+            }
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
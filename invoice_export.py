@@ -7,42 +7,384 @@ from openpyxl import Workbook
 from openpyxl.utils.dataframe import dataframe_to_rows
 from openpyxl.styles import Font, Alignment, Border, Side
 import argparse
-from typing import Dict, List, Any, Optional
+import contextvars
+import hashlib
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 import json
 
+import cell_triage
+import manufacturing_excel
+from deskew import straighten_page
+from extraction_cache import ExtractionCache
+from instrumentation import NULL_TRACE, Trace, TraceSummary, activate, current_trace
+from layout_registry import LayoutRegistry
+from manufacturing_excel import ManufacturingExcelWriter
+from normalization import invalid_item_indices
+from ocr_engines import OCREnginePool
+from page_regions import locate_page_regions, parse_header_fields
+from routing import check_cancelled, score_table
+
+# Image file types decoded directly; PDFs are rendered page by page
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.tiff', '.bmp'}
+# Resolution PDF pages are rendered at
+PDF_DPI = 200
+
+# Reduced decode flags by downscale factor
+REDUCED_GRAYSCALE_FLAGS = {
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+
+def read_image_size(image_bytes: bytes) -> Optional[Tuple[int, int]]:
+    """
+    Read (width, height) from the image header without decoding pixels
+
+    Returns:
+        Image size, or None if Pillow is unavailable or the header is unreadable
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as header:
+            return header.size
+    except OSError:
+        return None
+
+
+class FullResolutionCrops:
+    """
+    Lazily decoded full-resolution grayscale page, used to re-crop cells
+    that are too small to OCR reliably at the reduced decode resolution
+
+    Neither OpenCV nor Pillow can decode a region of a PNG, JPEG or TIFF,
+    so the first crop decodes the whole page: width × height bytes (about
+    70 MB for A3 at 600 dpi), held until the page is dropped. Pages whose
+    cells and header text are all tall enough, or blank, never pay for it.
+    benchmark.py --decode-memory measures the peak RSS of both decode modes.
+    """
+
+    def __init__(self, image_bytes: bytes, image_path: str):
+        self.image_bytes = image_bytes
+        self.image_path = image_path
+        self._image = None
+
+    @property
+    def decoded(self) -> bool:
+        """Whether a crop has decoded the full-resolution page"""
+        return self._image is not None
+
+    def crop(self, x: int, y: int, w: int, h: int, shape: Tuple[int, ...]) -> np.ndarray:
+        """
+        Crop a rectangle given in the coordinates of a downscaled page
+
+        Args:
+            x, y, w, h: Rectangle in the downscaled page
+            shape: Shape of the downscaled page
+
+        Returns:
+            The same region cut from the full-resolution page
+        """
+        if self._image is None:
+            self._image = cv2.imdecode(np.frombuffer(self.image_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+            if self._image is None:
+                raise ValueError(f"Could not read image file: {self.image_path}")
+
+        scale_y = self._image.shape[0] / shape[0]
+        scale_x = self._image.shape[1] / shape[1]
+        x0, y0 = int(x * scale_x), int(y * scale_y)
+        x1, y1 = int(np.ceil((x + w) * scale_x)), int(np.ceil((y + h) * scale_y))
+        return self._image[y0:y1, x0:x1]
+
+
 class InvoiceExporter:
     """
     A class to export invoice data to Excel files in different formats,
     including laser cutting invoice format.
     """
 
-    def __init__(self):
-        """Initialize the InvoiceExporter"""
-        # Try to import pytesseract if available
+    # Manufacturing sheet layout, see manufacturing_excel
+    MANUFACTURING_HEADERS = manufacturing_excel.MANUFACTURING_HEADERS
+    MANUFACTURING_FIELDS = manufacturing_excel.MANUFACTURING_FIELDS
+    MANUFACTURING_COLUMN_WIDTHS = manufacturing_excel.MANUFACTURING_COLUMN_WIDTHS
+
+    # Tesseract config shared by the per-cell and whole-table OCR modes
+    TABLE_OCR_CONFIG = r'--oem 3 --psm 6 -c tessedit_char_whitelist="0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz+-=.,;:/%$()\'"'
+    # Single-line, digits-only config for cells of numeric columns
+    NUMERIC_OCR_CONFIG = r'--oem 3 --psm 7 -c tessedit_char_whitelist="0123456789.,-%"'
+    # Table columns holding plain numbers (hsn, rate, discountPercentage and
+    # amount in _read_table); quantity is excluded as it carries a unit
+    NUMERIC_COLUMNS = (2, 4, 6, 7)
+    # Cell triage thresholds, see cell_triage.is_blank_cell
+    BLANK_CELL_MIN_CONTRAST = cell_triage.MIN_CONTRAST
+    BLANK_CELL_INK_RATIO = cell_triage.INK_RATIO
+    # Quality tiers for advanced_ocr_extraction: denoiser ("none", "median"
+    # or "nlmeans"), number of full-page OCR passes, and page segmentation mode
+    QUALITY_TIERS = {
+        "fast": {"denoiser": "none", "passes": 1, "psm": 6},
+        "balanced": {"denoiser": "median", "passes": 1, "psm": 6},
+        "thorough": {"denoiser": "nlmeans", "passes": 2, "psm": 4},
+    }
+
+    # Large format preprocessing: images above the threshold are downscaled
+    # to MAX_DIMENSION and contrast-enhanced with CLAHE
+    LARGE_IMAGE_THRESHOLD = 3000
+    MAX_DIMENSION = 3000
+    CLAHE_CLIP_LIMIT = 3.0
+    CLAHE_TILE_GRID_SIZE = (8, 8)
+
+    # Padding added around every detected cell rectangle
+    CELL_PADDING = 5
+    # When the page was decoded at reduced resolution, cells whose unpadded
+    # height (in pixels of the downscaled page) is below this, and header
+    # blocks whose text lines are, are re-cropped from the full-resolution
+    # image before OCR
+    MIN_CELL_OCR_HEIGHT = 32
+
+    # Config for the header block, read once to find invoice number and date
+    HEADER_OCR_CONFIG = r'--oem 3 --psm 6'
+    # Table detection inside the located table region must find at least
+    # this many rows, otherwise it is repeated on the whole page
+    MIN_ROI_TABLE_ROWS = 2
+
+    # Routing between the table path and advanced_ocr_extraction, decided
+    # from routing.score_table before any OCR: pages scoring below
+    # FALLBACK_ROUTE_SCORE go straight to the fallback, and with "race"
+    # routing pages below TABLE_ROUTE_SCORE run both paths concurrently
+    ROUTING_MODES = ("sequential", "confidence", "race")
+    FALLBACK_ROUTE_SCORE = 0.3
+    TABLE_ROUTE_SCORE = 0.6
+
+    # Bump when extraction logic changes so stale cache entries stop matching
+    CACHE_VERSION = 15
+
+    def __init__(self, table_ocr_mode: str = "cell", ocr_engine: str = "auto",
+                 ocr_pool_size: int = 1, cache_dir: Optional[str] = None,
+                 cache_max_bytes: int = 256 * 1024 * 1024, decode_mode: str = "full",
+                 quality_tier: str = "fast", trace_dir: Optional[str] = None,
+                 layout_cache_size: int = 0, localize_regions: bool = True,
+                 deskew: bool = True, routing: str = "confidence"):
+        """
+        Initialize the InvoiceExporter
+
+        Args:
+            table_ocr_mode: "cell" to OCR every table cell separately, or
+                "table" to OCR the whole table region once and assign the
+                recognised words to their cells
+            ocr_engine: "tesserocr" for resident in-process engines,
+                "pytesseract" for one tesseract process per call, or "auto"
+                to prefer tesserocr when it is installed
+            ocr_pool_size: Number of OCR engines kept loaded and reused
+                across cells, pages and files
+            cache_dir: Directory for the on-disk extraction cache; caching
+                is disabled when None
+            cache_max_bytes: Size bound of the extraction cache
+            decode_mode: "full" to decode images at full resolution in colour,
+                or "reduced" to decode in grayscale at a reduced resolution
+                chosen from the image header
+            quality_tier: Quality tier used by advanced_ocr_extraction, one
+                of QUALITY_TIERS ("fast", "balanced" or "thorough")
+            trace_dir: Directory for per-document JSON traces of stage
+                timings and counters; tracing is disabled when None
+            layout_cache_size: Number of page layouts (recurring vendor
+                templates) remembered so their cell geometry is reused
+                instead of detected again; 0 disables the layout cache
+            localize_regions: Locate the line-item table and the header
+                block on a downscaled page first, detect cells only inside
+                the table region and read the invoice number and date from
+                the header block
+            deskew: Turn sideways pages upright and remove small skew on a
+                downscaled copy before table detection, so rotated scans and
+                photos stay on the table path instead of the OCR fallback
+            routing: "sequential" to always try the table path first and
+                fall back when it finds no items, "confidence" to send pages
+                with a low table score straight to the fallback, or "race"
+                to also run both paths concurrently on uncertain pages;
+                "race" needs ocr_pool_size > 1 and falls back to
+                "confidence" otherwise
+        """
+        if table_ocr_mode not in ("cell", "table"):
+            raise ValueError(f"Unknown table OCR mode: {table_ocr_mode}")
+        self.table_ocr_mode = table_ocr_mode
+
+        if decode_mode not in ("full", "reduced"):
+            raise ValueError(f"Unknown decode mode: {decode_mode}")
+        self.decode_mode = decode_mode
+
+        if quality_tier not in self.QUALITY_TIERS:
+            raise ValueError(f"Unknown quality tier: {quality_tier}")
+        self.quality_tier = quality_tier
+
+        if routing not in self.ROUTING_MODES:
+            raise ValueError(f"Unknown routing mode: {routing}")
+        self.routing = routing
+
+        # Try to start the OCR engines if an OCR backend is available
         try:
-            import pytesseract
-            self.pytesseract = pytesseract
+            self.ocr = OCREnginePool(engine=ocr_engine, size=ocr_pool_size)
             self.ocr_available = True
         except ImportError:
-            print("Warning: pytesseract not found. OCR functionality will be limited.")
+            print("Warning: no OCR engine (tesserocr or pytesseract) found. OCR functionality will be limited.")
+            self.ocr = None
+            self.ocr_available = False
+
+        # Racing only pays off when the two paths can OCR at the same time
+        if self.routing == "race" and (self.ocr is None or self.ocr.size < 2):
+            print("Warning: race routing needs an OCR pool of more than one engine, using confidence routing")
+            self.routing = "confidence"
+        # Shared by all races; as many threads as engines, since OCR is what they wait on
+        self._race_executor = (ThreadPoolExecutor(max_workers=self.ocr.size, thread_name_prefix="race")
+                               if self.routing == "race" else None)
+
+        self.cache = ExtractionCache(cache_dir, max_bytes=cache_max_bytes) if cache_dir else None
+
+        self.layouts = LayoutRegistry(max_layouts=layout_cache_size) if layout_cache_size > 0 else None
+
+        self.localize_regions = localize_regions
+        self.deskew = deskew
+
+        self.trace_dir = trace_dir
+        self.trace_summary = None
+        if trace_dir:
+            os.makedirs(trace_dir, exist_ok=True)
+            self.trace_summary = TraceSummary()
+
+    def close(self):
+        """Release the race threads, the resident OCR engines and the cache connection"""
+        if self._race_executor is not None:
+            self._race_executor.shutdown(wait=True)
+            self._race_executor = None
+        if self.ocr is not None:
+            self.ocr.close()
+            self.ocr = None
             self.ocr_available = False
+        if self.cache is not None:
+            self.cache.close()
+
+    def extraction_params(self) -> Dict[str, Any]:
+        """
+        Settings that change extraction results, used in cache keys
+
+        Returns:
+            Dictionary of preprocessing parameters and OCR config strings
+        """
+        return {
+            "cache_version": self.CACHE_VERSION,
+            "ocr_available": self.ocr_available,
+            "ocr_engine": self.ocr.engine_name if self.ocr is not None else None,
+            "large_image_threshold": self.LARGE_IMAGE_THRESHOLD,
+            "max_dimension": self.MAX_DIMENSION,
+            "clahe_clip_limit": self.CLAHE_CLIP_LIMIT,
+            "clahe_tile_grid_size": list(self.CLAHE_TILE_GRID_SIZE),
+            "decode_mode": self.decode_mode,
+            "cell_padding": self.CELL_PADDING,
+            "min_cell_ocr_height": self.MIN_CELL_OCR_HEIGHT,
+            "table_ocr_mode": self.table_ocr_mode,
+            "table_ocr_config": self.TABLE_OCR_CONFIG,
+            "numeric_ocr_config": self.NUMERIC_OCR_CONFIG,
+            "numeric_columns": list(self.NUMERIC_COLUMNS),
+            "blank_cell_min_contrast": self.BLANK_CELL_MIN_CONTRAST,
+            "blank_cell_ink_ratio": self.BLANK_CELL_INK_RATIO,
+            "blank_cell_border": cell_triage.BORDER,
+            "quality_tier": self.quality_tier,
+            "quality_tier_settings": self.QUALITY_TIERS[self.quality_tier],
+            "layout_cache": self.layouts is not None,
+            "localize_regions": self.localize_regions,
+            "deskew": self.deskew,
+            "routing": self.routing,
+            "route_scores": [self.FALLBACK_ROUTE_SCORE, self.TABLE_ROUTE_SCORE],
+            "header_ocr_config": self.HEADER_OCR_CONFIG,
+        }
 
     @staticmethod
     def get_default_manufacturing_template_data() -> Dict[str, Any]:
         """Generate default manufacturing template data"""
-        # ... keep existing code (default template data)
+        return {
+            "stateName": "Karnataka, Code : 29",
+            "termsOfDelivery": "As per terms",
+            "items": [
+                {
+                    "partNo": "Laser Cutting-MIT-EA012B014-04",
+                    "description": "SIZE:147.4X179.7X6MM-CUT LENGTH-1207MM-HR",
+                    "hsn": "73269070",
+                    "quantity": "116 Nos.",
+                    "rate": "118.500",
+                    "per": "Nos.",
+                    "discountPercentage": "",
+                    "amount": "13,746.000"
+                },
+                {
+                    "partNo": "Laser Cutting-MIT-EA015C294-02",
+                    "description": "SIZE:110X222.4X6MM-CUT LENGTH-949MM-HR",
+                    "hsn": "73269070",
+                    "quantity": "100 Nos.",
+                    "rate": "103.000",
+                    "per": "Nos.",
+                    "discountPercentage": "",
+                    "amount": "10,300.000"
+                },
+            ]
+        }
 
-    def create_manufacturing_excel(self, data: Optional[Dict[str, Any]] = None) -> str:
+    def create_manufacturing_excel(self, data: Optional[Dict[str, Any]] = None,
+                                   output_dir: str = ".", export_name: str = "Invoice_Export") -> str:
         """
         Create a manufacturing invoice Excel file
         
+        Rows are written through a write-only worksheet as the items are
+        produced, so memory does not grow with the number of items.
+        
         Args:
-            data: Dictionary containing invoice data
+            data: Dictionary containing invoice data; a list of invoices
+                under "manufacturingTableData" is aggregated into one sheet,
+                and the default template data is used when it is empty
+            output_dir: Directory in which to save the Excel file
+            export_name: Filename prefix of the Excel file
             
         Returns:
             Path to the created Excel file
         """
-        # ... keep existing code (Excel creation functionality)
+        template = (data or {}).get("manufacturingTableData") or self.get_default_manufacturing_template_data()
+        if isinstance(template, dict):
+            invoices = [template]
+            state_name = template.get("stateName", "")
+            terms_of_delivery = template.get("termsOfDelivery", "")
+        else:
+            invoices = template
+            state_name, terms_of_delivery = "Aggregated Invoices", ""
+
+        writer = self.open_manufacturing_excel(output_dir, export_name, state_name, terms_of_delivery)
+        for invoice in invoices:
+            writer.write_invoice(invoice)
+        return writer.close()
+
+    def open_manufacturing_excel(self, output_dir: str = ".", export_name: str = "Invoice_Export",
+                                 state_name: str = "Aggregated Invoices",
+                                 terms_of_delivery: str = "") -> "ManufacturingExcelWriter":
+        """
+        Start a manufacturing invoice Excel file that invoices are written to one by one
+        
+        Args:
+            output_dir: Directory in which to save the Excel file
+            export_name: Filename prefix of the Excel file
+            state_name: Value of the "State Name" header field
+            terms_of_delivery: Value of the "Terms of Delivery" header field
+            
+        Returns:
+            Writer whose close() saves the file and returns its path
+        """
+        timestamp = pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')
+        output_path = os.path.join(output_dir, f"{export_name}_{timestamp}.xlsx")
+        return ManufacturingExcelWriter(output_path, state_name, terms_of_delivery)
+
+    iter_manufacturing_items = staticmethod(manufacturing_excel.iter_manufacturing_items)
 
     def extract_data_from_image(self, image_path: str) -> Dict[str, Any]:
         """
@@ -54,65 +396,376 @@ class InvoiceExporter:
         Returns:
             Dictionary containing extracted invoice data
         """
-        print(f"Processing image: {image_path}")
+        return self._extract_page(self.load_page(image_path))
+
+    def extract_data_from_pdf(self, pdf_path: str, poppler_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Extract invoice data from every page of a PDF
         
-        # Load image
-        image = cv2.imread(image_path)
-        if image is None:
-            raise ValueError(f"Could not read image file: {image_path}")
+        Pages are rendered one at a time in memory and run through the same
+        stages as images; see combine_page_results for how they are merged.
+        
+        Args:
+            pdf_path: Path to the PDF
+            poppler_path: Directory of the poppler binaries, if not on PATH
+            
+        Returns:
+            Dictionary containing the extracted invoice data of all pages
+        """
+        results = []
+        for page_number, image in iter_pdf_pages(pdf_path, poppler_path=poppler_path):
+            results.append(self._extract_page(self.load_page(pdf_path, image=image, page_number=page_number)))
+        return combine_page_results(results)
+
+    def _extract_page(self, page: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a loaded page through the remaining stages, finishing its trace even if one fails"""
+        try:
+            if "result" not in page:
+                self.prepare_page(page)
+                self.read_page(page)
+        except Exception:
+            page["trace"].count("errors")
+            raise
+        finally:
+            self.finish_trace(page)
+        return page["result"]
+
+    def load_page(self, image_path: str, image: Optional[np.ndarray] = None,
+                  page_number: int = 1) -> Dict[str, Any]:
+        """
+        Decode stage: look the image up in the cache, otherwise decode it
+        
+        Args:
+            image_path: Path to the invoice image, or to the PDF a page
+                was rendered from
+            image: Already rendered page (e.g. from iter_pdf_pages); the
+                file is then neither read nor decoded
+            page_number: 1-based page number within the document
+            
+        Returns:
+            Page state dictionary; it already holds "result" on a cache hit,
+            otherwise "image", "size" and "full_res" for prepare_page
+        """
+        if image is not None:
+            return self._load_rendered_page(image_path, image, page_number)
+
+        print(f"Processing image: {image_path}")
+        trace = Trace(image_path) if self.trace_dir else NULL_TRACE
+        page = {"path": image_path, "page_number": page_number, "cache_key": None, "trace": trace}
+
+        with activate(trace):
+            try:
+                # Read the file once: the same bytes are hashed and decoded
+                with trace.stage("read"):
+                    with open(image_path, "rb") as f:
+                        image_bytes = f.read()
+
+                # Serve repeated images from the cache without any OpenCV or OCR work
+                if self.cache is not None:
+                    with trace.stage("cache_lookup"):
+                        page["cache_key"] = self.cache.make_key(image_bytes, self.extraction_params())
+                        cached = self.cache.get(page["cache_key"])
+                    if cached is not None:
+                        print("Using cached extraction result")
+                        trace.count("cacheHits")
+                        page["result"] = cached["data"]
+                        return page
+
+                # Load image
+                with trace.stage("decode"):
+                    page["image"], page["size"] = self.decode_image(image_bytes, image_path)
+                trace.track_images(page["image"])
+                # Only a page decoded below its full size has anything to re-crop
+                downscaled = max(page["size"]) > max(page["image"].shape[:2])
+                page["full_res"] = FullResolutionCrops(image_bytes, image_path) if downscaled else None
+            except Exception:
+                # The page never reaches the later stages, so its trace ends here
+                trace.count("errors")
+                self.finish_trace(page)
+                raise
+        return page
+
+    def _load_rendered_page(self, path: str, image: np.ndarray, page_number: int) -> Dict[str, Any]:
+        """load_page for a page that is already decoded, keyed on its pixels"""
+        print(f"Processing page {page_number} of: {path}")
+        trace = Trace(f"{path}#page={page_number}") if self.trace_dir else NULL_TRACE
+        page = {"path": path, "page_number": page_number, "cache_key": None, "trace": trace}
 
+        with activate(trace):
+            if self.cache is not None:
+                with trace.stage("cache_lookup"):
+                    params = dict(self.extraction_params(), page_shape=list(image.shape))
+                    page["cache_key"] = self.cache.make_key(np.ascontiguousarray(image).data, params)
+                    cached = self.cache.get(page["cache_key"])
+                if cached is not None:
+                    print("Using cached extraction result")
+                    trace.count("cacheHits")
+                    page["result"] = cached["data"]
+                    return page
+
+            trace.track_images(image)
+            page["image"], page["size"] = image, (image.shape[1], image.shape[0])
+            page["full_res"] = None
+        return page
+
+    def prepare_page(self, page: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Preprocessing stage: large format handling, deskew, region
+        localisation, table cell detection and routing
+        
+        Args:
+            page: Page state from load_page
+            
+        Returns:
+            The page with "image" preprocessed and "gray", "regions",
+            "rows" and "route" added
+        """
         # Determine image type/size
-        height, width = image.shape[:2]
+        width, height = page["size"]
         print(f"Image dimensions: {width}x{height} pixels")
         
-        # Apply different preprocessing based on image size
-        # A4 is roughly 2480 x 3508 pixels at 300 DPI
-        # A3 is roughly 3508 x 4961 pixels at 300 DPI
-        if width > 3000 or height > 3000:
-            print("Detected large format image (possibly A3)")
-            # For large images, use a higher scaling factor and preprocessing
-            image = self.preprocess_large_image(image)
-        
-        # Enhanced table detection and extraction
-        extracted_data = self.detect_and_extract_table(image)
-        
-        # If extraction failed or no tables found, return placeholder data
-        if not extracted_data or not extracted_data.get("items"):
-            print("Warning: Could not extract tabular data properly, using advanced OCR method")
-            extracted_data = self.advanced_ocr_extraction(image)
+        with activate(page["trace"]):
+            # Apply different preprocessing based on image size
+            # A4 is roughly 2480 x 3508 pixels at 300 DPI
+            # A3 is roughly 3508 x 4961 pixels at 300 DPI
+            if width > self.LARGE_IMAGE_THRESHOLD or height > self.LARGE_IMAGE_THRESHOLD:
+                print("Detected large format image (possibly A3)")
+                # For large images, use a higher scaling factor and preprocessing
+                page["image"] = self.preprocess_large_image(page["image"])
+
+            page["image"], rotated = self.straighten_image(page["image"])
+            if rotated:
+                # Cell coordinates no longer map onto the undecoded full-resolution page
+                page["full_res"] = None
+
+            image = page["image"]
+            page["gray"] = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            page["regions"] = self.locate_regions(page["gray"])
+            page["gray"], page["rows"] = self.detect_table_cells(page["gray"], page["regions"]["table"])
+            page["route"] = self.choose_route(page["gray"], page["rows"], page["regions"]["table"])
+        return page
+
+    def read_page(self, page: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        OCR stage: read the detected cells, falling back to full-page OCR
+        
+        Args:
+            page: Page state from prepare_page
+            
+        Returns:
+            The page with the extracted data stored under "result"
+        """
+        trace = page["trace"]
+        route = page.get("route", "table")
+        with activate(trace):
+            if route == "race":
+                extracted_data, table_text = self._race_extraction(page)
+            else:
+                # Enhanced table detection and extraction, unless routed away
+                extracted_data, table_text = None, []
+                if route == "table":
+                    extracted_data, table_text = self._read_table(page["gray"], page["rows"],
+                                                                  full_res=page["full_res"])
+                
+                # If extraction failed or no tables found, return placeholder data
+                if not extracted_data or not extracted_data.get("items"):
+                    if route == "fallback":
+                        print("Low table score, using advanced OCR method")
+                    else:
+                        print("Warning: Could not extract tabular data properly, using advanced OCR method")
+                    trace.count("fallbacks")
+                    extracted_data = self.advanced_ocr_extraction(page["image"])
+
+            extracted_data.update(self.read_header_fields(page["gray"], page["regions"]["header"],
+                                                          full_res=page["full_res"]))
+
+            # Flag rows whose amount does not match quantity × rate × discount
+            with trace.stage("validation"):
+                extracted_data["invalidItems"] = invalid_item_indices(extracted_data.get("items", []))
+
+            if page["cache_key"] is not None:
+                with trace.stage("cache_store"):
+                    self.cache.put(page["cache_key"], {"data": extracted_data, "cells": table_text})
+
+        page["result"] = extracted_data
+        return page
+
+    def choose_route(self, gray: np.ndarray, rows: List[List[tuple]],
+                     table_box: Optional[tuple] = None) -> str:
+        """
+        Routing stage: pick the extraction path from the table score
+        
+        Args:
+            gray: Grayscale page
+            rows: Detected cell rectangles grouped into rows
+            table_box: Located table region, if any
+            
+        Returns:
+            "table", "fallback" or "race"
+        """
+        if self.routing == "sequential":
+            return "table"
+
+        trace = current_trace()
+        with trace.stage("routing"):
+            score = score_table(gray, rows, table_box)["score"]
+
+        if score < self.FALLBACK_ROUTE_SCORE:
+            route = "fallback"
+        elif self.routing == "race" and score < self.TABLE_ROUTE_SCORE:
+            route = "race"
+        else:
+            route = "table"
+        print(f"Table score {score:.2f}, route: {route}")
+        trace.count("route" + route.capitalize())
+        return route
+
+    def _race_extraction(self, page: Dict[str, Any]) -> Tuple[Dict[str, Any], List[List[str]]]:
+        """
+        Run the table path and advanced_ocr_extraction concurrently
+        
+        The table result wins if it has items, and the fallback is then
+        cancelled at its next checkpoint; otherwise the fallback, already
+        under way, provides the result. Both paths run on the exporter's
+        race executor, which only exists with more than one OCR engine.
+        
+        Args:
+            page: Page state from prepare_page
+            
+        Returns:
+            Tuple of (extracted data, per-cell OCR text)
+        """
+        trace = current_trace()
+        cancel_fallback = threading.Event()
+
+        # Each path runs in a copy of this context so it records into the page's trace
+        table = self._race_executor.submit(contextvars.copy_context().run, self._read_table,
+                                           page["gray"], page["rows"], page["full_res"])
+        fallback = self._race_executor.submit(contextvars.copy_context().run, self.advanced_ocr_extraction,
+                                              page["image"], None, cancel_fallback)
+
+        try:
+            extracted_data, table_text = table.result()
+        except BaseException:
+            cancel_fallback.set()
+            raise
+
+        if extracted_data.get("items"):
+            cancel_fallback.set()
+            trace.count("raceTableWins")
+            return extracted_data, table_text
+
+        print("Warning: Could not extract tabular data properly, using advanced OCR result")
+        trace.count("fallbacks")
+        trace.count("raceFallbackWins")
+        return fallback.result(), table_text
+
+    def finish_trace(self, page: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Write a page's trace to the trace directory and add it to the summary
+        
+        The file is named after the document, a hash of its full path (so
+        equally named files from different folders do not collide) and the
+        page number.
+        
+        Args:
+            page: Page state from load_page, after its last stage
+            
+        Returns:
+            The trace as a dictionary, or None when tracing is disabled
+        """
+        trace = page.get("trace", NULL_TRACE)
+        if not trace.enabled:
+            return None
+
+        record = trace.to_dict()
+        path_hash = hashlib.sha1(os.path.abspath(page["path"]).encode("utf-8")).hexdigest()[:8]
+        trace_name = f"{os.path.basename(page['path'])}.{path_hash}.p{page.get('page_number', 1)}.trace.json"
+        trace_path = os.path.join(self.trace_dir, trace_name)
+        with open(trace_path, "w") as f:
+            json.dump(record, f, indent=2)
+        self.trace_summary.add(record)
+        return record
+
+    def decode_image(self, image_bytes: bytes, image_path: str) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """
+        Decode an image according to the decode mode
+        
+        In "reduced" mode the image is decoded in grayscale with the largest
+        IMREAD_REDUCED_* factor that keeps it at least MAX_DIMENSION pixels
+        along its longer side, which avoids decoding pixels that
+        preprocess_large_image would throw away.
+        
+        Args:
+            image_bytes: Encoded image file content
+            image_path: Path the bytes were read from, for error messages
             
-        return extracted_data
+        Returns:
+            Tuple of (decoded image, (width, height) of the original image)
+        """
+        buffer = np.frombuffer(image_bytes, np.uint8)
+        if self.decode_mode == "full":
+            image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+            if image is None:
+                raise ValueError(f"Could not read image file: {image_path}")
+            return image, (image.shape[1], image.shape[0])
+
+        size = read_image_size(image_bytes)
+        flags = cv2.IMREAD_GRAYSCALE
+        if size is not None:
+            for factor in sorted(REDUCED_GRAYSCALE_FLAGS, reverse=True):
+                if max(size) / factor >= self.MAX_DIMENSION:
+                    flags = REDUCED_GRAYSCALE_FLAGS[factor]
+                    print(f"Decoding at 1/{factor} resolution")
+                    break
+
+        image = cv2.imdecode(buffer, flags)
+        if image is None:
+            raise ValueError(f"Could not read image file: {image_path}")
+        if size is None:
+            size = (image.shape[1], image.shape[0])
+        return image, size
 
     def preprocess_large_image(self, image: np.ndarray) -> np.ndarray:
         """
         Specialized preprocessing for large format images like A3
         
         Args:
-            image: OpenCV image object
+            image: OpenCV image object (BGR or grayscale)
             
         Returns:
             Preprocessed image
         """
+        trace = current_trace()
+
         # Calculate scaling factor based on image size
         height, width = image.shape[:2]
-        max_dimension = 3000  # Limit max dimension for better processing
+        max_dimension = self.MAX_DIMENSION  # Limit max dimension for better processing
         
         # Only scale if needed
         if height > max_dimension or width > max_dimension:
             scale_factor = max_dimension / max(height, width)
             new_width = int(width * scale_factor)
             new_height = int(height * scale_factor)
-            image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_AREA)
+            with trace.stage("resize"):
+                resized = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_AREA)
+            trace.track_images(image, resized)
+            image = resized
             print(f"Resized image to: {new_width}x{new_height} pixels")
             
         # Apply additional preprocessing specific to large format images
         # Enhance contrast
-        lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
-        l, a, b = cv2.split(lab)
-        clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-        l = clahe.apply(l)
-        lab = cv2.merge((l, a, b))
-        image = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
+        with trace.stage("clahe"):
+            clahe = cv2.createCLAHE(clipLimit=self.CLAHE_CLIP_LIMIT, tileGridSize=self.CLAHE_TILE_GRID_SIZE)
+            if image.ndim == 2:
+                # Grayscale decode: enhance the single channel directly
+                return clahe.apply(image)
+
+            lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
+            l, a, b = cv2.split(lab)
+            l = clahe.apply(l)
+            lab = cv2.merge((l, a, b))
+            image = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
         
         return image
 
@@ -126,111 +779,202 @@ class InvoiceExporter:
         Returns:
             Dictionary containing extracted table data
         """
-        # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        
-        # Apply adaptive thresholding with optimized parameters
-        thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                      cv2.THRESH_BINARY_INV, 15, 5)
-        
-        # Dilate to connect text in cells
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
-        dilated = cv2.dilate(thresh, kernel, iterations=2)
-        
-        # Find contours
-        contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        return self._extract_table(image)[0]
+
+    def _extract_table(self, image: np.ndarray,
+                       full_res: Optional[FullResolutionCrops] = None) -> Tuple[Dict[str, Any], List[List[str]]]:
+        """Table extraction returning the data and the per-cell OCR text"""
+        image, rotated = self.straighten_image(image)
+        if rotated:
+            full_res = None
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        regions = self.locate_regions(gray)
+        gray, rows = self.detect_table_cells(gray, regions["table"])
+        extracted_data, table_text = self._read_table(gray, rows, full_res=full_res)
+        extracted_data.update(self.read_header_fields(gray, regions["header"], full_res=full_res))
+        return extracted_data, table_text
+
+    def straighten_image(self, image: np.ndarray) -> Tuple[np.ndarray, bool]:
+        """
+        Deskew stage: put sideways pages upright and remove small skew
         
-        # Filter contours to get table cells (eliminate too small contours)
-        min_cell_area = image.shape[0] * image.shape[1] / 400  # More adaptive threshold
-        cells = []
+        Args:
+            image: OpenCV image object (BGR or grayscale)
+            
+        Returns:
+            Tuple of (corrected image, whether it was rotated); the image is
+            returned unchanged when deskewing is disabled or not needed
+        """
+        if not self.deskew:
+            return image, False
+
+        trace = current_trace()
+        with trace.stage("deskew"):
+            corrected, turn, angle = straighten_page(image)
+        if turn is not None:
+            print("Turned sideways page upright")
+            trace.count("quarterTurns")
+        if angle:
+            print(f"Corrected skew of {angle:.2f} degrees")
+            trace.count("deskewed")
+        trace.track_images(image, corrected)
+        return corrected, turn is not None or bool(angle)
+
+    def locate_regions(self, gray: np.ndarray) -> Dict[str, Optional[tuple]]:
+        """
+        Localisation stage: find the line-item table and the header block
         
-        for contour in contours:
-            x, y, w, h = cv2.boundingRect(contour)
-            area = w * h
+        Args:
+            gray: Grayscale page
             
-            # Filter out noise and keep only cell-like rectangles
-            # Adjusted thresholds for better detection on various paper sizes
-            if area > min_cell_area and w > 20 and h > 15:
-                # Add padding to make sure we capture entire cell content
-                padding = 5  # Increased padding
-                x_with_padding = max(0, x - padding)
-                y_with_padding = max(0, y - padding)
-                w_with_padding = min(image.shape[1] - x_with_padding, w + 2*padding)
-                h_with_padding = min(image.shape[0] - y_with_padding, h + 2*padding)
-                
-                cells.append((x_with_padding, y_with_padding, w_with_padding, h_with_padding))
+        Returns:
+            Dictionary with "table" and "header" (x, y, w, h) boxes, None
+            where a region was not found or localisation is disabled
+        """
+        if not self.localize_regions:
+            return {"table": None, "header": None}
+
+        trace = current_trace()
+        with trace.stage("localise"):
+            regions = locate_page_regions(gray)
+        if regions["table"] is not None:
+            trace.count("tableRegions")
+        return regions
+
+    def read_header_fields(self, gray: np.ndarray, header_box: Optional[tuple],
+                           full_res: Optional[FullResolutionCrops] = None) -> Dict[str, str]:
+        """
+        OCR the header block once and parse the invoice number and date
         
-        # Sort cells by y-coordinate to group rows
-        cells.sort(key=lambda c: c[1])
+        Args:
+            gray: Grayscale page
+            header_box: (x, y, w, h) of the header block, or None
+            full_res: Full-resolution source when gray is a reduced decode,
+                used when the header's text lines are shorter than
+                MIN_CELL_OCR_HEIGHT
+            
+        Returns:
+            The header fields found; empty if there is no header block or
+            no OCR engine, so the generated defaults are kept
+        """
+        if header_box is None or not self.ocr_available:
+            return {}
+
+        x, y, w, h = header_box
+        with current_trace().stage("header_ocr"):
+            header = gray[y:y+h, x:x+w]
+            # Like cells, re-crop only if the text lines are too short for OCR
+            # here, as the re-crop decodes the whole page
+            lines = LayoutRegistry.text_lines(header) if full_res is not None else []
+            if lines and np.median([bottom - top for top, bottom in lines]) < self.MIN_CELL_OCR_HEIGHT:
+                current_trace().count("fullResolutionCells")
+                header = full_res.crop(x, y, w, h, gray.shape)
+            fields = parse_header_fields(self.ocr.image_to_string(header, config=self.HEADER_OCR_CONFIG))
+        current_trace().count("headerFields", len(fields))
+        return fields
+
+    def detect_table_cells(self, image: np.ndarray,
+                           table_box: Optional[tuple] = None) -> Tuple[np.ndarray, List[List[tuple]]]:
+        """
+        Locate table cells without running any OCR
         
-        # Group cells into rows based on y-position
-        # Increased y_tolerance for better detection in various formats
-        y_tolerance = image.shape[0] / 25
-        rows = []
-        current_row = []
+        With the layout cache enabled, pages matching a known layout reuse
+        its aligned columns, cut along the page's own text lines, and newly
+        detected layouts are learned.
         
-        if cells:
-            current_row = [cells[0]]
-            prev_y = cells[0][1]
+        Args:
+            image: OpenCV image object (BGR or grayscale)
+            table_box: (x, y, w, h) of the located table; thresholding and
+                contour search then run inside it only, falling back to the
+                whole page if fewer than MIN_ROI_TABLE_ROWS rows are found
             
-            for i in range(1, len(cells)):
-                x, y, w, h = cells[i]
-                
-                # If this cell is on a new row
-                if abs(y - prev_y) > y_tolerance:
-                    # Sort current row by x-coordinate
-                    current_row.sort(key=lambda c: c[0])
-                    rows.append(current_row)
-                    current_row = [cells[i]]
-                    prev_y = y
-                else:
-                    current_row.append(cells[i])
+        Returns:
+            Tuple of (grayscale page, cell rectangles grouped into rows)
+        """
+        trace = current_trace()
+
+        # Convert to grayscale
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+        if self.layouts is not None:
+            with trace.stage("layout_match"):
+                rows = self.layouts.match(gray, table_box)
+            if rows is not None:
+                trace.count("layoutHits")
+                return gray, rows
+            trace.count("layoutMisses")
+
+        rows = None
+        if table_box is not None:
+            rows = self._find_table_rows(gray, table_box)
+            if len(rows) < self.MIN_ROI_TABLE_ROWS:
+                trace.count("tableRegionMisses")
+                rows = table_box = None
+        if rows is None:
+            rows = self._find_table_rows(gray, (0, 0, gray.shape[1], gray.shape[0]))
+
+        if self.layouts is not None and rows:
+            with trace.stage("layout_learn"):
+                self.layouts.learn(gray, rows, self.assign_columns(rows), table_box)
+        return gray, rows
+
+    def _find_table_rows(self, gray: np.ndarray, box: tuple) -> List[List[tuple]]:
+        """Threshold and contour search inside box, returning page-coordinate cells in rows"""
+        trace = current_trace()
+        x, y, w, h = box
+        region = gray[y:y+h, x:x+w]
+
+        with trace.stage("threshold"):
+            # Apply adaptive thresholding with optimized parameters
+            thresh = cv2.adaptiveThreshold(region, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+                                          cv2.THRESH_BINARY_INV, 15, 5)
             
-            # Add the last row
-            if current_row:
-                current_row.sort(key=lambda c: c[0])
-                rows.append(current_row)
+            # Dilate to connect text in cells
+            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
+            dilated = cv2.dilate(thresh, kernel, iterations=2)
+        trace.track_images(gray, thresh, dilated)
         
+        with trace.stage("contours"):
+            # Find cell rectangles, sized relative to the whole page, and
+            # move them to page coordinates
+            cells = self.find_cell_boxes(dilated, padding=self.CELL_PADDING,
+                                         min_cell_area=gray.shape[0] * gray.shape[1] / 400)
+            cells[:, 0] += x
+            cells[:, 1] += y
+            
+            rows = self.group_cells_into_rows(cells)
+        trace.count("cellsFound", len(cells))
+        return rows
+
+    def _read_table(self, gray: np.ndarray, rows: List[List[tuple]],
+                    full_res: Optional[FullResolutionCrops] = None) -> Tuple[Dict[str, Any], List[List[str]]]:
+        """OCR detected cells and map them to item fields, tagged with the quality tier"""
         # Parse table content using OCR if available
         items = []
         headers = []
-        
-        # Extract text from each cell with enhanced preprocessing
-        for i, row in enumerate(rows):
-            row_data = []
-            
-            for j, (x, y, w, h) in enumerate(row):
-                # Extract cell ROI
-                cell_image = gray[y:y+h, x:x+w]
-                
-                # Preprocess cell for better OCR
-                # Enhanced preprocessing for better OCR results
-                cell_image = cv2.GaussianBlur(cell_image, (3, 3), 0)
-                _, cell_binary = cv2.threshold(cell_image, 0, 255, 
-                                              cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-                
-                # Noise removal
-                kernel = np.ones((1, 1), np.uint8)
-                cell_binary = cv2.morphologyEx(cell_binary, cv2.MORPH_OPEN, kernel)
-                
-                # Apply OCR to the cell with optimized config for tabular data
-                if self.ocr_available:
-                    config = r'--oem 3 --psm 6 -c tessedit_char_whitelist="0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz+-=.,;:/%$()\'"'
-                    text = self.pytesseract.image_to_string(cell_binary, config=config).strip()
-                else:
-                    # If OCR isn't available, use cell position as placeholder
-                    text = f"Cell_{i}_{j}"
-                
-                row_data.append(text)
-            
+
+        # Column of every cell, so rows with missing cells keep their fields aligned
+        columns = self.assign_columns(rows)
+
+        if self.ocr_available and self.table_ocr_mode == "table":
+            table_text = self.ocr_table_region(gray, rows)
+        else:
+            table_text = self.ocr_table_cells(gray, rows, full_res=full_res, columns=columns)
+
+        for i, row_data in enumerate(table_text):
             if i == 0:  # First row is likely headers
                 headers = row_data
             else:  # Other rows are data
                 # Create item dictionary based on likely column meanings
                 item = {}
                 
+                # Cells sharing a column (e.g. a description split into blobs) are joined
+                row_columns = {}
+                for j, cell_text in zip(columns[i], row_data):
+                    row_columns[j] = f"{row_columns[j]} {cell_text}".strip() if j in row_columns else cell_text
+                
                 # Try to match data with common invoice fields
-                for j, cell_text in enumerate(row_data):
+                for j, cell_text in row_columns.items():
                     col_name = f"col_{j}" if j >= len(headers) else headers[j]
                     
                     # Map to standard fields based on typical invoice structure
@@ -263,78 +1007,346 @@ class InvoiceExporter:
             "date": pd.Timestamp.now().strftime('%Y-%m-%d'),
             "stateName": "Extracted from Image",
             "termsOfDelivery": "Standard",
+            "qualityTier": self.quality_tier,
             "items": items
-        }
+        }, table_text
 
-    def advanced_ocr_extraction(self, image: np.ndarray) -> Dict[str, Any]:
+    @staticmethod
+    def find_cell_boxes(dilated: np.ndarray, padding: int = 5,
+                        min_cell_area: Optional[float] = None) -> np.ndarray:
         """
-        Advanced OCR extraction for images where table detection fails
-        Uses full-page OCR and attempts to parse structured data
+        Find cell-like rectangles in a binary image
+        
+        Equivalent to the bounding rectangles of the external contours, but
+        computed from connected-component statistics so the work happens in
+        array operations rather than a Python loop over contours.
         
         Args:
-            image: OpenCV image object
+            dilated: Binary image with text dilated into blobs
+            padding: Pixels added around each rectangle
+            min_cell_area: Smallest blob area kept; defaults to 1/400 of
+                the image area
             
         Returns:
-            Dictionary containing extracted data
+            Array of shape (n, 4) holding padded (x, y, w, h) rectangles
         """
-        if not self.ocr_available:
-            print("Advanced OCR requires pytesseract")
-            return {"items": []}
+        height, width = dilated.shape[:2]
         
-        # Preprocess image for better OCR
-        # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        # Fill holes so nested blobs merge into their enclosing outline,
+        # matching what RETR_EXTERNAL contours would report
+        background = cv2.copyMakeBorder(dilated, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+        cv2.floodFill(background, None, (0, 0), 255)
+        solid = cv2.bitwise_or(dilated, cv2.bitwise_not(background[1:-1, 1:-1]))
         
-        # Apply adaptive thresholding
-        binary = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                    cv2.THRESH_BINARY, 11, 5)
+        _, _, stats, _ = cv2.connectedComponentsWithStats(solid, connectivity=8)
+        boxes = stats[1:, :4].astype(np.int64)  # Skip the background label
+        x, y, w, h = boxes.T
         
-        # Denoise
-        denoised = cv2.fastNlMeansDenoising(binary, None, 10, 7, 21)
+        # Filter out noise and keep only cell-like rectangles
+        # Adjusted thresholds for better detection on various paper sizes
+        if min_cell_area is None:
+            min_cell_area = height * width / 400  # More adaptive threshold
+        keep = (w * h > min_cell_area) & (w > 20) & (h > 15)
+        x, y, w, h = x[keep], y[keep], w[keep], h[keep]
         
-        # Extract text using pytesseract in different modes for comparison
-        config_line = r'--oem 3 --psm 6'  # Assume line-by-line text
-        text_line = self.pytesseract.image_to_string(denoised, config=config_line)
+        # Add padding to make sure we capture entire cell content
+        x_with_padding = np.maximum(0, x - padding)
+        y_with_padding = np.maximum(0, y - padding)
+        w_with_padding = np.minimum(width - x_with_padding, w + 2 * padding)
+        h_with_padding = np.minimum(height - y_with_padding, h + 2 * padding)
         
-        config_table = r'--oem 3 --psm 6 -c preserve_interword_spaces=1'  # Better for tables
-        text_table = self.pytesseract.image_to_string(denoised, config=config_table)
+        return np.stack([x_with_padding, y_with_padding, w_with_padding, h_with_padding], axis=1)
+
+    @staticmethod
+    def group_cells_into_rows(cells: np.ndarray, y_gap: Optional[float] = None) -> List[List[tuple]]:
+        """
+        Group cell rectangles into rows ordered top to bottom, left to right
         
-        # Attempt to parse the extracted text into structured data
-        items = []
+        Cells are sorted by their vertical centre and a new row starts
+        wherever two consecutive centres are more than y_gap apart, so the
+        split points do not depend on which cell happens to open a row.
         
-        # Split text into lines and look for patterns that resemble invoice items
-        lines = text_line.split('\n')
-        current_item = {}
+        Args:
+            cells: Array of (x, y, w, h) rectangles
+            y_gap: Smallest vertical gap between the centres of two rows;
+                defaults to half the median cell height
+            
+        Returns:
+            Rows of (x, y, w, h) tuples
+        """
+        if len(cells) == 0:
+            return []
+        if y_gap is None:
+            y_gap = float(np.median(cells[:, 3])) / 2
         
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
+        centres = cells[:, 1] + cells[:, 3] / 2
+        order = np.argsort(centres, kind="stable")
+        cells, centres = cells[order], centres[order]
+        
+        # Row boundaries at the gaps between consecutive centres
+        starts = np.flatnonzero(np.diff(centres) > y_gap) + 1
+        row_ids = np.zeros(len(cells), dtype=np.int64)
+        row_ids[starts] = 1
+        row_ids = np.cumsum(row_ids)
+        
+        # Sort by row, then by x within each row
+        cells = cells[np.lexsort((cells[:, 0], row_ids))]
+        
+        return [[tuple(int(v) for v in cell) for cell in row]
+                for row in np.split(cells, starts)]
+
+    @staticmethod
+    def assign_columns(rows: List[List[tuple]], x_gap: Optional[float] = None) -> List[List[int]]:
+        """
+        Cluster the x-starts of all cells into table columns
+        
+        The x-starts are sorted and a new column starts wherever two
+        consecutive values are more than x_gap apart.
+        
+        Args:
+            rows: Cell rectangles (x, y, w, h) grouped into rows
+            x_gap: Smallest horizontal gap between two columns' x-starts;
+                defaults to the median cell height
+            
+        Returns:
+            Column index of every cell, numbered left to right, in the
+            same nesting as rows
+        """
+        cells = np.array([cell for row in rows for cell in row], dtype=np.float64).reshape(-1, 4)
+        if len(cells) == 0:
+            return [[] for _ in rows]
+        if x_gap is None:
+            x_gap = float(np.median(cells[:, 3]))
+        
+        order = np.argsort(cells[:, 0], kind="stable")
+        breaks = np.zeros(len(cells), dtype=np.int64)
+        breaks[1:] = np.diff(cells[order, 0]) > x_gap
+        column_ids = np.empty(len(cells), dtype=np.int64)
+        column_ids[order] = np.cumsum(breaks)
+        
+        bounds = np.cumsum([0] + [len(row) for row in rows])
+        return [column_ids[a:b].tolist() for a, b in zip(bounds[:-1], bounds[1:])]
+
+    def ocr_table_cells(self, gray: np.ndarray, rows: List[List[tuple]],
+                        full_res: Optional[FullResolutionCrops] = None,
+                        columns: Optional[List[List[int]]] = None) -> List[List[str]]:
+        """
+        OCR every table cell separately
+
+        Cells are triaged first: blank cells become "" without OCR, and
+        cells of NUMERIC_COLUMNS below the header row are read with the
+        cheaper NUMERIC_OCR_CONFIG.
+
+        Args:
+            gray: Grayscale page image
+            rows: Cell rectangles (x, y, w, h) grouped into rows
+            full_res: Full-resolution source for cells whose unpadded
+                height is below MIN_CELL_OCR_HEIGHT when gray is a reduced decode
+            columns: Column index of every cell, from assign_columns;
+                defaults to the position of the cell in its row
+
+        Returns:
+            Cell texts grouped into rows, in the same order as rows
+        """
+        table_text = []
+        trace = current_trace()
+
+        # Extract text from each cell with enhanced preprocessing
+        for i, row in enumerate(rows):
+            row_data = []
+
+            for j, (x, y, w, h) in enumerate(row):
+                if not self.ocr_available:
+                    # If OCR isn't available, use cell position as placeholder
+                    trace.count("cellsSkipped")
+                    row_data.append(f"Cell_{i}_{j}")
+                    continue
+
+                with trace.stage("cell_ocr"):
+                    # Triage the raw crop, so blank cells skip the re-crop
+                    # and preprocessing as well as OCR
+                    cell_image = gray[y:y+h, x:x+w]
+                    if self.is_blank_cell(cell_image):
+                        trace.count("cellsSkipped")
+                        row_data.append("")
+                        continue
+
+                    # Re-crop from the full-resolution page if the reduced
+                    # one leaves too few pixels for OCR
+                    if full_res is not None and h - 2 * self.CELL_PADDING < self.MIN_CELL_OCR_HEIGHT:
+                        trace.count("fullResolutionCells")
+                        cell_image = full_res.crop(x, y, w, h, gray.shape)
+                    
+                    # Preprocess cell for better OCR
+                    # Enhanced preprocessing for better OCR results
+                    cell_image = cv2.GaussianBlur(cell_image, (3, 3), 0)
+                    _, cell_binary = cv2.threshold(cell_image, 0, 255, 
+                                                  cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+                    
+                    # Noise removal
+                    kernel = np.ones((1, 1), np.uint8)
+                    cell_binary = cv2.morphologyEx(cell_binary, cv2.MORPH_OPEN, kernel)
+                    
+                    if i > 0 and (columns[i][j] if columns is not None else j) in self.NUMERIC_COLUMNS:
+                        trace.count("numericCells")
+                        text = self.ocr.image_to_string(cell_binary, config=self.NUMERIC_OCR_CONFIG).strip()
+                    else:
+                        # Apply OCR to the cell with optimized config for tabular data
+                        text = self.ocr.image_to_string(cell_binary, config=self.TABLE_OCR_CONFIG).strip()
                 
-            # Try to identify lines that contain item details
-            if any(keyword in line.lower() for keyword in ['item', 'description', 'quantity', 'price', 'amount']):
-                # This might be a header line, skip
+                row_data.append(text)
+
+            table_text.append(row_data)
+
+        return table_text
+
+    def is_blank_cell(self, cell_image: np.ndarray) -> bool:
+        """
+        Ink-density check for a cell, with the exporter's thresholds
+        
+        Args:
+            cell_image: Grayscale cell crop
+            
+        Returns:
+            True if the cell holds no text worth OCRing
+        """
+        return cell_triage.is_blank_cell(cell_image, min_contrast=self.BLANK_CELL_MIN_CONTRAST,
+                                         ink_ratio=self.BLANK_CELL_INK_RATIO)
+
+    def ocr_table_region(self, gray: np.ndarray, rows: List[List[tuple]]) -> List[List[str]]:
+        """
+        OCR the whole table region in a single pass and assign each
+        recognised word to the cell containing its centre
+
+        Args:
+            gray: Grayscale page image
+            rows: Cell rectangles (x, y, w, h) grouped into rows
+
+        Returns:
+            Cell texts grouped into rows, in the same order as rows
+        """
+        cells = [cell for row in rows for cell in row]
+        if not cells:
+            return []
+
+        # Crop to the bounding box of all cells
+        x0 = min(x for x, y, w, h in cells)
+        y0 = min(y for x, y, w, h in cells)
+        x1 = max(x + w for x, y, w, h in cells)
+        y1 = max(y + h for x, y, w, h in cells)
+        region = gray[y0:y1, x0:x1]
+
+        # Same preprocessing as the per-cell path, applied once
+        region = cv2.GaussianBlur(region, (3, 3), 0)
+        _, region_binary = cv2.threshold(region, 0, 255,
+                                         cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+        with current_trace().stage("table_ocr"):
+            data = self.ocr.image_to_data(region_binary, config=self.TABLE_OCR_CONFIG)
+
+        # Cell rectangles as arrays plus their (row, column) positions
+        boxes = np.array(cells, dtype=np.float64)
+        positions = [(i, j) for i, row in enumerate(rows) for j in range(len(row))]
+        centres_x = boxes[:, 0] + boxes[:, 2] / 2
+        centres_y = boxes[:, 1] + boxes[:, 3] / 2
+
+        # Words per cell, keyed by (row index, column index), as lines of words
+        cell_words: Dict[tuple, Dict[tuple, List[str]]] = {}
+        for k, word in enumerate(data["text"]):
+            word = str(word).strip()
+            if not word or float(data["conf"][k]) < 0:
                 continue
-                
-            # Look for patterns like: ItemCode Description Qty Price Amount
-            parts = line.split()
-            if len(parts) >= 5:  # Assuming at least 5 parts for a valid item line
-                try:
-                    # Try to parse an item based on positional data
-                    # This is a simplified approach; real invoices vary widely
-                    item = {
-                        "partNo": parts[0],
-                        "description": ' '.join(parts[1:-3]),  # Middle parts are usually description
-                        "hsn": "",
-                        "quantity": parts[-3],  # Quantity often 3rd from end
-                        "rate": parts[-2],      # Rate often 2nd from end
-                        "per": "Nos.",
-                        "discountPercentage": "",
-                        "amount": parts[-1]     # Amount usually last
-                    }
-                    items.append(item)
-                except Exception as e:
-                    print(f"Error parsing line: {line}, {str(e)}")
+
+            cx = x0 + data["left"][k] + data["width"][k] / 2
+            cy = y0 + data["top"][k] + data["height"][k] / 2
+
+            # Padded cells can overlap, so pick the containing cell whose
+            # centre is closest to the word centre
+            inside = ((boxes[:, 0] <= cx) & (cx < boxes[:, 0] + boxes[:, 2]) &
+                      (boxes[:, 1] <= cy) & (cy < boxes[:, 1] + boxes[:, 3]))
+            if not inside.any():
+                continue
+            dist = np.where(inside, (centres_x - cx) ** 2 + (centres_y - cy) ** 2, np.inf)
+            best = positions[int(np.argmin(dist))]
+
+            line_key = (data["block_num"][k], data["par_num"][k], data["line_num"][k])
+            cell_words.setdefault(best, {}).setdefault(line_key, []).append(word)
+
+        table_text = []
+        for i, row in enumerate(rows):
+            row_data = []
+            for j in range(len(row)):
+                lines = cell_words.get((i, j), {})
+                row_data.append("\n".join(" ".join(words) for words in lines.values()))
+            table_text.append(row_data)
+
+        return table_text
+
+    def advanced_ocr_extraction(self, image: np.ndarray,
+                                quality_tier: Optional[str] = None,
+                                cancel: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """
+        Advanced OCR extraction for images where table detection fails
+        Uses full-page OCR and attempts to parse structured data
+        
+        Args:
+            image: OpenCV image object
+            quality_tier: Overrides the exporter's quality tier for this call
+            cancel: Event that stops the extraction, with RouteCancelled,
+                before its next preprocessing or OCR step
+            
+        Returns:
+            Dictionary containing extracted data, including the quality tier used
+        """
+        quality_tier = quality_tier or self.quality_tier
+        if quality_tier not in self.QUALITY_TIERS:
+            raise ValueError(f"Unknown quality tier: {quality_tier}")
+        tier = self.QUALITY_TIERS[quality_tier]
+
+        if not self.ocr_available:
+            print("Advanced OCR requires an OCR engine")
+            return {"items": [], "qualityTier": quality_tier}
+        
+        trace = current_trace()
+
+        check_cancelled(cancel)
+        with trace.stage("fallback_preprocess"):
+            # Preprocess image for better OCR
+            # Convert to grayscale
+            gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            
+            # Apply adaptive thresholding
+            binary = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+                                        cv2.THRESH_BINARY, 11, 5)
+            
+            # Denoise according to the tier
+            if tier["denoiser"] == "nlmeans":
+                denoised = cv2.fastNlMeansDenoising(binary, None, 10, 7, 21)
+            elif tier["denoiser"] == "median":
+                denoised = cv2.medianBlur(binary, 3)
+            else:
+                denoised = binary
+        trace.track_images(image, gray, binary, denoised)
+        
+        # Extract text; the second pass keeps column spacing, which helps tables
+        configs = [
+            f"--oem 3 --psm {tier['psm']}",
+            f"--oem 3 --psm {tier['psm']} -c preserve_interword_spaces=1",
+        ][:tier["passes"]]
+        texts = []
+        for config in configs:
+            check_cancelled(cancel)
+            with trace.stage("fallback_ocr"):
+                texts.append(self.ocr.image_to_string(denoised, config=config))
+        
+        # Keep the pass that parses into the most items
+        items = []
+        text_line = texts[0]
+        for text in texts:
+            parsed = self._parse_ocr_item_lines(text)
+            if len(parsed) > len(items):
+                items = parsed
+                text_line = text
         
         if not items:  # Fallback
             print("Basic parsing failed, using simplified extraction")
@@ -360,23 +1372,137 @@ class InvoiceExporter:
             "date": pd.Timestamp.now().strftime('%Y-%m-%d'),
             "stateName": "Extracted with Advanced OCR",
             "termsOfDelivery": "Standard",
+            "qualityTier": quality_tier,
             "items": items
         }
 
+    @staticmethod
+    def _parse_ocr_item_lines(text: str) -> List[Dict[str, Any]]:
+        """Parse full-page OCR text into items, one per item-like line"""
+        items = []
+        
+        # Split text into lines and look for patterns that resemble invoice items
+        for line in text.split('\n'):
+            line = line.strip()
+            if not line:
+                continue
+                
+            # Try to identify lines that contain item details
+            if any(keyword in line.lower() for keyword in ['item', 'description', 'quantity', 'price', 'amount']):
+                # This might be a header line, skip
+                continue
+                
+            # Look for patterns like: ItemCode Description Qty Price Amount
+            parts = line.split()
+            if len(parts) >= 5:  # Assuming at least 5 parts for a valid item line
+                # Try to parse an item based on positional data
+                # This is a simplified approach; real invoices vary widely
+                items.append({
+                    "partNo": parts[0],
+                    "description": ' '.join(parts[1:-3]),  # Middle parts are usually description
+                    "hsn": "",
+                    "quantity": parts[-3],  # Quantity often 3rd from end
+                    "rate": parts[-2],      # Rate often 2nd from end
+                    "per": "Nos.",
+                    "discountPercentage": "",
+                    "amount": parts[-1]     # Amount usually last
+                })
+        
+        return items
+
+def pdf_page_count(pdf_path: str, poppler_path: Optional[str] = None) -> int:
+    """Number of pages of a PDF, read with pdfinfo"""
+    from pdf2image import pdfinfo_from_path
+
+    return pdfinfo_from_path(pdf_path, poppler_path=poppler_path)["Pages"]
+
+
+def iter_pdf_pages(pdf_path: str, dpi: int = PDF_DPI, poppler_path: Optional[str] = None,
+                   window: int = 1, first_page: int = 1,
+                   last_page: Optional[int] = None) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Render PDF pages lazily, a window of pages at a time
+    
+    Pages are decoded from poppler's output in memory (no temporary files),
+    so only `window` rendered pages are held at once.
+    
+    Args:
+        pdf_path: Path to the PDF
+        dpi: Rendering resolution
+        poppler_path: Directory of the poppler binaries, if not on PATH
+        window: Number of pages rendered per poppler call
+        first_page, last_page: 1-based page range; last_page defaults to
+            the last page of the document
+        
+    Returns:
+        Iterator of (page number, BGR image)
+    """
+    from pdf2image import convert_from_path
+
+    if last_page is None:
+        last_page = pdf_page_count(pdf_path, poppler_path=poppler_path)
+
+    for start in range(first_page, last_page + 1, window):
+        end = min(start + window - 1, last_page)
+        pages = convert_from_path(pdf_path, dpi=dpi, poppler_path=poppler_path,
+                                  first_page=start, last_page=end)
+        for offset, rendered in enumerate(pages):
+            image = cv2.cvtColor(np.asarray(rendered.convert("RGB")), cv2.COLOR_RGB2BGR)
+            rendered.close()
+            yield start + offset, image
+        del pages
+
+
+def combine_page_results(page_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge the extraction results of a document's pages into one invoice
+    
+    Header fields come from the first page; items of all pages are
+    concatenated and their invalidItems indices shifted to match.
+    
+    Args:
+        page_results: Results of the pages, in page order
+        
+    Returns:
+        The combined invoice data, with the number of pages under "pages"
+    """
+    if not page_results:
+        return {"items": [], "invalidItems": [], "pages": 0}
+
+    combined = dict(page_results[0], items=[], invalidItems=[], pages=len(page_results))
+    for result in page_results:
+        offset = len(combined["items"])
+        combined["invalidItems"].extend(offset + index for index in result.get("invalidItems", []))
+        combined["items"].extend(result.get("items", []))
+    return combined
+
+
 def process_file(file_path: str, exporter: InvoiceExporter) -> Dict[str, Any]:
     """
-    Process a file (image or PDF) and extract invoice data
+    Process a file (image, PDF or JSON) and extract invoice data
     
     Args:
         file_path: Path to the file
         exporter: InvoiceExporter instance
         
     Returns:
-        Dictionary containing extracted data
+        Dictionary containing extracted data; empty for unsupported files
     """
-    # ... keep existing code (file processing)
+    ext = os.path.splitext(file_path)[1].lower()
+
+    if ext in IMAGE_EXTENSIONS:
+        return exporter.extract_data_from_image(file_path)
+    if ext == '.pdf':
+        return exporter.extract_data_from_pdf(file_path)
+    if ext == '.json':
+        with open(file_path, 'r') as f:
+            return json.load(f)
+
+    print(f"Unsupported file type: {ext}")
+    return {}
 
 def main():
+    """Command-line entry point"""
     # ... keep existing code (main function)
 
 if __name__ == "__main__":
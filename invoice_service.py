@@ -0,0 +1,306 @@
+import argparse
+import json
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional
+from urllib.parse import urlparse, parse_qs
+
+from invoice_export import InvoiceExporter, process_file
+
+SUPPORTED_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.tiff', '.bmp', '.pdf'}
+
+
+class Job:
+    """An uploaded document and the state of its extraction"""
+
+    def __init__(self, path: str, want_excel: bool):
+        self.id = uuid.uuid4().hex
+        self.path = path
+        self.want_excel = want_excel
+        self.status = "queued"
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.excel_path: Optional[str] = None
+        self.created = time.time()
+        self.finished: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        job = {"id": self.id, "status": self.status}
+        if self.result is not None:
+            job["result"] = self.result
+        if self.error is not None:
+            job["error"] = self.error
+        if self.excel_path is not None:
+            job["excel"] = f"/jobs/{self.id}/excel"
+        return job
+
+
+class ExtractionService:
+    """
+    Resident extraction service around one warm InvoiceExporter.
+
+    Uploads are queued with a bounded depth and processed by a fixed number
+    of worker threads sharing the exporter and its OCR engine pool. When the
+    queue is full, submissions are rejected instead of piling up.
+    """
+
+    def __init__(self, exporter: InvoiceExporter, queue_depth: int = 16, workers: int = 1,
+                 max_jobs: int = 1000):
+        """
+        Initialize the service and start its workers
+
+        Args:
+            exporter: Exporter reused for every job
+            queue_depth: Maximum number of jobs waiting to be processed
+            workers: Number of worker threads
+            max_jobs: Number of jobs kept for status lookups; the oldest
+                finished jobs are forgotten beyond this
+        """
+        self.exporter = exporter
+        self.queue = queue.Queue(maxsize=queue_depth)
+        self.max_jobs = max_jobs
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.upload_dir = tempfile.mkdtemp(prefix="invoice_service_")
+
+        self.workers = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def has_capacity(self) -> bool:
+        """Whether a new job would currently fit in the queue"""
+        return not self.queue.full()
+
+    def submit(self, filename: str, body: bytes, want_excel: bool = False) -> Optional[Job]:
+        """
+        Queue an uploaded document
+
+        The queue is checked before the upload is written to disk, so
+        rejected uploads cost no disk I/O.
+
+        Returns:
+            The queued job, or None if the queue is full
+        """
+        if not self.has_capacity():
+            return None
+
+        ext = os.path.splitext(filename)[1].lower()
+        fd, path = tempfile.mkstemp(suffix=ext, dir=self.upload_dir)
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+
+        job = Job(path, want_excel)
+        with self.lock:
+            self.jobs[job.id] = job
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            # Filled up by a concurrent submission since the check above
+            with self.lock:
+                del self.jobs[job.id]
+            os.remove(path)
+            return None
+
+        with self.lock:
+            self._forget_old_jobs()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def _forget_old_jobs(self):
+        """Drop the oldest finished jobs beyond max_jobs (caller holds the lock)"""
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                break
+            job = self.jobs[job_id]
+            if job.status in ("done", "error"):
+                del self.jobs[job_id]
+                if job.excel_path and os.path.exists(job.excel_path):
+                    os.remove(job.excel_path)
+
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            job.status = "running"
+            try:
+                job.result = process_file(job.path, self.exporter)
+                if job.want_excel:
+                    # Named after the job, as timestamps collide between concurrent jobs
+                    job.excel_path = self.exporter.create_manufacturing_excel(
+                        {"manufacturingTableData": [job.result]},
+                        output_dir=self.upload_dir, export_name=f"invoice_{job.id}")
+                job.status = "done"
+            except Exception as e:
+                job.error = str(e)
+                job.status = "error"
+            finally:
+                job.finished = time.time()
+                os.remove(job.path)
+                self.queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            statuses = [job.status for job in self.jobs.values()]
+        return {
+            "queued": self.queue.qsize(),
+            "queueDepth": self.queue.maxsize,
+            "workers": len(self.workers),
+            "running": statuses.count("running"),
+            "done": statuses.count("done"),
+            "error": statuses.count("error"),
+        }
+
+    def close(self):
+        shutil.rmtree(self.upload_dir, ignore_errors=True)
+        self.exporter.close()
+
+
+def make_handler(service: ExtractionService, max_upload_bytes: int, allowed_origin: Optional[str] = None):
+    """
+    Build the request handler class bound to a service
+
+    Args:
+        service: Service the requests are handled by
+        max_upload_bytes: Largest accepted upload
+        allowed_origin: Origin (e.g. "http://localhost:8080", or "*")
+            allowed to call the service from a browser; no CORS headers are
+            sent when None
+    """
+
+    class ExtractionRequestHandler(BaseHTTPRequestHandler):
+        """
+        POST    /jobs?filename=invoice.png[&excel=1]  upload (raw body) -> 202 with job id, 429 when busy
+        GET     /jobs/<id>                            job status and extracted data
+        GET     /jobs/<id>/excel                      generated Excel file
+        GET     /health                               queue statistics
+        OPTIONS any path                              CORS preflight
+        """
+
+        def end_headers(self):
+            if allowed_origin is not None:
+                self.send_header("Access-Control-Allow-Origin", allowed_origin)
+                self.send_header("Access-Control-Expose-Headers", "Location, Retry-After, Content-Disposition")
+                if allowed_origin != "*":
+                    self.send_header("Vary", "Origin")
+            super().end_headers()
+
+        def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_OPTIONS(self):
+            self.send_response(204)
+            self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
+            self.send_header("Access-Control-Allow-Headers", "Content-Type, X-Filename")
+            self.send_header("Access-Control-Max-Age", "600")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != "/jobs":
+                return self._send_json(404, {"error": "Not found"})
+
+            query = parse_qs(url.query)
+            filename = query.get("filename", [self.headers.get("X-Filename", "")])[0]
+            if os.path.splitext(filename)[1].lower() not in SUPPORTED_EXTENSIONS:
+                return self._send_json(400, {"error": "filename with a supported image or PDF extension required"})
+
+            length = int(self.headers.get("Content-Length", 0))
+            if length <= 0:
+                return self._send_json(400, {"error": "Empty upload"})
+            if length > max_upload_bytes:
+                return self._send_json(413, {"error": "Upload too large"})
+            if not service.has_capacity():
+                # Rejected before the body is read; drop the connection rather than drain it
+                self.close_connection = True
+                return self._send_json(429, {"error": "Extraction queue is full"}, {"Retry-After": "1"})
+
+            body = self.rfile.read(length)
+            want_excel = query.get("excel", ["0"])[0] in ("1", "true", "yes")
+            job = service.submit(filename, body, want_excel=want_excel)
+            if job is None:
+                return self._send_json(429, {"error": "Extraction queue is full"}, {"Retry-After": "1"})
+
+            self._send_json(202, job.to_dict(), {"Location": f"/jobs/{job.id}"})
+
+        def do_GET(self):
+            parts = urlparse(self.path).path.strip("/").split("/")
+            if parts == ["health"]:
+                return self._send_json(200, service.stats())
+            if len(parts) not in (2, 3) or parts[0] != "jobs":
+                return self._send_json(404, {"error": "Not found"})
+
+            job = service.get(parts[1])
+            if job is None:
+                return self._send_json(404, {"error": "Unknown job"})
+            if len(parts) == 2:
+                return self._send_json(200, job.to_dict())
+
+            if parts[2] != "excel":
+                return self._send_json(404, {"error": "Not found"})
+            if job.excel_path is None or not os.path.exists(job.excel_path):
+                return self._send_json(404 if job.status in ("done", "error") else 409,
+                                       {"error": "No Excel file for this job", "status": job.status})
+
+            with open(job.excel_path, "rb") as f:
+                payload = f.read()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+            self.send_header("Content-Disposition", f'attachment; filename="{os.path.basename(job.excel_path)}"')
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return ExtractionRequestHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Invoice extraction HTTP service')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+    parser.add_argument('--queue-depth', type=int, default=16,
+                        help='Maximum number of queued jobs before uploads get 429')
+    parser.add_argument('--workers', type=int, default=1, help='Number of extraction worker threads')
+    parser.add_argument('--ocr-pool-size', type=int, default=None,
+                        help='Number of resident OCR engines (default: one per worker)')
+    parser.add_argument('--max-upload-mb', type=float, default=50, help='Maximum upload size in MB')
+    parser.add_argument('--allowed-origin',
+                        help='Origin allowed to call the service from a browser (e.g. http://localhost:8080, or *)')
+    parser.add_argument('--layout-cache-size', type=int, default=64,
+                        help='Number of recurring page layouts whose table geometry is reused (0 disables)')
+    args = parser.parse_args()
+
+    exporter = InvoiceExporter(ocr_pool_size=args.ocr_pool_size or args.workers,
+                               layout_cache_size=args.layout_cache_size)
+    service = ExtractionService(exporter, queue_depth=args.queue_depth, workers=args.workers)
+    server = ThreadingHTTPServer((args.host, args.port),
+                                 make_handler(service, int(args.max_upload_mb * 1024 * 1024), args.allowed_origin))
+
+    print(f"Serving invoice extraction on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
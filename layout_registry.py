@@ -0,0 +1,259 @@
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class PageLayout:
+    """A learned page layout: its fingerprint and the table geometry found on it"""
+
+    def __init__(self, header_profile: np.ndarray, v_profile: np.ndarray, shape: Tuple[int, int],
+                 table_top: int, columns: List[Tuple[int, int]]):
+        self.header_profile = header_profile
+        self.v_profile = v_profile
+        self.shape = shape
+        self.table_top = table_top
+        self.columns = columns
+        self.hits = 0
+
+
+class LayoutRegistry:
+    """
+    Bounded registry of page layouts for recurring invoice templates.
+
+    A page is fingerprinted by the parts of a template that do not change
+    with the number of line items: the row ink profile of the header band
+    above the table, and the column profile of the vertical ruling lines.
+    A new page matches a stored layout when it has the same aspect ratio
+    and both profiles correlate with the layout's within a small shift; the
+    best shifts give the alignment correction.
+
+    A layout stores the table's column extents rather than its cells. On a
+    match, the text lines below the table top are found from a row ink
+    profile, and every line is cut into one cell per stored column, so
+    invoices of one template match whatever their number of items. Pages
+    without vertical ruling lines are not learned. Least recently matched
+    layouts are evicted first.
+    """
+
+    # Width of the downscaled copy used for fingerprints
+    PROFILE_WIDTH = 512
+    # Largest alignment shift searched, in downscaled pixels
+    MAX_SHIFT = 8
+    # Minimum profile correlation for a match
+    MIN_CORRELATION = 0.9
+    # Maximum relative aspect ratio difference for a match
+    MAX_ASPECT_DIFFERENCE = 0.02
+    # Shortest header band (in downscaled pixels) worth fingerprinting
+    MIN_HEADER_BAND = 2 * MAX_SHIFT
+    # Vertical ruling lines are at least this fraction of the page height
+    RULING_LINE_FRACTION = 0.05
+    # Padding added around cells cut from text lines, as in cell detection
+    CELL_PADDING = 5
+
+    def __init__(self, max_layouts: int = 64, min_cells: int = 4):
+        """
+        Initialize the registry
+
+        Args:
+            max_layouts: Number of layouts kept
+            min_cells: Pages with fewer detected cells are not learned
+        """
+        self.max_layouts = max_layouts
+        self.min_cells = min_cells
+        self.layouts: "OrderedDict[int, PageLayout]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _standardize(profile: np.ndarray) -> np.ndarray:
+        profile = profile.astype(np.float32)
+        return (profile - profile.mean()) / (profile.std() + 1e-6)
+
+    @classmethod
+    def fingerprint(cls, gray: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Row ink profile and vertical ruling-line profile of a grayscale page
+
+        Returns:
+            Tuple of (row profile of the whole page, standardized column
+            profile of the vertical ruling lines); the row profile is cut
+            to a layout's header band before comparing
+        """
+        height, width = gray.shape[:2]
+        small = cv2.resize(gray, (cls.PROFILE_WIDTH, max(1, round(height * cls.PROFILE_WIDTH / width))),
+                           interpolation=cv2.INTER_AREA)
+        _, ink = cv2.threshold(small, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+
+        line_length = max(3, round(small.shape[0] * cls.RULING_LINE_FRACTION))
+        vertical = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, line_length)))
+
+        return ink.mean(axis=1), cls._standardize(vertical.mean(axis=0))
+
+    @classmethod
+    def _best_shift(cls, profile: np.ndarray, template: np.ndarray) -> Tuple[float, int]:
+        """Highest correlation of profile with template over shifts, and that shift"""
+        best = (-1.0, 0)
+        n = min(len(profile), len(template))
+        for shift in range(-cls.MAX_SHIFT, cls.MAX_SHIFT + 1):
+            # profile[i + shift] lines up with template[i]
+            a = profile[max(0, shift):n + min(0, shift)]
+            b = template[max(0, -shift):n - max(0, shift)]
+            if len(a) < n // 2:
+                continue
+            correlation = float(np.dot(a - a.mean(), b - b.mean()) /
+                                (np.linalg.norm(a - a.mean()) * np.linalg.norm(b - b.mean()) + 1e-6))
+            if correlation > best[0]:
+                best = (correlation, shift)
+        return best
+
+    def match(self, gray: np.ndarray, table_box: Optional[tuple] = None) -> Optional[List[List[tuple]]]:
+        """
+        Look up the layout of a page
+
+        Args:
+            gray: Grayscale page
+            table_box: (x, y, w, h) of the located table; its bottom ends
+                the search for text lines, otherwise the page bottom does
+
+        Returns:
+            Cell rectangles cut from the page's text lines and the matched
+            layout's columns, aligned to this page, or None if no known
+            layout matches
+        """
+        height, width = gray.shape[:2]
+        row_profile, v_profile = self.fingerprint(gray)
+        if not v_profile.any():
+            return None
+
+        with self._lock:
+            candidates = list(reversed(self.layouts.items()))
+
+        for layout_id, layout in candidates:
+            aspect = (height / width) / (layout.shape[0] / layout.shape[1])
+            if abs(aspect - 1) > self.MAX_ASPECT_DIFFERENCE:
+                continue
+            band = len(layout.header_profile) + self.MAX_SHIFT
+            h_correlation, dy = self._best_shift(self._standardize(row_profile[:band]), layout.header_profile)
+            if h_correlation < self.MIN_CORRELATION:
+                continue
+            v_correlation, dx = self._best_shift(v_profile, layout.v_profile)
+            if v_correlation < self.MIN_CORRELATION:
+                continue
+
+            with self._lock:
+                if layout_id in self.layouts:
+                    self.layouts.move_to_end(layout_id)
+                layout.hits += 1
+            bottom = table_box[1] + table_box[3] if table_box is not None else height
+            return self._place(gray, layout, dx, dy, bottom)
+
+        return None
+
+    def _place(self, gray: np.ndarray, layout: PageLayout, dx: int, dy: int, bottom: int) -> List[List[tuple]]:
+        """Scale a layout's columns to a page and cut the page's text lines into cells"""
+        height, width = gray.shape[:2]
+        scale = width / layout.shape[1]
+        shift_x = dx * width / self.PROFILE_WIDTH
+        shift_y = dy * width / self.PROFILE_WIDTH
+
+        columns = []
+        for x, w in layout.columns:
+            x0 = min(max(0, int(round(x * scale + shift_x))), width - 1)
+            columns.append((x0, min(int(round(w * scale)), width - x0)))
+        top = min(max(0, int(round(layout.table_top * scale + shift_y))), height - 1)
+        left = columns[0][0]
+        right = max(x + w for x, w in columns)
+
+        pad = self.CELL_PADDING
+        rows = []
+        for line_top, line_bottom in self.text_lines(gray[top:bottom, left:right]):
+            y0 = max(0, top + line_top - pad)
+            y1 = min(height, top + line_bottom + pad)
+            rows.append([(x, y0, w, y1 - y0) for x, w in columns])
+        return rows
+
+    @staticmethod
+    def text_lines(region: np.ndarray, min_height: int = 3) -> List[Tuple[int, int]]:
+        """
+        Vertical extents of the text lines in a table region
+
+        Ruling lines are removed first, so only text ink counts. Lines
+        closer together than a small gap are merged.
+
+        Args:
+            region: Grayscale table region
+            min_height: Shorter ink runs are treated as noise
+
+        Returns:
+            (top, bottom) row ranges, bottom exclusive
+        """
+        if region.size == 0:
+            return []
+        height, width = region.shape[:2]
+        _, ink = cv2.threshold(region, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        # Both openings run on the original ink, so lines cut by the other
+        # direction's rules are still found whole
+        rules = [cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, size))
+                 for size in ((1, max(3, height // 4)), (max(3, width // 4), 1))]
+        ink = cv2.subtract(ink, cv2.bitwise_or(*rules))
+
+        text = np.concatenate(([False], ink.sum(axis=1) > max(2, width // 500), [False]))
+        edges = np.flatnonzero(np.diff(text.astype(np.int8)))
+        runs = list(zip(edges[0::2], edges[1::2]))
+
+        # Merge runs split by gaps of a few pixels (e.g. between accents and letters)
+        max_gap = max(2, height // 300)
+        lines = []
+        for start, end in runs:
+            if lines and start - lines[-1][1] <= max_gap:
+                lines[-1] = (lines[-1][0], end)
+            else:
+                lines.append((start, end))
+        return [(int(start), int(end)) for start, end in lines if end - start >= min_height]
+
+    def learn(self, gray: np.ndarray, rows: List[List[tuple]], columns: List[List[int]],
+              table_box: Optional[tuple] = None):
+        """
+        Store the layout of a page whose cells were detected from scratch
+
+        Args:
+            gray: Grayscale page
+            rows: Cell rectangles (x, y, w, h) grouped into rows
+            columns: Column index of every cell, in the same nesting as rows
+            table_box: (x, y, w, h) of the located table; its top separates
+                the header band from the table, otherwise the top of the
+                first row does
+        """
+        if sum(len(row) for row in rows) < self.min_cells:
+            return
+
+        row_profile, v_profile = self.fingerprint(gray)
+        if not v_profile.any():
+            return
+
+        table_top = table_box[1] if table_box is not None else min(y for x, y, w, h in rows[0])
+        band = int(table_top * self.PROFILE_WIDTH / gray.shape[1])
+        if band < self.MIN_HEADER_BAND:
+            return
+
+        # Horizontal extent of every column over all rows
+        extents = {}
+        for row, row_columns in zip(rows, columns):
+            for (x, y, w, h), column in zip(row, row_columns):
+                x0, x1 = extents.get(column, (x, x + w))
+                extents[column] = (min(x0, x), max(x1, x + w))
+        layout_columns = [(x0, x1 - x0) for _, (x0, x1) in sorted(extents.items())]
+
+        layout = PageLayout(self._standardize(row_profile[:band]), v_profile, gray.shape[:2],
+                            table_top, layout_columns)
+        with self._lock:
+            self.layouts[self._next_id] = layout
+            self._next_id += 1
+            while len(self.layouts) > self.max_layouts:
+                self.layouts.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.layouts)
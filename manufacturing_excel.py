@@ -0,0 +1,113 @@
+from typing import Any, Dict, Iterable, Iterator
+
+# openpyxl is imported by the writer, so the layout constants can be read
+# without loading it
+
+# Manufacturing sheet layout: table headers, the item field written under
+# each header after "SI No.", and column widths
+MANUFACTURING_HEADERS = ["SI No.", "Part No", "Description of Goods", "HSN/SAC",
+                         "Quantity", "Rate", "per", "Disc. %", "Amount"]
+MANUFACTURING_FIELDS = ["partNo", "description", "hsn", "quantity", "rate",
+                        "per", "discountPercentage", "amount"]
+MANUFACTURING_COLUMN_WIDTHS = [5, 25, 30, 10, 10, 10, 5, 10, 15]
+
+
+def iter_manufacturing_items(invoices: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the manufacturing items of a sequence of invoices
+
+    Items already in manufacturing format (with a "partNo") pass through;
+    simple items and item-less invoices are mapped onto the manufacturing
+    fields.
+
+    Args:
+        invoices: Invoice data dictionaries
+
+    Returns:
+        Iterator of manufacturing item dictionaries
+    """
+    for invoice in invoices:
+        if not isinstance(invoice.get("items"), list):
+            yield {
+                "partNo": invoice.get("invoiceNumber", ""),
+                "description": "Invoice Total",
+                "hsn": "",
+                "quantity": "",
+                "rate": "",
+                "per": "",
+                "discountPercentage": "",
+                "amount": invoice.get("total", ""),
+            }
+            continue
+        for item in invoice["items"]:
+            if "partNo" in item:
+                yield item
+            else:
+                yield {
+                    "partNo": invoice.get("invoiceNumber", ""),
+                    "description": item.get("description", ""),
+                    "hsn": "",
+                    "quantity": item.get("quantity", ""),
+                    "rate": item.get("unitPrice", ""),
+                    "per": "Nos.",
+                    "discountPercentage": "",
+                    "amount": item.get("total", ""),
+                }
+
+
+class ManufacturingExcelWriter:
+    """
+    Manufacturing invoice sheet written item by item
+
+    Rows go through a write-only worksheet as they are added, so memory
+    does not grow with the number of items. Items are numbered across
+    everything written.
+    """
+
+    def __init__(self, output_path: str, state_name: str = "", terms_of_delivery: str = ""):
+        """
+        Start the sheet: header information on row 1, bold table headers on row 3
+
+        Args:
+            output_path: Path the workbook is saved to by close()
+            state_name: Value of the "State Name" header field
+            terms_of_delivery: Value of the "Terms of Delivery" header field
+        """
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+        from openpyxl.utils import get_column_letter
+
+        self.output_path = output_path
+        self.items = 0
+        self._wb = Workbook(write_only=True)
+        self._ws = self._wb.create_sheet("Manufacturing Invoice")
+
+        # Column widths must be set before the first row is written
+        for col_idx, width in enumerate(MANUFACTURING_COLUMN_WIDTHS, 1):
+            self._ws.column_dimensions[get_column_letter(col_idx)].width = width
+
+        self._ws.append(["State Name", ":", state_name, None, None, None, "Terms of Delivery", terms_of_delivery])
+        self._ws.append([])
+        header_cells = []
+        for header in MANUFACTURING_HEADERS:
+            cell = WriteOnlyCell(self._ws, value=header)
+            cell.font = Font(bold=True)
+            header_cells.append(cell)
+        self._ws.append(header_cells)
+
+    def write_items(self, items: Iterable[Dict[str, Any]]):
+        """Append manufacturing items, from row 4 on, consuming them lazily"""
+        for item in items:
+            self.items += 1
+            self._ws.append([self.items] + [item.get(field, "") for field in MANUFACTURING_FIELDS])
+
+    def write_invoice(self, invoice: Dict[str, Any]):
+        """Append the items of one invoice"""
+        self.write_items(iter_manufacturing_items([invoice]))
+
+    def close(self) -> str:
+        """Save the workbook and return its path"""
+        self._wb.save(self.output_path)
+        print(f"Excel file saved as {self.output_path}")
+        return self.output_path
@@ -0,0 +1,141 @@
+from typing import Dict, Any, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from numeric_text import parse_decimal
+
+# Numeric prefix (digits plus OCR look-alikes) followed by an optional unit
+# word; a "unit" made only of look-alikes ("1O") belongs to the number
+QUANTITY_PATTERN = (r'^(?P<number>[\d.,ODQIl|iZSGBg ]+?)\s*'
+                    r'(?P<unit>(?![ODQIl|iZSGBg.]+$)[A-Za-z][A-Za-z.]*)?$')
+
+# Fields of a manufacturing item that hold numbers
+NUMERIC_FIELDS = ["quantity", "rate", "discountPercentage", "amount"]
+
+
+def clean_numeric_text(values: pd.Series) -> pd.Series:
+    """
+    Clean raw OCR text of numeric cells into plain number strings
+
+    Handles currency markers, Indian ("1,00,000.50") and Western
+    ("100,000.50") thousands separators, a decimal comma ("95,50") and
+    common OCR digit confusions ("1O5" -> "105"). Cells are parsed one by one with numeric_text.parse_decimal, the same
+    rules the CLI uses for its running totals.
+
+    Args:
+        values: Raw cell values (strings or numbers)
+
+    Returns:
+        String series of numbers like "100000.50", <NA> where none was found
+    """
+    def clean(value):
+        number = parse_decimal(value)
+        return None if number is None else format(number, "f")
+
+    text = values.astype("string")
+    return text.map(clean, na_action="ignore").astype("string")
+
+
+def parse_numeric(values: pd.Series) -> pd.Series:
+    """
+    Parse raw numeric cells into floats
+
+    Returns:
+        Float series, NaN where no number was found
+    """
+    return pd.to_numeric(clean_numeric_text(values), errors="coerce").astype(np.float64)
+
+
+def split_quantity(values: pd.Series) -> pd.DataFrame:
+    """
+    Split quantity cells such as "25 Nos." into a number and a unit
+
+    Returns:
+        DataFrame with a cleaned number string column "number" and a string
+        column "unit"; either is <NA> when missing
+    """
+    text = values.astype("string").str.strip()
+    parts = text.str.extract(QUANTITY_PATTERN)
+    return pd.DataFrame({
+        "number": clean_numeric_text(parts["number"]),
+        "unit": parts["unit"].astype("string"),
+    }, index=values.index)
+
+
+def normalize_items(items: Sequence[Dict[str, Any]],
+                    invoice_ids: Optional[Sequence[Any]] = None) -> pd.DataFrame:
+    """
+    Normalize a batch of line items into a DataFrame with numeric columns
+
+    Args:
+        items: Item dictionaries with raw OCR strings
+        invoice_ids: Optional invoice identifier per item, for batches
+            spanning several invoices
+
+    Returns:
+        DataFrame with the raw fields plus quantity_value, unit, rate_value,
+        discount_value and amount_value
+    """
+    raw = pd.DataFrame.from_records(list(items), columns=NUMERIC_FIELDS + ["partNo", "description"])
+    frame = raw.copy()
+    if invoice_ids is not None:
+        frame.insert(0, "invoice", list(invoice_ids))
+
+    quantity = split_quantity(raw["quantity"])
+    frame["quantity_value"] = pd.to_numeric(quantity["number"], errors="coerce").astype(np.float64)
+    frame["unit"] = quantity["unit"]
+    frame["rate_value"] = parse_numeric(raw["rate"])
+    frame["discount_value"] = parse_numeric(raw["discountPercentage"])
+    frame["amount_value"] = parse_numeric(raw["amount"])
+
+    return frame
+
+
+def validate_arithmetic(frame: pd.DataFrame, rel_tol: float = 0.01, abs_tol: float = 0.5) -> pd.DataFrame:
+    """
+    Check amount ≈ quantity × rate × (1 − discount / 100) for every row
+
+    A missing discount counts as 0. Rows missing quantity, rate or amount
+    cannot be checked and are flagged as "missing".
+
+    Args:
+        frame: Output of normalize_items
+        rel_tol: Allowed relative difference
+        abs_tol: Allowed absolute difference, for rounding on small amounts
+
+    Returns:
+        The frame with amount_expected, valid and issue ("ok", "missing"
+        or "mismatch") columns added
+    """
+    quantity = frame["quantity_value"].to_numpy()
+    rate = frame["rate_value"].to_numpy()
+    discount = np.nan_to_num(frame["discount_value"].to_numpy(), nan=0.0)
+    amount = frame["amount_value"].to_numpy()
+
+    expected = quantity * rate * (1 - discount / 100)
+    missing = np.isnan(quantity) | np.isnan(rate) | np.isnan(amount)
+    matches = np.isclose(amount, expected, rtol=rel_tol, atol=abs_tol)
+
+    frame = frame.copy()
+    frame["amount_expected"] = expected
+    frame["valid"] = ~missing & matches
+    frame["issue"] = np.select([missing, ~matches], ["missing", "mismatch"], default="ok")
+    return frame
+
+
+def invalid_item_indices(items: Sequence[Dict[str, Any]], **tolerances) -> List[int]:
+    """
+    Positions of the items that fail arithmetic validation
+
+    Args:
+        items: Item dictionaries with raw OCR strings
+        **tolerances: rel_tol / abs_tol passed to validate_arithmetic
+
+    Returns:
+        Indices into items, e.g. for re-OCRing only those rows
+    """
+    if not items:
+        return []
+    checked = validate_arithmetic(normalize_items(items), **tolerances)
+    return np.flatnonzero(~checked["valid"].to_numpy()).tolist()
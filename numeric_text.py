@@ -0,0 +1,46 @@
+import re
+from decimal import Decimal
+from typing import Optional
+
+# Characters OCR commonly reads in place of digits in numeric cells
+OCR_DIGIT_CONFUSIONS = str.maketrans({
+    "O": "0", "o": "0", "D": "0", "Q": "0",
+    "I": "1", "l": "1", "i": "1", "|": "1",
+    "Z": "2", "z": "2",
+    "S": "5", "s": "5",
+    "G": "6",
+    "B": "8",
+    "g": "9",
+})
+
+CURRENCY_PATTERN = r'(?i)(?:rs\.?|inr|₹|\$|/-|%)'
+NUMBER_PATTERN = r'(-?\d+(?:\.\d+)?)'
+
+# Currency markers and whitespace are both dropped
+_NOISE = re.compile(CURRENCY_PATTERN + r'|\s+')
+_NUMBER = re.compile(NUMBER_PATTERN)
+# A single comma followed by one or two digits is a decimal comma
+_DECIMAL_COMMA = re.compile(r'-?\d+,\d{1,2}')
+
+
+def parse_decimal(text: str) -> Optional[Decimal]:
+    """
+    Parse raw OCR text of a numeric cell into a Decimal
+
+    Handles currency markers, Indian ("1,00,000.50") and Western
+    ("100,000.50") thousands separators, a decimal comma ("95,50") and
+    common OCR digit confusions ("1O5" -> "105"). Needs no pandas, so the
+    CLI can total amounts without loading it.
+
+    Args:
+        text: Raw cell text
+
+    Returns:
+        The number with the digits as printed (Decimal("100000.50")), or
+        None if the text holds no number
+    """
+    text = _NOISE.sub("", text).translate(OCR_DIGIT_CONFUSIONS)
+    if "," in text:
+        text = text.replace(",", "." if _DECIMAL_COMMA.fullmatch(text) else "")
+    match = _NUMBER.search(text)
+    return Decimal(match.group(1)) if match else None
@@ -0,0 +1,248 @@
+import queue
+import shlex
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from instrumentation import current_trace
+
+
+def parse_tesseract_config(config: str) -> Tuple[Optional[int], Optional[int], Dict[str, str]]:
+    """
+    Split a tesseract command-line config string into its parts
+
+    Args:
+        config: Config string as passed to pytesseract, e.g. "--oem 3 --psm 6 -c key=value"
+
+    Returns:
+        Tuple of (oem, psm, variables); oem and psm are None when not given
+    """
+    oem = None
+    psm = None
+    variables = {}
+
+    args = shlex.split(config)
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg == "--oem" and i + 1 < len(args):
+            oem = int(args[i + 1])
+            i += 2
+        elif arg == "--psm" and i + 1 < len(args):
+            psm = int(args[i + 1])
+            i += 2
+        elif arg == "-c" and i + 1 < len(args):
+            key, _, value = args[i + 1].partition("=")
+            variables[key] = value
+            i += 2
+        else:
+            i += 1
+
+    return oem, psm, variables
+
+
+class PytesseractEngine:
+    """
+    OCR engine that runs the tesseract binary through pytesseract.
+    Every call starts a new tesseract process.
+    """
+
+    name = "pytesseract"
+
+    def __init__(self, lang: str = "eng"):
+        import pytesseract
+        self.pytesseract = pytesseract
+        self.lang = lang
+
+    def image_to_string(self, image: np.ndarray, config: str = "") -> str:
+        return self.pytesseract.image_to_string(image, lang=self.lang, config=config)
+
+    def image_to_data(self, image: np.ndarray, config: str = "") -> Dict[str, List[Any]]:
+        return self.pytesseract.image_to_data(image, lang=self.lang, config=config,
+                                              output_type=self.pytesseract.Output.DICT)
+
+    def close(self):
+        pass
+
+
+class TesserocrEngine:
+    """
+    OCR engine backed by a resident tesseract API instance (tesserocr).
+    The language model is loaded once and reused for every call.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, lang: str = "eng", oem: int = 3):
+        import tesserocr
+        self.tesserocr = tesserocr
+        self.oem = oem
+        self.api = tesserocr.PyTessBaseAPI(lang=lang, oem=oem)
+
+    @contextmanager
+    def _configured(self, image: np.ndarray, config: str):
+        """Apply a per-call config and image, restoring variables afterwards"""
+        oem, psm, variables = parse_tesseract_config(config)
+        if oem is not None and oem != self.oem:
+            # The engine mode is fixed when the model is loaded
+            print(f"Warning: ignoring --oem {oem}, engine was initialized with --oem {self.oem}")
+
+        previous = {key: self.api.GetVariableAsString(key) for key in variables}
+        previous_psm = self.api.GetPageSegMode()
+        try:
+            for key, value in variables.items():
+                self.api.SetVariable(key, value)
+            if psm is not None:
+                self.api.SetPageSegMode(psm)
+
+            image = np.ascontiguousarray(image)
+            height, width = image.shape[:2]
+            channels = 1 if image.ndim == 2 else image.shape[2]
+            self.api.SetImageBytes(image.tobytes(), width, height, channels, width * channels)
+            yield self.api
+        finally:
+            self.api.Clear()
+            self.api.SetPageSegMode(previous_psm)
+            for key, value in previous.items():
+                if value is not None:
+                    self.api.SetVariable(key, value)
+
+    def image_to_string(self, image: np.ndarray, config: str = "") -> str:
+        with self._configured(image, config) as api:
+            return api.GetUTF8Text()
+
+    def image_to_data(self, image: np.ndarray, config: str = "") -> Dict[str, List[Any]]:
+        RIL = self.tesserocr.RIL
+        data = {key: [] for key in ("level", "block_num", "par_num", "line_num", "word_num",
+                                    "left", "top", "width", "height", "conf", "text")}
+
+        with self._configured(image, config) as api:
+            api.Recognize()
+            iterator = api.GetIterator()
+            block_num = par_num = line_num = word_num = 0
+
+            # Same numbering scheme as tesseract's TSV output
+            for word in self.tesserocr.iterate_level(iterator, RIL.WORD):
+                if word.IsAtBeginningOf(RIL.BLOCK):
+                    block_num += 1
+                    par_num = line_num = word_num = 0
+                if word.IsAtBeginningOf(RIL.PARA):
+                    par_num += 1
+                    line_num = word_num = 0
+                if word.IsAtBeginningOf(RIL.TEXTLINE):
+                    line_num += 1
+                    word_num = 0
+                word_num += 1
+
+                box = word.BoundingBox(RIL.WORD)
+                if box is None:
+                    continue
+                x1, y1, x2, y2 = box
+                data["level"].append(5)
+                data["block_num"].append(block_num)
+                data["par_num"].append(par_num)
+                data["line_num"].append(line_num)
+                data["word_num"].append(word_num)
+                data["left"].append(x1)
+                data["top"].append(y1)
+                data["width"].append(x2 - x1)
+                data["height"].append(y2 - y1)
+                data["conf"].append(word.Confidence(RIL.WORD))
+                data["text"].append(word.GetUTF8Text(RIL.WORD) or "")
+
+        return data
+
+    def close(self):
+        self.api.End()
+
+
+OCR_ENGINES = {
+    "pytesseract": PytesseractEngine,
+    "tesserocr": TesserocrEngine,
+}
+
+
+def create_engine(name: str = "auto", lang: str = "eng"):
+    """
+    Create an OCR engine by name
+
+    Args:
+        name: "tesserocr", "pytesseract", or "auto" to prefer the in-process
+            tesserocr binding and fall back to pytesseract
+        lang: Tesseract language
+
+    Returns:
+        An initialized OCR engine
+    """
+    if name == "auto":
+        try:
+            return TesserocrEngine(lang=lang)
+        except (ImportError, RuntimeError):
+            return PytesseractEngine(lang=lang)
+
+    if name not in OCR_ENGINES:
+        raise ValueError(f"Unknown OCR engine: {name}")
+    return OCR_ENGINES[name](lang=lang)
+
+
+class OCREnginePool:
+    """
+    A fixed-size pool of long-lived OCR engines.
+
+    Engines are created once and checked out per call, so model loading is
+    paid once per engine rather than once per cell, page or file. The pool
+    is thread-safe; tesserocr releases the GIL while recognising, so a pool
+    of N engines lets N threads OCR concurrently.
+    """
+
+    def __init__(self, engine: str = "auto", size: int = 1, lang: str = "eng"):
+        """
+        Initialize the pool
+
+        Args:
+            engine: Engine name passed to create_engine
+            size: Number of engines to keep resident
+            lang: Tesseract language
+        """
+        if size < 1:
+            raise ValueError("OCR pool size must be at least 1")
+
+        self.size = size
+        self._engines = queue.Queue()
+        self._all = []
+        self._lock = threading.Lock()
+
+        for _ in range(size):
+            instance = create_engine(engine, lang=lang)
+            self._all.append(instance)
+            self._engines.put(instance)
+
+        self.engine_name = self._all[0].name
+
+    @contextmanager
+    def engine(self):
+        """Check out an engine for the duration of a with-block"""
+        instance = self._engines.get()
+        try:
+            yield instance
+        finally:
+            self._engines.put(instance)
+
+    def image_to_string(self, image: np.ndarray, config: str = "") -> str:
+        current_trace().count("ocrCalls")
+        with self.engine() as instance:
+            return instance.image_to_string(image, config=config)
+
+    def image_to_data(self, image: np.ndarray, config: str = "") -> Dict[str, List[Any]]:
+        current_trace().count("ocrCalls")
+        with self.engine() as instance:
+            return instance.image_to_data(image, config=config)
+
+    def close(self):
+        """Release all engines"""
+        with self._lock:
+            for instance in self._all:
+                instance.close()
+            self._all = []
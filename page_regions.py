@@ -0,0 +1,205 @@
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Width of the downscaled page used for localisation
+WORK_WIDTH = 800
+# Margin added around located regions, as a fraction of the page width
+REGION_MARGIN = 0.01
+# A ruled table must cover at least this fraction of the page
+MIN_TABLE_AREA = 0.05
+# Text lines with at least this many separate phrases look like table rows
+MIN_TABLE_COLUMNS = 3
+
+# Labels and values stay on one line; a value missing there is looked for
+# under the label on the next line (labels printed above their values)
+INVOICE_NUMBER_LABEL = re.compile(r'(?i)\binvoice[ \t]*(?:(?:no|number|num)\b\.?|#)[ \t]*[:\-#]?[ \t]*')
+INVOICE_NUMBER_VALUE = re.compile(r'(?i)([A-Z0-9][A-Z0-9\-/]*)')
+DATE_LABEL = re.compile(r'(?i)\b(?:invoice[ \t]+date|dated?)\b[ \t]*[:\-]?[ \t]*')
+DATE_VALUE = re.compile(
+    r'(\d{4}-\d{1,2}-\d{1,2}|\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4}|\d{1,2}[- ][A-Za-z]{3,9}[- ,]+\d{2,4})')
+# Words of neighbouring labels, never taken as a value
+LABEL_WORDS = {"date", "dated", "dt", "no", "number", "ref", "reference", "invoice"}
+DATE_FORMATS = ["%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%d.%m.%Y", "%d-%m-%y", "%d/%m/%y", "%d.%m.%y",
+                "%d-%b-%Y", "%d %b %Y", "%d-%b-%y", "%d %b %y", "%d %B %Y", "%d-%B-%Y"]
+
+Box = Tuple[int, int, int, int]
+
+
+def _ruled_table_box(ink: np.ndarray) -> Optional[Box]:
+    """Bounding box of the largest connected set of long ruling lines"""
+    height, width = ink.shape
+    horizontal = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (width // 8, 1)))
+    vertical = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, height // 16)))
+    lines = cv2.dilate(horizontal | vertical, np.ones((3, 3), np.uint8))
+
+    count, _, stats, _ = cv2.connectedComponentsWithStats(lines, connectivity=8)
+    if count < 2:
+        return None
+    best = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+    x, y, w, h = (int(v) for v in stats[best, :4])
+    if w * h < MIN_TABLE_AREA * width * height:
+        return None
+    return x, y, w, h
+
+
+def _text_lines(ink: np.ndarray) -> List[List[Box]]:
+    """Phrase boxes (words merged horizontally) grouped into text lines, top to bottom"""
+    height, width = ink.shape
+    phrases = cv2.dilate(ink, cv2.getStructuringElement(cv2.MORPH_RECT, (max(3, width // 80), 3)))
+    _, _, stats, _ = cv2.connectedComponentsWithStats(phrases, connectivity=8)
+    boxes = [tuple(int(v) for v in box) for box in stats[1:, :4]
+             if box[2] > 2 and box[3] > 2 and box[3] < height // 8]
+    boxes.sort(key=lambda b: b[1] + b[3] / 2)
+
+    lines = []
+    for box in boxes:
+        centre = box[1] + box[3] / 2
+        if lines:
+            last = lines[-1]
+            top = min(b[1] for b in last)
+            bottom = max(b[1] + b[3] for b in last)
+            if top <= centre <= bottom:
+                last.append(box)
+                continue
+        lines.append([box])
+    return lines
+
+
+def _bounding_box(boxes: List[Box]) -> Box:
+    x0 = min(b[0] for b in boxes)
+    y0 = min(b[1] for b in boxes)
+    x1 = max(b[0] + b[2] for b in boxes)
+    y1 = max(b[1] + b[3] for b in boxes)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def _text_table_box(lines: List[List[Box]]) -> Optional[Box]:
+    """Bounding box of the longest run of multi-column text lines"""
+    best, run = [], []
+    gap = 0
+    for line in lines:
+        if len(line) >= MIN_TABLE_COLUMNS:
+            run.append(line)
+            gap = 0
+        elif run and gap == 0:
+            # Tolerate one wrapped description line inside the table
+            gap = 1
+        else:
+            run, gap = [], 0
+        if len(run) > len(best):
+            best = list(run)
+
+    if len(best) < 2:
+        return None
+    return _bounding_box([box for line in best for box in line])
+
+
+def locate_page_regions(gray: np.ndarray) -> Dict[str, Optional[Box]]:
+    """
+    Locate the line-item table and the header block on a downscaled copy
+
+    The table is the largest connected grid of ruling lines, or, on
+    unruled invoices, the longest run of text lines with several separate
+    columns. The header block holds the text above the table, where the
+    invoice number and date are printed.
+
+    Args:
+        gray: Grayscale page
+
+    Returns:
+        Dictionary with "table" and "header" (x, y, w, h) boxes in page
+        coordinates; either is None when not found
+    """
+    height, width = gray.shape[:2]
+    scale = min(1.0, WORK_WIDTH / width)
+    small = cv2.resize(gray, (max(1, round(width * scale)), max(1, round(height * scale))),
+                       interpolation=cv2.INTER_AREA) if scale < 1 else gray
+    ink = cv2.adaptiveThreshold(small, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 15, 10)
+
+    lines = _text_lines(ink)
+    table = _ruled_table_box(ink) or _text_table_box(lines)
+
+    if table is not None:
+        above = [box for line in lines for box in line if box[1] + box[3] <= table[1]]
+    else:
+        above = [box for line in lines for box in line if box[1] + box[3] <= small.shape[0] * 0.3]
+    header = _bounding_box(above) if above else None
+
+    margin = REGION_MARGIN * width
+
+    def to_page(box: Optional[Box]) -> Optional[Box]:
+        if box is None:
+            return None
+        x0 = max(0, int(box[0] / scale - margin))
+        y0 = max(0, int(box[1] / scale - margin))
+        x1 = min(width, int((box[0] + box[2]) / scale + margin))
+        y1 = min(height, int((box[1] + box[3]) / scale + margin))
+        return x0, y0, x1 - x0, y1 - y0
+
+    return {"table": to_page(table), "header": to_page(header)}
+
+
+def _labelled_value(lines: List[str], label: re.Pattern, value: re.Pattern) -> Optional[str]:
+    """
+    First value printed after a label on its line, or under it on the next line
+
+    Args:
+        lines: OCR text lines
+        label: Pattern of the label, including any separator after it
+        value: Pattern of the value, with the value in group 1
+
+    Returns:
+        The value, or None if no label has one
+    """
+    for i, line in enumerate(lines):
+        for found in label.finditer(line):
+            match = value.match(line, found.end())
+            if match and match.group(1).lower() not in LABEL_WORDS:
+                return match.group(1)
+            if i + 1 == len(lines):
+                continue
+            # Token of the next line that overlaps the label's columns
+            label_end = found.start() + len(found.group(0).rstrip())
+            for token in re.finditer(r'\S+', lines[i + 1]):
+                if token.end() > found.start() and token.start() < label_end:
+                    match = value.match(lines[i + 1], token.start())
+                    if match and match.group(1).lower() not in LABEL_WORDS:
+                        return match.group(1)
+                    break
+    return None
+
+
+def parse_header_fields(text: str) -> Dict[str, str]:
+    """
+    Pull the invoice number and date out of OCR text of the header block
+
+    Args:
+        text: OCR text
+
+    Returns:
+        Dictionary with "invoiceNumber" and/or "date" (ISO format when the
+        date could be parsed, otherwise as printed) for the fields found
+    """
+    fields = {}
+    lines = text.splitlines()
+
+    number = _labelled_value(lines, INVOICE_NUMBER_LABEL, INVOICE_NUMBER_VALUE)
+    if number:
+        fields["invoiceNumber"] = number.strip("-/")
+
+    printed = _labelled_value(lines, DATE_LABEL, DATE_VALUE)
+    if printed:
+        printed = re.sub(r'[\s,]+', ' ', printed).strip()
+        fields["date"] = printed
+        for date_format in DATE_FORMATS:
+            try:
+                fields["date"] = datetime.strptime(printed, date_format).strftime('%Y-%m-%d')
+                break
+            except ValueError:
+                continue
+
+    return fields
@@ -0,0 +1,298 @@
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional
+
+from instrumentation import NULL_TRACE, activate
+from invoice_export import IMAGE_EXTENSIONS, InvoiceExporter, combine_page_results, iter_pdf_pages, pdf_page_count
+
+
+class PipelineResult:
+    """Outcome of one document run through the pipeline"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"path": self.path, "data": self.data, "error": self.error}
+
+
+class StagedPipeline:
+    """
+    Runs documents through decode -> preprocess -> OCR -> export stages.
+
+    Stages are connected by bounded asyncio queues and each has its own
+    number of workers running the blocking work in a shared thread pool.
+    OpenCV and the OCR engines release the GIL, so decoding the next page
+    overlaps with OCR of the current one, while the queue bounds keep only a
+    few decoded pages in memory. PDFs are split into pages that are
+    rendered by the decode stage and flow through the pipeline on their
+    own. Exports are made per document, in input order, as results become
+    available.
+    """
+
+    def __init__(self, exporter: InvoiceExporter, decode_workers: int = 2,
+                 preprocess_workers: int = 2, ocr_workers: Optional[int] = None,
+                 queue_size: int = 4,
+                 export: Optional[Callable[[PipelineResult], Any]] = None):
+        """
+        Initialize the pipeline
+
+        Args:
+            exporter: Exporter providing the stage methods
+            decode_workers: Concurrent cache lookups, image decodes and PDF page renders
+            preprocess_workers: Concurrent preprocessing and cell detection
+            ocr_workers: Concurrent OCR; defaults to the OCR pool size
+            queue_size: Maximum number of pages waiting between two stages
+            export: Called once per document, in input order, from the
+                export stage
+        """
+        if ocr_workers is None:
+            ocr_workers = exporter.ocr.size if exporter.ocr is not None else 1
+        if min(decode_workers, preprocess_workers, ocr_workers, queue_size) < 1:
+            raise ValueError("Stage workers and queue size must be at least 1")
+
+        self.exporter = exporter
+        self.workers = {"decode": decode_workers, "preprocess": preprocess_workers, "ocr": ocr_workers}
+        self.queue_size = queue_size
+        self.export = export
+
+    def _decode(self, unit: tuple) -> Dict[str, Any]:
+        path, page_number = unit
+        if page_number is None:
+            return self.exporter.load_page(path)
+        _, image = next(iter_pdf_pages(path, first_page=page_number, last_page=page_number))
+        return self.exporter.load_page(path, image=image, page_number=page_number)
+
+    def _preprocess(self, page: Dict[str, Any]) -> Dict[str, Any]:
+        return page if "result" in page else self.exporter.prepare_page(page)
+
+    def _ocr(self, page: Dict[str, Any]) -> Dict[str, Any]:
+        if "result" not in page:
+            self.exporter.read_page(page)
+        return self._release_images(page)
+
+    @staticmethod
+    def _release_images(page: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Keep only what the export stage needs of a page, so pages waiting
+        for an earlier, slower one do not hold their image arrays
+        """
+        return {key: page[key] for key in ("path", "page_number", "trace", "result") if key in page}
+
+    def _export(self, result: PipelineResult, page: Dict[str, Any]):
+        trace = page.get("trace", NULL_TRACE)
+        with activate(trace), trace.stage("export"):
+            self.export(result)
+
+    async def _stage(self, name: str, func: Callable, inbox: asyncio.Queue,
+                     outbox: asyncio.Queue, downstream_workers: int,
+                     executor: ThreadPoolExecutor, results: List[PipelineResult]):
+        """Run a stage's workers until the inbox is drained, then close the outbox"""
+        loop = asyncio.get_running_loop()
+
+        async def worker():
+            while True:
+                job = await inbox.get()
+                if job is None:
+                    return
+                seq, index, payload = job
+                # Pages of documents that failed upstream only pass through
+                if results[index].error is None:
+                    try:
+                        payload = await loop.run_in_executor(executor, func, payload)
+                    except Exception as e:
+                        results[index].error = f"{name}: {e}"
+                        # Failed pages still reach the export stage with their trace
+                        if isinstance(payload, dict):
+                            payload["trace"].count("errors")
+                            payload = self._release_images(payload)
+                        else:
+                            payload = None
+                await outbox.put((seq, index, payload))
+
+        await asyncio.gather(*(worker() for _ in range(self.workers[name])))
+        for _ in range(downstream_workers):
+            await outbox.put(None)
+
+    async def _feed(self, file_paths: List[str], outbox: asyncio.Queue, page_counts: Dict[int, int],
+                    executor: ThreadPoolExecutor, results: List[PipelineResult]):
+        """Split documents into page units, numbered in input order, for the decode stage"""
+        loop = asyncio.get_running_loop()
+        seq = 0
+
+        for index, path in enumerate(file_paths):
+            if os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS:
+                units = [(path, None)]
+            else:
+                try:
+                    count = await loop.run_in_executor(executor, pdf_page_count, path)
+                except Exception as e:
+                    results[index].error = f"decode: {e}"
+                    count = 0
+                # A document without pages still sends one unit so it gets exported
+                units = [(path, page_number) for page_number in range(1, count + 1)] or [(path, None)]
+
+            page_counts[index] = len(units)
+            for unit in units:
+                await outbox.put((seq, index, unit))
+                seq += 1
+
+        for _ in range(self.workers["decode"]):
+            await outbox.put(None)
+
+    async def _export_stage(self, inbox: asyncio.Queue, page_counts: Dict[int, int],
+                            executor: ThreadPoolExecutor, results: List[PipelineResult]):
+        """Collect OCR output and export documents in input order"""
+        loop = asyncio.get_running_loop()
+        finished = {}
+        next_seq = 0
+        # Pages released so far of documents that are not complete yet
+        released: Dict[int, int] = {}
+        document_pages: Dict[int, List[Dict[str, Any]]] = {}
+
+        while True:
+            job = await inbox.get()
+            if job is None:
+                return
+            seq, index, page = job
+            finished[seq] = (index, page)
+
+            # Release everything that is now contiguous from the front
+            while next_seq in finished:
+                index, page = finished.pop(next_seq)
+                next_seq += 1
+                pages = document_pages.setdefault(index, [])
+                if page is not None:
+                    self.exporter.finish_trace(page)
+                    if "result" in page:
+                        pages.append(page)
+                released[index] = released.get(index, 0) + 1
+                if released[index] < page_counts[index]:
+                    continue
+
+                # Last page of the document: combine its pages and export
+                del released[index]
+                del document_pages[index]
+                result = results[index]
+                if result.error is not None or not pages:
+                    continue
+                if os.path.splitext(result.path)[1].lower() in IMAGE_EXTENSIONS:
+                    result.data = pages[0]["result"]
+                else:
+                    result.data = combine_page_results([page["result"] for page in pages])
+                if self.export is not None:
+                    try:
+                        await loop.run_in_executor(executor, self._export, result, pages[-1])
+                    except Exception as e:
+                        result.error = f"export: {e}"
+
+    async def run_async(self, file_paths: List[str]) -> List[PipelineResult]:
+        """
+        Process documents through all stages
+
+        Args:
+            file_paths: Images and PDFs to process
+
+        Returns:
+            One result per document, in input order; failures are recorded
+            on the result instead of stopping the pipeline
+        """
+        results = [PipelineResult(path) for path in file_paths]
+        page_counts: Dict[int, int] = {}
+        units = asyncio.Queue(maxsize=self.queue_size)
+        decoded = asyncio.Queue(maxsize=self.queue_size)
+        prepared = asyncio.Queue(maxsize=self.queue_size)
+        read = asyncio.Queue(maxsize=self.queue_size)
+
+        # One thread per stage worker, plus one for the feeder and export stage
+        with ThreadPoolExecutor(max_workers=sum(self.workers.values()) + 1) as executor:
+            await asyncio.gather(
+                self._feed(file_paths, units, page_counts, executor, results),
+                self._stage("decode", self._decode, units, decoded,
+                            self.workers["preprocess"], executor, results),
+                self._stage("preprocess", self._preprocess, decoded, prepared,
+                            self.workers["ocr"], executor, results),
+                self._stage("ocr", self._ocr, prepared, read, 1, executor, results),
+                self._export_stage(read, page_counts, executor, results),
+            )
+
+        return results
+
+    def run(self, file_paths: List[str]) -> List[PipelineResult]:
+        """Synchronous wrapper around run_async"""
+        return asyncio.run(self.run_async(file_paths))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract invoices with a pipelined stage executor')
+    parser.add_argument('--input', '-i', required=True, help='Input file or directory')
+    parser.add_argument('--output', '-o', default='pipeline_results.json', help='Output JSON file')
+    parser.add_argument('--excel', action='store_true',
+                        help='Also write every document to a manufacturing Excel file from the export stage')
+    parser.add_argument('--excel-dir', default='.', help='With --excel, directory of the Excel file')
+    parser.add_argument('--decode-workers', type=int, default=2,
+                        help='Concurrent image decodes and PDF page renders')
+    parser.add_argument('--preprocess-workers', type=int, default=2,
+                        help='Concurrent preprocessing and cell detection')
+    parser.add_argument('--ocr-workers', type=int, default=None,
+                        help='Concurrent OCR workers (default: one per resident OCR engine)')
+    parser.add_argument('--ocr-pool-size', type=int, default=1, help='Number of resident OCR engines')
+    parser.add_argument('--queue-size', type=int, default=4,
+                        help='Maximum number of pages waiting between two stages')
+    parser.add_argument('--layout-cache-size', type=int, default=0,
+                        help='Remember this many page layouts and reuse their table geometry (0 disables)')
+    parser.add_argument('--routing', choices=InvoiceExporter.ROUTING_MODES, default='confidence',
+                        help='How pages are routed between table extraction and full-page OCR '
+                             '(race needs --ocr-pool-size above 1)')
+    parser.add_argument('--trace-dir',
+                        help='Write per-document stage traces and a batch summary to this directory')
+    args = parser.parse_args()
+
+    if os.path.isdir(args.input):
+        file_paths = [os.path.join(args.input, name) for name in sorted(os.listdir(args.input))
+                      if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS | {'.pdf'}]
+    else:
+        file_paths = [args.input]
+
+    exporter = InvoiceExporter(ocr_pool_size=args.ocr_pool_size, trace_dir=args.trace_dir,
+                               layout_cache_size=args.layout_cache_size, routing=args.routing)
+    excel = exporter.open_manufacturing_excel(args.excel_dir) if args.excel else None
+
+    def export(result: PipelineResult):
+        if excel is not None:
+            excel.write_invoice(result.data)
+        print(f"Completed: {result.path}")
+
+    try:
+        pipeline = StagedPipeline(exporter, decode_workers=args.decode_workers,
+                                  preprocess_workers=args.preprocess_workers,
+                                  ocr_workers=args.ocr_workers, queue_size=args.queue_size,
+                                  export=export)
+        results = pipeline.run(file_paths)
+    finally:
+        exporter.close()
+
+    with open(args.output, "w") as f:
+        json.dump([result.to_dict() for result in results], f, indent=2)
+    print(f"Results written to: {args.output}")
+
+    for result in results:
+        if result.error is not None:
+            print(f"Error processing {result.path}: {result.error}")
+
+    if exporter.trace_summary is not None:
+        summary_path = os.path.join(args.trace_dir, "batch_summary.json")
+        exporter.trace_summary.save(summary_path)
+        print(f"Trace summary written to: {summary_path}")
+
+    if excel is not None:
+        print(f"Excel file created with {excel.items} item(s): {excel.close()}")
+
+
+if __name__ == "__main__":
+    main()
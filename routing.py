@@ -0,0 +1,116 @@
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+# Width of the downscaled copy used to measure ruling lines
+WORK_WIDTH = 800
+# Feature values at which each part of the score saturates
+FULL_LINE_DENSITY = 0.01
+FULL_CELL_COUNT = 12
+# Weights of the features in the table score
+WEIGHTS = {"lineDensity": 0.2, "cellCount": 0.4, "gridRegularity": 0.4}
+
+
+class RouteCancelled(Exception):
+    """Raised inside an extraction path that lost a race"""
+
+
+def check_cancelled(cancel) -> None:
+    """Raise RouteCancelled if the cancel event (a threading.Event or None) is set"""
+    if cancel is not None and cancel.is_set():
+        raise RouteCancelled()
+
+
+def line_density(gray: np.ndarray, box: Optional[tuple] = None) -> float:
+    """
+    Fraction of a region covered by long horizontal and vertical ruling lines
+
+    Args:
+        gray: Grayscale page
+        box: (x, y, w, h) region to measure, or None for the whole page
+
+    Returns:
+        Ruling-line pixels over region pixels, on a downscaled copy
+    """
+    if box is not None:
+        x, y, w, h = box
+        gray = gray[y:y+h, x:x+w]
+    height, width = gray.shape[:2]
+    if height == 0 or width == 0:
+        return 0.0
+    scale = min(1.0, WORK_WIDTH / width)
+    if scale < 1:
+        gray = cv2.resize(gray, (max(1, round(width * scale)), max(1, round(height * scale))),
+                          interpolation=cv2.INTER_AREA)
+    ink = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 15, 10)
+    height, width = ink.shape
+    horizontal = cv2.morphologyEx(ink, cv2.MORPH_OPEN,
+                                  cv2.getStructuringElement(cv2.MORPH_RECT, (max(2, width // 8), 1)))
+    vertical = cv2.morphologyEx(ink, cv2.MORPH_OPEN,
+                                cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(2, height // 16))))
+    return cv2.countNonZero(horizontal | vertical) / float(ink.size)
+
+
+def grid_regularity(rows: List[List[tuple]]) -> float:
+    """
+    How consistently the detected rows share one column layout
+
+    Args:
+        rows: Cell rectangles (x, y, w, h) grouped into rows
+
+    Returns:
+        Fraction of rows with the most common number of cells (at least
+        two), scaled by how well those rows' column starts line up; 0 when
+        no row has two or more cells
+    """
+    counts = [len(row) for row in rows]
+    multi = [count for count in counts if count >= 2]
+    if not multi:
+        return 0.0
+    columns = max(set(multi), key=multi.count)
+    matching = [row for row in rows if len(row) == columns]
+    share = len(matching) / len(rows)
+
+    # Column starts of matching rows should agree; measure their spread
+    # against the typical cell width
+    starts = np.array([[cell[0] for cell in row] for row in matching], dtype=np.float64)
+    widths = np.array([[cell[2] for cell in row] for row in matching], dtype=np.float64)
+    spread = float(starts.std(axis=0).mean()) if len(matching) > 1 else 0.0
+    alignment = max(0.0, 1.0 - spread / max(1.0, float(np.median(widths))))
+    return share * alignment
+
+
+def score_table(gray: np.ndarray, rows: List[List[tuple]],
+                table_box: Optional[tuple] = None) -> Dict[str, float]:
+    """
+    Score how likely a page is to give items on the table extraction path,
+    without any OCR
+
+    Args:
+        gray: Grayscale page
+        rows: Detected cell rectangles grouped into rows
+        table_box: Located table region, used for the line density
+
+    Returns:
+        Dictionary with the features ("lineDensity", "cellCount",
+        "gridRegularity") and the weighted "score" in [0, 1]. Pages with
+        fewer than two rows score 0, as they cannot yield any item row.
+        Only cells of rows with two or more cells are counted, since a
+        one-cell row is a text line rather than an item row
+    """
+    features = {
+        "lineDensity": line_density(gray, table_box),
+        "cellCount": float(sum(len(row) for row in rows if len(row) >= 2)),
+        "gridRegularity": grid_regularity(rows),
+    }
+    if len(rows) < 2:
+        return dict(features, score=0.0)
+
+    parts = {
+        "lineDensity": min(1.0, features["lineDensity"] / FULL_LINE_DENSITY),
+        "cellCount": min(1.0, features["cellCount"] / FULL_CELL_COUNT),
+        "gridRegularity": features["gridRegularity"],
+    }
+    score = sum(WEIGHTS[name] * value for name, value in parts.items())
+    return dict(features, score=round(score, 3))
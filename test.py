@@ -8,20 +8,83 @@ Original file is located at
 """
 
 import os
-import cv2
-import pandas as pd
-from openpyxl import Workbook
-from openpyxl.styles import Font  # For header styling
+import sys
 import argparse
-from typing import Dict, Any, Optional
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+import hashlib
+import itertools
+import time
+from decimal import Decimal
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 import json
 
-# For interactive file dialogs using Tkinter
-try:
-    import tkinter.filedialog
-    from tkinter import Tk
-except ImportError:
-    Tk = None
+from manufacturing_excel import (MANUFACTURING_COLUMN_WIDTHS, MANUFACTURING_FIELDS, MANUFACTURING_HEADERS,
+                                 ManufacturingExcelWriter, iter_manufacturing_items)
+from numeric_text import parse_decimal
+
+# Heavy dependencies (OpenCV, openpyxl, pandas via columnar_export, Tkinter)
+# are imported inside the code paths that use them, so export-only and
+# JSON-input runs start quickly.
+
+# Export formats offered on the command line; everything but xlsx is
+# written by columnar_export.ITEM_WRITERS
+EXPORT_FORMATS = ['xlsx', 'csv', 'jsonl', 'parquet']
+
+
+class BatchTotals:
+    """
+    Running totals of an export, updated as invoices and items stream past.
+
+    Nothing but the counts and the amount sum is kept, so the totals of a
+    batch of any size take constant memory.
+    """
+
+    def __init__(self):
+        self.invoices = 0
+        self.items = 0
+        self.amount = Decimal(0)
+
+    @staticmethod
+    def parse_amount(value: Any) -> Optional[Decimal]:
+        """
+        Amount text such as "Rs. 2,268.13" as a Decimal, or None.
+
+        Text is parsed by numeric_text.parse_decimal, the rules behind
+        normalization.clean_numeric_text, so totals read amounts exactly as
+        the typed exports do without loading pandas.
+        """
+        if isinstance(value, (int, float, Decimal)):
+            return Decimal(str(value))
+        return parse_decimal(str(value)) if value else None
+
+    def track_invoices(self, invoices: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Pass invoices through, counting them."""
+        for invoice in invoices:
+            self.invoices += 1
+            yield invoice
+
+    def track_items(self, items: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Pass items through, counting them and summing their amounts."""
+        for item in items:
+            self.items += 1
+            amount = self.parse_amount(item.get("amount", ""))
+            if amount is not None:
+                self.amount += amount
+            yield item
+
+    def __str__(self) -> str:
+        return f"{self.items} item(s) from {self.invoices} invoice(s), total amount {self.amount}"
+
+
+def _load_tk():
+    """Import Tkinter for the interactive dialogs, or return None if unavailable."""
+    try:
+        import tkinter
+        import tkinter.filedialog
+    except ImportError:
+        return None
+    return tkinter
 
 
 class InvoiceExporter:
@@ -30,6 +93,11 @@ class InvoiceExporter:
     including a customizable export naming.
     """
 
+    # Manufacturing sheet layout, shared with invoice_export
+    MANUFACTURING_HEADERS = MANUFACTURING_HEADERS
+    MANUFACTURING_FIELDS = MANUFACTURING_FIELDS
+    MANUFACTURING_COLUMN_WIDTHS = MANUFACTURING_COLUMN_WIDTHS
+
     def __init__(self):
         """Initialize the InvoiceExporter"""
         pass
@@ -70,8 +138,9 @@ class InvoiceExporter:
         """
         Create a manufacturing invoice Excel file.
 
-        If the provided data represents multiple invoices (a list inside the key 'manufacturingTableData'),
-        the method aggregates the items into a unified invoice.
+        If the provided data represents multiple invoices (a list or any iterable inside the key
+        'manufacturingTableData'), the method aggregates the items into a unified invoice and
+        streams them into the workbook with stream_manufacturing_excel.
 
         Args:
             data: Dictionary containing invoice data.
@@ -87,86 +156,193 @@ class InvoiceExporter:
         else:
             manufacturing_template = data.get('manufacturingTableData', self.get_default_manufacturing_template_data())
 
-        # If manufacturing_template is a list, aggregate the items.
-        if isinstance(manufacturing_template, list):
-            aggregated_items = []
-            for invoice in manufacturing_template:
-                if isinstance(invoice.get("items"), list):
-                    for item in invoice["items"]:
-                        if "partNo" not in item:
-                            aggregated_items.append({
-                                "partNo": invoice.get("invoiceNumber", ""),
-                                "description": item.get("description", ""),
-                                "hsn": "",
-                                "quantity": item.get("quantity", ""),
-                                "rate": item.get("unitPrice", ""),
-                                "per": "Nos.",
-                                "discountPercentage": "",
-                                "amount": item.get("total", "")
-                            })
-                        else:
-                            aggregated_items.append(item)
-                else:
-                    aggregated_items.append({
-                        "partNo": invoice.get("invoiceNumber", ""),
-                        "description": "Invoice Total",
-                        "hsn": "",
-                        "quantity": "",
-                        "rate": "",
-                        "per": "",
-                        "discountPercentage": "",
-                        "amount": invoice.get("total", "")
-                    })
-            manufacturing_template = {
-                "stateName": "Aggregated Invoices",
-                "termsOfDelivery": "",
-                "items": aggregated_items
-            }
-
-        # Create workbook and worksheet
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Manufacturing Invoice"
+        # A list of invoices is aggregated into one sheet
+        if not isinstance(manufacturing_template, dict):
+            return self.stream_manufacturing_excel(self.iter_aggregated_items(manufacturing_template),
+                                                   output_dir=output_dir, export_name=export_name)
+
+        return self.stream_manufacturing_excel(manufacturing_template.get("items", []),
+                                               output_dir=output_dir, export_name=export_name,
+                                               state_name=manufacturing_template.get("stateName", ""),
+                                               terms_of_delivery=manufacturing_template.get("termsOfDelivery", ""))
+
+    def _init_manufacturing_sheet(self, ws, state_name: str, terms_of_delivery: str):
+        """Write the header block, bold table headers and column widths."""
+        from openpyxl.styles import Font  # For header styling
+        from openpyxl.utils import get_column_letter
 
         # Add header information
         ws['A1'] = "State Name"
         ws['B1'] = ":"
-        ws['C1'] = manufacturing_template.get("stateName", "")
+        ws['C1'] = state_name
         ws['G1'] = "Terms of Delivery"
-        ws['H1'] = manufacturing_template.get("termsOfDelivery", "")
+        ws['H1'] = terms_of_delivery
 
         # Table headers on row 3
-        headers = ["SI No.", "Part No", "Description of Goods", "HSN/SAC",
-                   "Quantity", "Rate", "per", "Disc. %", "Amount"]
-        for col_idx, header in enumerate(headers, 1):
+        for col_idx, header in enumerate(self.MANUFACTURING_HEADERS, 1):
             cell = ws.cell(row=3, column=col_idx, value=header)
             cell.font = Font(bold=True)
 
-        # Add invoice items starting at row 4
-        items = manufacturing_template.get("items", [])
-        for row_idx, item in enumerate(items, 4):
-            ws.cell(row=row_idx, column=1, value=row_idx - 3)
-            ws.cell(row=row_idx, column=2, value=item.get("partNo", ""))
-            ws.cell(row=row_idx, column=3, value=item.get("description", ""))
-            ws.cell(row=row_idx, column=4, value=item.get("hsn", ""))
-            ws.cell(row=row_idx, column=5, value=item.get("quantity", ""))
-            ws.cell(row=row_idx, column=6, value=item.get("rate", ""))
-            ws.cell(row=row_idx, column=7, value=item.get("per", ""))
-            ws.cell(row=row_idx, column=8, value=item.get("discountPercentage", ""))
-            ws.cell(row=row_idx, column=9, value=item.get("amount", ""))
-
         # Set column widths for readability
-        column_widths = [5, 25, 30, 10, 10, 10, 5, 10, 15]
-        for col_idx, width in enumerate(column_widths, 1):
-            column_letter = ws.cell(row=1, column=col_idx).column_letter
-            ws.column_dimensions[column_letter].width = width
-
-        # Build and save the Excel file using export_name and current timestamp
-        timestamp = pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')
-        output_filename = f"{export_name}_{timestamp}.xlsx"
-        output_path = os.path.join(output_dir, output_filename)
-        wb.save(output_path)
-        print(f"Excel file saved as {output_path}")
+        for col_idx, width in enumerate(self.MANUFACTURING_COLUMN_WIDTHS, 1):
+            ws.column_dimensions[get_column_letter(col_idx)].width = width
+
+    @staticmethod
+    def _ledger_part_path(workbook_path: str, part: int) -> str:
+        """Path of a ledger part: the workbook itself, then name_002.xlsx, ..."""
+        if part == 1:
+            return workbook_path
+        root, ext = os.path.splitext(workbook_path)
+        return f"{root}_{part:03d}{ext}"
+
+    def append_manufacturing_excel(self, items: Iterable[Dict[str, Any]], workbook_path: str,
+                                   max_rows: Optional[int] = None, max_bytes: Optional[int] = None,
+                                   rollover: str = "sheet",
+                                   state_name: str = "Aggregated Invoices",
+                                   terms_of_delivery: str = "") -> str:
+        """
+        Append items to an existing manufacturing export (ledger).
+
+        SI numbering continues from the last row of the ledger. Once a sheet
+        holds max_rows items, further items go to a new sheet or, with
+        rollover="file", to the next ledger file (name_002.xlsx, ...). A
+        ledger file already larger than max_bytes is also rolled over to the
+        next file. The workbook is created if it does not exist yet.
+
+        Args:
+            items: Manufacturing item dictionaries to append.
+            workbook_path: Path of the ledger workbook (its first part).
+            max_rows: Maximum item rows per sheet, or None for no limit.
+            max_bytes: File size after which a new ledger file is started.
+            rollover: "sheet" or "file", where to continue once max_rows is reached.
+            state_name: "State Name" header value for newly created sheets.
+            terms_of_delivery: "Terms of Delivery" header value for new sheets.
+
+        Returns:
+            Path of the ledger file the last item was written to.
+        """
+        if rollover not in ("sheet", "file"):
+            raise ValueError(f"Unknown rollover target: {rollover}")
+
+        from openpyxl import Workbook, load_workbook
+
+        def new_workbook():
+            new_wb = Workbook()
+            new_ws = new_wb.active
+            new_ws.title = "Manufacturing Invoice"
+            self._init_manufacturing_sheet(new_ws, state_name, terms_of_delivery)
+            return new_wb, new_ws
+
+        # Continue from the latest existing ledger file
+        part = 1
+        while os.path.exists(self._ledger_part_path(workbook_path, part + 1)):
+            part += 1
+        path = self._ledger_part_path(workbook_path, part)
+
+        si_no = 0
+        roll_file = False
+        if os.path.exists(path):
+            wb = load_workbook(path)
+            ws = wb.worksheets[-1]
+            # Last numbered row of the last sheet holds the latest SI No.
+            for row_idx in range(ws.max_row, 3, -1):
+                value = ws.cell(row=row_idx, column=1).value
+                if isinstance(value, int):
+                    si_no = value
+                    break
+            roll_file = max_bytes is not None and os.path.getsize(path) >= max_bytes
+        else:
+            wb, ws = new_workbook()
+        rows_in_sheet = max(0, ws.max_row - 3)
+
+        dirty = False
+        for item in items:
+            sheet_full = max_rows is not None and rows_in_sheet >= max_rows
+            if roll_file or (sheet_full and rollover == "file"):
+                if dirty:
+                    wb.save(path)
+                part += 1
+                path = self._ledger_part_path(workbook_path, part)
+                wb, ws = new_workbook()
+                rows_in_sheet = 0
+                roll_file = False
+            elif sheet_full:
+                ws = wb.create_sheet(f"Manufacturing Invoice ({len(wb.worksheets) + 1})")
+                self._init_manufacturing_sheet(ws, state_name, terms_of_delivery)
+                rows_in_sheet = 0
+
+            si_no += 1
+            ws.append([si_no] + [item.get(field, "") for field in self.MANUFACTURING_FIELDS])
+            rows_in_sheet += 1
+            dirty = True
+
+        if dirty or not os.path.exists(path):
+            wb.save(path)
+            print(f"Excel file saved as {path}")
+
+        return path
+
+    # Manufacturing items of a sequence of invoices, as in invoice_export
+    iter_aggregated_items = staticmethod(iter_manufacturing_items)
+
+    def stream_manufacturing_excel(self, items: Iterable[Dict[str, Any]],
+                                   output_dir: str = ".", export_name: str = "Invoice_Export",
+                                   state_name: str = "Aggregated Invoices",
+                                   terms_of_delivery: str = "") -> str:
+        """
+        Create a manufacturing invoice Excel file from an iterator of items.
+
+        Written by manufacturing_excel.ManufacturingExcelWriter, the writer
+        invoice_export uses, through a write-only worksheet, so rows are
+        written as the items arrive and memory stays flat regardless of the
+        number of rows.
+
+        Args:
+            items: Manufacturing item dictionaries, consumed lazily.
+            output_dir: Directory in which to save the Excel file.
+            export_name: Custom filename prefix for the exported Excel file.
+            state_name: Value for the "State Name" header field.
+            terms_of_delivery: Value for the "Terms of Delivery" header field.
+
+        Returns:
+            Path to the created Excel file.
+        """
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        writer = ManufacturingExcelWriter(os.path.join(output_dir, f"{export_name}_{timestamp}.xlsx"),
+                                          state_name, terms_of_delivery)
+        writer.write_items(items)
+        return writer.close()
+
+    def export_items(self, items: Iterable[Dict[str, Any]], fmt: str = "csv",
+                     output_dir: str = ".", export_name: str = "Invoice_Export",
+                     chunk_size: int = 10000) -> str:
+        """
+        Export items to a columnar format with typed columns.
+
+        Quantities are split into a number and a unit, and rate, discount
+        and amount become decimals. Items are converted and written
+        chunk_size at a time.
+
+        Args:
+            items: Manufacturing item dictionaries, consumed lazily.
+            fmt: "csv", "jsonl" or "parquet" (Parquet requires pyarrow).
+            output_dir: Directory in which to save the file.
+            export_name: Custom filename prefix for the exported file.
+            chunk_size: Number of items written at a time.
+
+        Returns:
+            Path to the created file.
+        """
+        from columnar_export import ITEM_WRITERS, export_items
+
+        if fmt not in ITEM_WRITERS:
+            raise ValueError(f"Unknown export format: {fmt}")
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        extension = ITEM_WRITERS[fmt].extension
+        output_path = os.path.join(output_dir, f"{export_name}_{timestamp}.{extension}")
+        export_items(items, output_path, fmt, chunk_size=chunk_size)
+        print(f"{fmt.upper()} file saved as {output_path}")
 
         return output_path
 
@@ -182,6 +358,8 @@ class InvoiceExporter:
         """
         print(f"Processing image: {image_path}")
 
+        import cv2
+
         # Load image using OpenCV
         image = cv2.imread(image_path)
         if image is None:
@@ -197,8 +375,8 @@ class InvoiceExporter:
         # Return sample/mock data
         return {
             "invoiceNumber": f"INV-{os.path.basename(image_path).split('.')[0]}",
-            "date": pd.Timestamp.now().strftime('%Y-%m-%d'),
-            "materialId": f"MAT-{pd.Timestamp.now().strftime('%d%H%M')}",
+            "date": datetime.now().strftime('%Y-%m-%d'),
+            "materialId": f"MAT-{datetime.now().strftime('%d%H%M')}",
             "items": [
                 {
                     "description": "Laser Cut Item",
@@ -230,7 +408,7 @@ def process_file(file_path: str, exporter: InvoiceExporter) -> Dict[str, Any]:
         print("PDF processing not implemented yet. Returning placeholder data.")
         return {
             "invoiceNumber": f"INV-{os.path.basename(file_path).split('.')[0]}",
-            "date": pd.Timestamp.now().strftime('%Y-%m-%d'),
+            "date": datetime.now().strftime('%Y-%m-%d'),
             "total": "$1,234.56"
         }
     elif ext in ['.json']:
@@ -241,6 +419,289 @@ def process_file(file_path: str, exporter: InvoiceExporter) -> Dict[str, Any]:
         return {}
 
 
+_worker_exporter = None
+
+
+def _init_batch_worker():
+    """Create one InvoiceExporter per worker process."""
+    global _worker_exporter
+    _worker_exporter = InvoiceExporter()
+
+
+def _process_file_worker(file_path: str, _process_file=process_file):
+    """
+    Process a single file inside a batch worker process.
+
+    process_file is bound as a default argument because this script redefines
+    the name further down; workers started with "spawn" re-import the module.
+
+    Returns:
+        Tuple of (extracted data or None, error message or None).
+    """
+    try:
+        return _process_file(file_path, _worker_exporter), None
+    except Exception as e:
+        return None, str(e)
+
+
+def iter_batch_results(file_paths: List[str], exporter: InvoiceExporter, workers: int = 1,
+                       window: Optional[int] = None,
+                       _process_file=process_file) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Process several files, yielding each outcome as soon as it is available.
+
+    Errors are isolated per file and status is printed as each file finishes.
+    process_file is bound as a default argument, as in _process_file_worker.
+
+    Args:
+        file_paths: Files to process.
+        exporter: InvoiceExporter instance used when running serially.
+        workers: Number of worker processes; 1 processes files in this process.
+        window: With a process pool, submit no file more than this many
+            places after the oldest unfinished one; None submits them all.
+
+    Returns:
+        Iterator of (index into file_paths, extracted data or None,
+        error message or None), in completion order.
+    """
+    total = len(file_paths)
+
+    if workers <= 1:
+        for done, file_path in enumerate(file_paths, 1):
+            try:
+                data = _process_file(file_path, exporter)
+                print(f"[{done}/{total}] Processed {file_path}")
+                yield done - 1, data, None
+            except Exception as e:
+                print(f"[{done}/{total}] Error processing {file_path}: {e}")
+                yield done - 1, None, str(e)
+    else:
+        window = window or total
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker) as pool:
+            futures = {}
+            finished = set()
+            submitted = oldest = done = 0
+            while done < total:
+                while submitted < min(total, oldest + window):
+                    futures[pool.submit(_process_file_worker, file_paths[submitted])] = submitted
+                    submitted += 1
+                completed, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in sorted(completed, key=futures.get):
+                    index = futures.pop(future)
+                    file_path = file_paths[index]
+                    done += 1
+                    try:
+                        data, error = future.result()
+                    except Exception as e:
+                        # The worker process itself died (e.g. a crash in native code)
+                        data, error = None, str(e)
+                    if error is None:
+                        print(f"[{done}/{total}] Processed {file_path}")
+                    else:
+                        print(f"[{done}/{total}] Error processing {file_path}: {error}")
+                    finished.add(index)
+                    yield index, data, error
+                while oldest in finished:
+                    finished.remove(oldest)
+                    oldest += 1
+
+
+def iter_batch_data(file_paths: List[str], exporter: InvoiceExporter, workers: int = 1,
+                    window: Optional[int] = None,
+                    _process_file=process_file) -> Iterator[Dict[str, Any]]:
+    """
+    Process several files, yielding extracted data in the order of file_paths.
+
+    Files are processed by iter_batch_results, so status is still reported
+    in completion order; only the yielded data is put back in input order.
+    With a process pool, no file is submitted more than `window` places
+    after the oldest unfinished one, so at most `window` results wait to
+    be yielded however long the batch is.
+
+    Args:
+        file_paths: Files to process.
+        exporter: InvoiceExporter instance used when running serially.
+        workers: Number of worker processes; 1 processes files in this process.
+        window: Lookahead past the oldest unfinished file with a process
+            pool; defaults to 2 * workers.
+
+    Returns:
+        Iterator of non-empty extracted data dictionaries.
+    """
+    waiting: Dict[int, Optional[Dict[str, Any]]] = {}
+    next_index = 0
+    for index, data, _ in iter_batch_results(file_paths, exporter, workers, window=window or 2 * workers,
+                                             _process_file=_process_file):
+        waiting[index] = data
+        while next_index in waiting:
+            data = waiting.pop(next_index)
+            next_index += 1
+            if data:
+                yield data
+
+
+# File types picked up by watch mode
+WATCH_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.tiff', '.bmp', '.pdf', '.json'}
+
+
+def file_sha256(file_path: str) -> str:
+    """Content hash of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ProcessedManifest:
+    """
+    Record of already processed files, persisted as JSON.
+
+    Each entry keeps the size, mtime and content hash a file had when it was
+    processed. Unchanged size and mtime skip a file without reading it; a
+    changed stat with an unchanged hash (e.g. a touched or re-copied file)
+    is also skipped.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.changed = False
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self.entries = json.load(f)
+
+    def needs_processing(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Check a file against the manifest.
+
+        Returns:
+            The file's current (size, mtime, hash) record if it is new or
+            changed, otherwise None.
+        """
+        stat = os.stat(file_path)
+        key = os.path.abspath(file_path)
+        entry = self.entries.get(key)
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+            return None
+
+        record = {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': file_sha256(file_path)}
+        if entry and entry['sha256'] == record['sha256']:
+            # Same content with new metadata: remember the new stat and skip
+            self.entries[key] = dict(entry, size=record['size'], mtime=record['mtime'])
+            self.changed = True
+            return None
+        return record
+
+    def record(self, file_path: str, record: Dict[str, Any], status: str):
+        self.entries[os.path.abspath(file_path)] = dict(record, status=status)
+        self.changed = True
+
+    def save(self):
+        """Write the manifest atomically."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=1)
+        os.replace(tmp_path, self.path)
+        self.changed = False
+
+
+def watch_folder(input_dir: str, exporter: InvoiceExporter, ledger_path: str, manifest_path: str,
+                 workers: int = 1, poll_interval: float = 2.0, settle_seconds: float = 2.0,
+                 max_rows: Optional[int] = None, max_bytes: Optional[int] = None,
+                 rollover: str = "sheet"):
+    """
+    Watch a folder and append newly arriving invoices to a ledger workbook.
+
+    Uses inotify (via the optional inotify_simple package) to react to files
+    as soon as they are closed after writing, and falls back to polling
+    every poll_interval seconds. Files listed unchanged in the manifest are
+    skipped; polled files are only picked up once they have not been
+    modified for settle_seconds. Runs until interrupted.
+
+    Args:
+        input_dir: Folder to watch.
+        exporter: InvoiceExporter instance used when running serially.
+        ledger_path: Workbook that extracted items are appended to.
+        manifest_path: JSON manifest of processed files.
+        workers: Number of worker processes per batch of new files.
+        poll_interval: Seconds between scans when polling.
+        settle_seconds: Minimum age of a file's mtime before it is processed.
+        max_rows, max_bytes, rollover: Passed to append_manufacturing_excel.
+    """
+    manifest = ProcessedManifest(manifest_path)
+    ignored = {os.path.abspath(ledger_path), os.path.abspath(manifest_path)}
+
+    try:
+        from inotify_simple import INotify, flags
+        inotify = INotify()
+        inotify.add_watch(input_dir, flags.CLOSE_WRITE | flags.MOVED_TO)
+        print(f"Watching {input_dir} with inotify")
+    except (ImportError, OSError):
+        inotify = None
+        print(f"Watching {input_dir} by polling every {poll_interval}s")
+
+    def candidates(names):
+        paths = []
+        for name in sorted(names):
+            file_path = os.path.join(input_dir, name)
+            if (os.path.abspath(file_path) in ignored
+                    or os.path.splitext(name)[1].lower() not in WATCH_EXTENSIONS
+                    or not os.path.isfile(file_path)):
+                continue
+            paths.append(file_path)
+        return paths
+
+    def process_new(file_paths):
+        pending = []
+        now = time.time()
+        for file_path in file_paths:
+            try:
+                if inotify is None and now - os.path.getmtime(file_path) < settle_seconds:
+                    continue  # Possibly still being written; look again next scan
+                record = manifest.needs_processing(file_path)
+            except OSError:
+                continue  # Removed or unreadable since it was listed
+            if record is not None:
+                pending.append((file_path, record))
+        if not pending:
+            if manifest.changed:
+                manifest.save()
+            return
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(pending)
+        errors: List[Optional[str]] = [None] * len(pending)
+        for index, data, error in iter_batch_results([path for path, _ in pending], exporter, workers):
+            results[index], errors[index] = data, error
+
+        new_data = [data for data in results if data]
+        if new_data:
+            output_file = exporter.append_manufacturing_excel(
+                exporter.iter_aggregated_items(new_data), ledger_path,
+                max_rows=max_rows, max_bytes=max_bytes, rollover=rollover)
+            print(f"Appended {len(new_data)} invoice(s) to: {output_file}")
+
+        # Recorded only after the ledger is written, so a crash reprocesses
+        for (file_path, record), error in zip(pending, errors):
+            manifest.record(file_path, record, "error" if error else "processed")
+        manifest.save()
+
+    # Catch up on files that arrived while not watching
+    process_new(candidates(os.listdir(input_dir)))
+
+    try:
+        while True:
+            if inotify is not None:
+                events = inotify.read(timeout=int(poll_interval * 1000))
+                names = {event.name for event in events if event.name}
+            else:
+                time.sleep(poll_interval)
+                names = os.listdir(input_dir)
+            process_new(candidates(names))
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+
+
 def main():
     parser = argparse.ArgumentParser(description='Invoice OCR and Export Tool')
     parser.add_argument('--input', '-i',
@@ -252,16 +713,37 @@ def main():
     parser.add_argument('--export-name',
                         help='Custom filename prefix for the exported Excel file (without extension)',
                         default='Invoice_Export')
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                        help='Number of worker processes used when the input is a directory')
+    # Appending is only supported for xlsx ledgers, so the two are exclusive
+    destination = parser.add_mutually_exclusive_group()
+    destination.add_argument('--format', choices=EXPORT_FORMATS, default='xlsx',
+                             help='Export format; csv, jsonl and parquet get typed numeric columns')
+    destination.add_argument('--append-to',
+                             help='Append to this existing export workbook instead of creating a new one')
+    parser.add_argument('--max-rows', type=int, default=None,
+                        help='With --append-to, maximum item rows per sheet before rolling over')
+    parser.add_argument('--max-bytes', type=int, default=None,
+                        help='With --append-to, start a new workbook once the current one exceeds this size')
+    parser.add_argument('--rollover', choices=['sheet', 'file'], default='sheet',
+                        help='With --append-to, roll over to a new sheet or a new file when --max-rows is reached')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and append new files in the input directory to a ledger workbook')
+    parser.add_argument('--manifest',
+                        help='With --watch, manifest of processed files (default: <output>/<export-name>_manifest.json)')
+    parser.add_argument('--poll-interval', type=float, default=2.0,
+                        help='With --watch, seconds between scans when inotify is unavailable')
     # Use parse_known_args to avoid issues with extra arguments in some environments.
     args, _ = parser.parse_known_args()
 
     # Handle interactive file selection for input if needed.
     input_path = args.input
     if input_path.lower() == "upload":
-        if Tk is None:
+        tkinter = _load_tk()
+        if tkinter is None:
             print("Tkinter is not available, cannot open file dialog.")
             return
-        root = Tk()
+        root = tkinter.Tk()
         root.withdraw()  # Hide the main window
         file_path = tkinter.filedialog.askopenfilename(title="Select file to process")
         if file_path:
@@ -274,10 +756,11 @@ def main():
     # Handle interactive directory selection for output if requested.
     output_dir = args.output
     if output_dir.lower() == "choose":
-        if Tk is None:
+        tkinter = _load_tk()
+        if tkinter is None:
             print("Tkinter is not available, cannot open directory chooser.")
             return
-        root = Tk()
+        root = tkinter.Tk()
         root.withdraw()
         dir_path = tkinter.filedialog.askdirectory(title="Select output directory")
         if dir_path:
@@ -298,43 +781,71 @@ def main():
         print(f"Sample invoice exported to: {output_file}")
         return
 
+    # Watch mode: keep appending new arrivals to a ledger until interrupted.
+    if args.watch:
+        if not os.path.isdir(input_path):
+            print("--watch requires an input directory. Exiting.")
+            return
+        ledger_path = args.append_to or os.path.join(output_dir, f"{args.export_name}.xlsx")
+        manifest_path = args.manifest or os.path.join(output_dir, f"{args.export_name}_manifest.json")
+        watch_folder(input_path, exporter, ledger_path, manifest_path,
+                     workers=args.workers, poll_interval=args.poll_interval,
+                     max_rows=args.max_rows, max_bytes=args.max_bytes, rollover=args.rollover)
+        return
+
     # Process the input. If input_path is a directory, process all files inside;
-    # if it is a file, just process that one.
-    all_data = []
+    # if it is a file, just process that one. Invoices are extracted lazily
+    # and their items flow straight into the export.
     if os.path.isdir(input_path):
-        for file_name in os.listdir(input_path):
-            file_path = os.path.join(input_path, file_name)
-            if os.path.isfile(file_path):
-                try:
-                    data = process_file(file_path, exporter)
-                    if data:
-                        all_data.append(data)
-                except Exception as e:
-                    print(f"Error processing {file_path}: {e}")
+        # Sorted so the exported row order does not depend on the filesystem
+        file_paths = [os.path.join(input_path, file_name)
+                      for file_name in sorted(os.listdir(input_path))]
+        file_paths = [file_path for file_path in file_paths if os.path.isfile(file_path)]
+        invoices = iter_batch_data(file_paths, exporter, workers=args.workers)
     elif os.path.isfile(input_path):
-        try:
-            data = process_file(input_path, exporter)
-            if data:
-                all_data.append(data)
-        except Exception as e:
-            print(f"Error processing {input_path}: {e}")
+        invoices = iter_batch_data([input_path], exporter)
     else:
         print("The input path is neither a file nor a directory. Exiting.")
         return
 
-    if all_data:
-        # If multiple files produced data, aggregate and export to Excel.
-        output_file = exporter.create_manufacturing_excel(
-            {"manufacturingTableData": all_data},
+    # Only create an export once the first invoice has data
+    first = next(invoices, None)
+    if first is None:
+        print("No data to export.")
+        return
+
+    totals = BatchTotals()
+    items = totals.track_items(exporter.iter_aggregated_items(
+        totals.track_invoices(itertools.chain([first], invoices))))
+
+    if args.format != 'xlsx':
+        output_file = exporter.export_items(
+            items,
+            fmt=args.format,
             output_dir=output_dir,
             export_name=args.export_name)
         print(f"Data exported to: {output_file}")
+    elif args.append_to:
+        output_file = exporter.append_manufacturing_excel(
+            items,
+            args.append_to,
+            max_rows=args.max_rows,
+            max_bytes=args.max_bytes,
+            rollover=args.rollover)
+        print(f"Data appended to: {output_file}")
     else:
-        print("No data to export.")
+        # Aggregate all files into one Excel file, written row by row
+        output_file = exporter.stream_manufacturing_excel(
+            items,
+            output_dir=output_dir,
+            export_name=args.export_name)
+        print(f"Data exported to: {output_file}")
+    print(f"Exported {totals}")
 
 
 if __name__ == "__main__":
-    main()
+    # Exit here so the notebook code below (and its imports) only loads on import
+    sys.exit(main())
 
 
 
@@ -353,95 +864,174 @@ if __name__ == "__main__":
 import os
 import cv2
 import numpy as np
-import pytesseract
 import pandas as pd
-from pdf2image import convert_from_path
+from cell_triage import is_blank_cell
+from invoice_export import iter_pdf_pages
+from deskew import straighten_page
+from page_regions import locate_page_regions, parse_header_fields
+# pytesseract and pdf2image are imported by the functions that OCR or render PDFs
 
-# If tesseract is not in your PATH, set it here:
+# If tesseract is not in your PATH, set it here (after importing pytesseract):
 # pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
-def process_file(input_path, output_excel='invoice_output.xlsx', poppler_path=None):
+def process_file(input_path, output_excel='invoice_output.xlsx', poppler_path=None, page_window=1,
+                 grid_engine='morphology', localize=True, deskew=True):
     """
     Main function to handle both PDF and image files.
-    1) If PDF, convert each page to an image and process them.
+    1) If PDF, render pages `page_window` at a time and process them in memory.
     2) If image, just process that single file.
-    3) Combine results into a single Excel with two sheets:
+    3) Combine results into a single Excel with three sheets:
        - FullText
+       - Header (invoice number and date found on each page)
        - ParsedTable
+    `grid_engine`, `localize` and `deskew` are passed on to process_image.
+    Table rows are spilled to a temporary file as pages finish and the
+    workbook is written with write-only sheets, so memory does not grow
+    with the number of pages (only the page text is kept).
     """
+    import tempfile
+    from openpyxl import Workbook
 
-    all_full_text = []    # List of strings, one per page
-    all_tables = []       # List of DataFrames, one per page
-
-    # 1) Check if it's a PDF
-    if input_path.lower().endswith('.pdf'):
-        pages = convert_from_path(input_path, dpi=200, poppler_path=poppler_path)
-        for i, page in enumerate(pages):
-            temp_img = f'temp_page_{i}.png'
-            page.save(temp_img, 'PNG')
+    wb = Workbook(write_only=True)
+    ws_text = wb.create_sheet('FullText')
+    ws_header = wb.create_sheet('Header')
+    ws_header.append(['Page', 'Invoice Number', 'Date'])
 
-            page_text, page_table = process_image(temp_img)
-            all_full_text.append(f"--- Page {i+1} ---\n" + page_text)
+    all_full_text = []    # List of strings, one per page
+    max_cols = 0          # Widest table row seen so far
+
+    with tempfile.TemporaryFile('w+', encoding='utf-8') as table_rows:
+        for page_number, page_text, page_table in iter_page_results(
+                input_path, poppler_path=poppler_path, page_window=page_window,
+                grid_engine=grid_engine, localize=localize, deskew=deskew):
+            all_full_text.append(page_text)
+            header = parse_header_fields(page_text)
+            ws_header.append([page_number, header.get('invoiceNumber'), header.get('date')])
+
+            # Each table row gets a "Page" value to distinguish which page
+            max_cols = max(max_cols, page_table.shape[1])
+            for row in page_table.itertuples(index=False):
+                table_rows.write(json.dumps([page_number] + list(row)) + '\n')
+
+        # Full text of all pages in one cell
+        ws_text.append(['Full Text'])
+        ws_text.append(["\n\n".join(all_full_text)])
+
+        # Table in the last sheet, padded to the widest row
+        if max_cols > 0:
+            ws_table = wb.create_sheet('ParsedTable')
+            ws_table.append(['Page'] + [f'Col_{i+1}' for i in range(max_cols)])
+            table_rows.seek(0)
+            for line in table_rows:
+                row = json.loads(line)
+                ws_table.append(row + [None] * (max_cols + 1 - len(row)))
+
+        wb.save(output_excel)
 
-            # Add a "Page" column to distinguish which page
-            if not page_table.empty:
-                page_table.insert(0, 'Page', i+1)
-            all_tables.append(page_table)
+    print(f"✅ Finished! Results saved to: {output_excel}")
 
-            # Cleanup temp image
-            os.remove(temp_img)
 
+def iter_page_results(input_path, poppler_path=None, page_window=1, grid_engine='morphology', localize=True,
+                      deskew=True):
+    """
+    Process the pages of a PDF or a single image one at a time.
+    Yields: (page_number, page_text, table_df); PDF page text starts with a
+    "--- Page n ---" marker
+    """
+    if input_path.lower().endswith('.pdf'):
+        for page_number, page_image in iter_pdf_pages(input_path, dpi=200, poppler_path=poppler_path,
+                                                      window=page_window):
+            page_text, page_table = process_image(page_image, grid_engine=grid_engine, localize=localize,
+                                                  deskew=deskew)
+            yield page_number, f"--- Page {page_number} ---\n" + page_text, page_table
     else:
-        # 2) It's an image (PNG/JPG/etc.)
-        page_text, page_table = process_image(input_path)
-        all_full_text.append(page_text)
-        if not page_table.empty:
-            page_table.insert(0, 'Page', 1)
-        all_tables.append(page_table)
-
-    # Combine all text from pages into one
-    combined_text = "\n\n".join(all_full_text)
-
-    # Combine all table DataFrames (if multiple pages)
-    if len(all_tables) > 0:
-        combined_table = pd.concat(all_tables, ignore_index=True)
-    else:
-        combined_table = pd.DataFrame()
-
-    # 3) Write to Excel (two sheets)
-    with pd.ExcelWriter(output_excel) as writer:
-        # Full text in one cell
-        df_text = pd.DataFrame([combined_text], columns=['Full Text'])
-        df_text.to_excel(writer, sheet_name='FullText', index=False)
-
-        # Table in second sheet
-        if not combined_table.empty:
-            combined_table.to_excel(writer, sheet_name='ParsedTable', index=False)
-
-    print(f"✅ Finished! Results saved to: {output_excel}")
+        page_text, page_table = process_image(input_path, grid_engine=grid_engine, localize=localize,
+                                              deskew=deskew)
+        yield 1, page_text, page_table
 
 
-def process_image(img_path):
+def process_image(image, grid_engine='morphology', localize=True, deskew=True):
     """
     Processes a single image:
-    1) Full-page OCR for all text
-    2) Table detection with morphological operations + contour
-    3) OCR each cell -> DataFrame
-    Returns: (full_text_string, table_df)
+    0) With `deskew`, turn a sideways page upright and remove small skew
+       (deskew.straighten_page) so table detection sees level lines
+    1) Localisation: with `localize`, find the line-item table and the
+       header block on a downscaled copy (page_regions.locate_page_regions)
+    2) OCR for the text: only the header block when the table was
+       located, otherwise the full page
+    3) Table detection inside the table region (or the full page), either
+       with morphological operations + contour (grid_engine='morphology')
+       or from ink projection profiles (grid_engine='projection')
+    4) OCR each cell -> DataFrame
+    `image` is a file path or an already decoded BGR NumPy array.
+    Returns: (text_string, table_df)
     """
 
-    # --- (A) Full Page OCR ---
-    image = cv2.imread(img_path)
-    config = r'--oem 3 --psm 6'
-    full_text = pytesseract.image_to_string(image, config=config)
+    import pytesseract
 
-    # --- (B) Table Detection ---
+    if isinstance(image, str):
+        image = cv2.imread(image)
+    config = r'--oem 3 --psm 6'
+    if deskew:
+        image = straighten_page(image)[0]
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    # --- (A) Localisation ---
+    regions = locate_page_regions(gray) if localize else {"table": None, "header": None}
+
+    # --- (B) Header or Full Page OCR ---
+    if regions["table"] is not None:
+        if regions["header"] is not None:
+            x, y, w, h = regions["header"]
+            full_text = pytesseract.image_to_string(gray[y:y+h, x:x+w], config=config)
+        else:
+            full_text = ""
+        x, y, w, h = regions["table"]
+        gray = gray[y:y+h, x:x+w]
+    else:
+        full_text = pytesseract.image_to_string(image, config=config)
+
+    # --- (C) Table Detection ---
     # Invert the bits (for easier line detection)
     # adaptiveThreshold with ~gray in some tutorials, or we can do ~gray if needed
     binary = cv2.adaptiveThreshold(~gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C,
                                    cv2.THRESH_BINARY, 15, -2)
 
+    if grid_engine == 'morphology':
+        table_data = extract_table_morphology(gray, binary, config)
+    elif grid_engine == 'projection':
+        table_data = extract_table_projection(gray, binary, config)
+    else:
+        raise ValueError(f"Unknown grid engine: {grid_engine}")
+
+    # If no table_data found, return empty DataFrame
+    if not table_data:
+        return (full_text, pd.DataFrame())
+
+    # Some invoices might have 8-9 columns, some 6, etc.
+    # We'll guess the maximum columns from the largest row
+    max_cols = max(len(r) for r in table_data)
+    # We'll create generic column names
+    col_names = [f'Col_{i+1}' for i in range(max_cols)]
+
+    df_table = pd.DataFrame(table_data, columns=col_names)
+
+    # Optionally rename columns if you know the exact structure:
+    # Example (if you know you have exactly 8 columns):
+    # desired_cols = ['Sl No','Part No','Description','HSN/SAC','Quantity','Rate','Disc.%','Amount']
+    # if max_cols >= 8:
+    #     df_table.columns = desired_cols + col_names[8:]  # keep extras
+
+    return (full_text, df_table)
+
+
+def extract_table_morphology(gray, binary, config):
+    """
+    Table detection with morphological line extraction + contours.
+    Returns: list of rows, each a list of cell strings
+    """
+    import pytesseract
+
     # Extract horizontal and vertical lines
     horizontal = binary.copy()
     vertical = binary.copy()
@@ -504,30 +1094,144 @@ def process_image(img_path):
         row_data = []
         for (x, y, w, h) in row:
             roi = gray[y:y+h, x:x+w]
+            if is_blank_cell(roi):
+                row_data.append('')
+                continue
             cell_text = pytesseract.image_to_string(roi, config=config)
             cell_text = cell_text.strip().replace('\n',' ')
             row_data.append(cell_text)
         table_data.append(row_data)
 
-    # If no table_data found, return empty DataFrame
-    if not table_data:
-        return (full_text, pd.DataFrame())
+    return table_data
 
-    # Some invoices might have 8-9 columns, some 6, etc.
-    # We'll guess the maximum columns from the largest row
-    max_cols = max(len(r) for r in table_data)
-    # We'll create generic column names
-    col_names = [f'Col_{i+1}' for i in range(max_cols)]
 
-    df_table = pd.DataFrame(table_data, columns=col_names)
+def find_separators(profile, threshold):
+    """
+    Find ruling-line positions in a 1-D ink projection profile.
+    Consecutive positions above `threshold` are merged into one separator.
+    Returns: list of (start, end) index pairs, end inclusive
+    """
+    above = np.concatenate(([False], profile >= threshold, [False]))
+    edges = np.flatnonzero(np.diff(above.astype(np.int8)))
+    return [(int(a), int(b)) for a, b in zip(edges[0::2], edges[1::2] - 1)]
 
-    # Optionally rename columns if you know the exact structure:
-    # Example (if you know you have exactly 8 columns):
-    # desired_cols = ['Sl No','Part No','Description','HSN/SAC','Quantity','Rate','Disc.%','Amount']
-    # if max_cols >= 8:
-    #     df_table.columns = desired_cols + col_names[8:]  # keep extras
 
-    return (full_text, df_table)
+def detect_grid_projection(binary, line_ratio=0.6, presence_ratio=0.8):
+    """
+    Table grid detection from horizontal and vertical ink projection profiles.
+    1) Rows whose ink count reaches `line_ratio` of the strongest row are
+       horizontal separators; the same test on columns between the first and
+       last horizontal separator gives the vertical separators.
+    2) A separator segment counts as present between two neighbouring
+       separators when at least `presence_ratio` of it is inked; absent
+       segments merge neighbouring grid units into row/col spans.
+    Rulings must be level: a full-width table skewed by 1° already finds no
+    grid, so process_image straightens the page first.
+    Returns: dict with 'row_lines', 'col_lines' (lists of (start, end)) and
+             'cells' (dicts with row, col, rowspan, colspan, x, y, w, h),
+             or None if no grid is found
+    """
+    ink = binary > 0
+
+    h_profile = cv2.reduce(binary, 1, cv2.REDUCE_SUM, dtype=cv2.CV_32S).ravel() // 255
+    if h_profile.max() == 0:
+        return None
+    row_lines = find_separators(h_profile, line_ratio * h_profile.max())
+    if len(row_lines) < 2:
+        return None
+
+    top, bottom = row_lines[0][0], row_lines[-1][1] + 1
+    band = binary[top:bottom]
+    v_profile = cv2.reduce(band, 0, cv2.REDUCE_SUM, dtype=cv2.CV_32S).ravel() // 255
+    col_lines = find_separators(v_profile, line_ratio * (bottom - top))
+    if len(col_lines) < 2:
+        return None
+
+    n_rows, n_cols = len(row_lines) - 1, len(col_lines) - 1
+
+    # Inked run along each separator, as cumulative sums for range queries
+    v_ink = np.cumsum(np.concatenate(
+        [np.zeros((1, len(col_lines)), np.int64),
+         np.stack([ink[:, a:b + 1].any(axis=1) for a, b in col_lines], axis=1)]), axis=0)
+    h_ink = np.cumsum(np.concatenate(
+        [np.zeros((len(row_lines), 1), np.int64),
+         np.stack([ink[a:b + 1, :].any(axis=0) for a, b in row_lines])], axis=1), axis=1)
+
+    def v_present(r, k):
+        # Vertical separator k between horizontal separators r and r + 1
+        a, b = row_lines[r][1] + 1, row_lines[r + 1][0]
+        return b <= a or (v_ink[b, k] - v_ink[a, k]) >= presence_ratio * (b - a)
+
+    def h_present(k, c):
+        # Horizontal separator k between vertical separators c and c + 1
+        a, b = col_lines[c][1] + 1, col_lines[c + 1][0]
+        return b <= a or (h_ink[k, b] - h_ink[k, a]) >= presence_ratio * (b - a)
+
+    # Union grid units that are not separated by a present line
+    parent = list(range(n_rows * n_cols))
+
+    def find(u):
+        while parent[u] != u:
+            parent[u] = parent[parent[u]]
+            u = parent[u]
+        return u
+
+    for r in range(n_rows):
+        for c in range(n_cols):
+            if c + 1 < n_cols and not v_present(r, c + 1):
+                parent[find(r * n_cols + c + 1)] = find(r * n_cols + c)
+            if r + 1 < n_rows and not h_present(r + 1, c):
+                parent[find((r + 1) * n_cols + c)] = find(r * n_cols + c)
+
+    groups = {}
+    for u in range(n_rows * n_cols):
+        groups.setdefault(find(u), []).append(divmod(u, n_cols))
+
+    cells = []
+    for units in groups.values():
+        r0 = min(r for r, c in units)
+        r1 = max(r for r, c in units)
+        c0 = min(c for r, c in units)
+        c1 = max(c for r, c in units)
+        x = col_lines[c0][1] + 1
+        y = row_lines[r0][1] + 1
+        cells.append({
+            'row': r0, 'col': c0,
+            'rowspan': r1 - r0 + 1, 'colspan': c1 - c0 + 1,
+            'x': x, 'y': y,
+            'w': col_lines[c1 + 1][0] - x, 'h': row_lines[r1 + 1][0] - y,
+        })
+    cells.sort(key=lambda cell: (cell['row'], cell['col']))
+
+    return {'row_lines': row_lines, 'col_lines': col_lines, 'cells': cells}
+
+
+def extract_table_projection(gray, binary, config):
+    """
+    Table extraction on the projection-profile grid.
+    Every grid row yields a full-width row; a spanning cell's text is placed
+    at its top-left position and the positions it covers are left empty.
+    Returns: list of rows, each a list of cell strings
+    """
+    import pytesseract
+
+    grid = detect_grid_projection(binary)
+    if grid is None:
+        return []
+
+    n_rows, n_cols = len(grid['row_lines']) - 1, len(grid['col_lines']) - 1
+    table_data = [[''] * n_cols for _ in range(n_rows)]
+    for cell in grid['cells']:
+        x, y, w, h = cell['x'], cell['y'], cell['w'], cell['h']
+        if w <= 0 or h <= 0:
+            continue
+        roi = gray[y:y+h, x:x+w]
+        if is_blank_cell(roi):
+            continue
+        cell_text = pytesseract.image_to_string(roi, config=config)
+        table_data[cell['row']][cell['col']] = cell_text.strip().replace('\n', ' ')
+
+    return table_data
 
 
 if __name__ == "__main__":
@@ -0,0 +1,40 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ocr_engines import OCR_ENGINES  # noqa: E402
+
+
+class FakeOCREngine:
+    """OCR engine returning fixed text and recording the images it was given"""
+
+    name = "fake"
+    text = ""
+    images = []
+
+    def __init__(self, lang: str = "eng"):
+        self.lang = lang
+
+    def image_to_string(self, image, config: str = "") -> str:
+        FakeOCREngine.images.append(image)
+        return FakeOCREngine.text
+
+    def image_to_data(self, image, config: str = ""):
+        FakeOCREngine.images.append(image)
+        return {key: [] for key in ("level", "block_num", "par_num", "line_num", "word_num",
+                                    "left", "top", "width", "height", "conf", "text")}
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    """Register FakeOCREngine as the "fake" engine, with its recordings reset"""
+    monkeypatch.setitem(OCR_ENGINES, FakeOCREngine.name, FakeOCREngine)
+    monkeypatch.setattr(FakeOCREngine, "text", "")
+    monkeypatch.setattr(FakeOCREngine, "images", [])
+    return FakeOCREngine
@@ -0,0 +1,69 @@
+import time
+
+import test as cli
+
+
+def slow_first_worker(file_path):
+    """Batch worker that finishes the file named "slow" last"""
+    if file_path.endswith("slow"):
+        time.sleep(0.5)
+    return {"file": file_path}, None
+
+
+def test_status_in_completion_order_data_in_input_order(monkeypatch, capsys):
+    monkeypatch.setattr(cli, "_process_file_worker", slow_first_worker)
+    monkeypatch.setattr(cli, "_init_batch_worker", lambda: None)
+    paths = ["slow", "b", "c", "d"]
+
+    data = list(cli.iter_batch_data(paths, cli.InvoiceExporter(), workers=2))
+
+    assert [invoice["file"] for invoice in data] == paths
+    status = capsys.readouterr().out.splitlines()
+    assert status[-1] == "[4/4] Processed slow"
+
+
+def test_window_bounds_lookahead(monkeypatch):
+    monkeypatch.setattr(cli, "_process_file_worker", slow_first_worker)
+    monkeypatch.setattr(cli, "_init_batch_worker", lambda: None)
+    paths = ["slow"] + [f"f{i}" for i in range(6)]
+
+    order = [index for index, _, _ in cli.iter_batch_results(paths, cli.InvoiceExporter(), workers=2, window=3)]
+
+    # With the first file stuck, only the two files after it can be started
+    assert order.index(0) == 2
+
+
+def failing_worker(file_path):
+    """Batch worker failing on "bad" and raising out of the worker on "crash" """
+    if file_path == "bad":
+        return None, "unreadable"
+    if file_path == "crash":
+        raise RuntimeError("worker died")
+    return {"file": file_path}, None
+
+
+def test_pool_errors_are_isolated_per_file(monkeypatch, capsys):
+    monkeypatch.setattr(cli, "_process_file_worker", failing_worker)
+    monkeypatch.setattr(cli, "_init_batch_worker", lambda: None)
+    paths = ["a", "bad", "crash", "d"]
+
+    results = sorted(cli.iter_batch_results(paths, cli.InvoiceExporter(), workers=2))
+
+    assert results == [(0, {"file": "a"}, None), (1, None, "unreadable"),
+                       (2, None, "worker died"), (3, {"file": "d"}, None)]
+    assert "Error processing bad: unreadable" in capsys.readouterr().out
+
+
+def test_single_worker_runs_in_process(monkeypatch):
+    # A pool would fail to start: the serial path must not create one
+    monkeypatch.setattr(cli, "ProcessPoolExecutor", None)
+
+    def process(file_path, exporter):
+        if file_path == "bad":
+            raise ValueError("unreadable")
+        return {"file": file_path}
+
+    results = list(cli.iter_batch_results(["a", "bad", "c"], cli.InvoiceExporter(), workers=1,
+                                          _process_file=process))
+
+    assert results == [(0, {"file": "a"}, None), (1, None, "unreadable"), (2, {"file": "c"}, None)]
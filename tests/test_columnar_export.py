@@ -0,0 +1,14 @@
+import json
+
+from columnar_export import export_items
+
+
+def test_jsonl_keeps_exact_decimals(tmp_path):
+    path = tmp_path / "items.jsonl"
+    export_items([{"partNo": "LC-1", "quantity": "25 Nos.", "rate": "90.725",
+                   "amount": "2,268.125"}], str(path), "jsonl")
+
+    record = json.loads(path.read_text().splitlines()[0])
+    assert record["rate"] == "90.725"
+    assert record["amount"] == "2268.125"
+    assert record["quantity"] == 25
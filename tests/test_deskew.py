@@ -0,0 +1,43 @@
+import cv2
+import numpy as np
+import pytest
+
+from deskew import MIN_SKEW, estimate_quarter_turn, rotate_page, straighten_page
+
+
+def text_page():
+    """Left-aligned text lines of varying length, as on an invoice"""
+    page = np.full((1400, 1000), 255, np.uint8)
+    for i, y in enumerate(range(100, 1300, 45)):
+        line = f"LC-{i:04d} Laser cut bracket {i} pcs 125.00"[:10 + i % 20]
+        cv2.putText(page, line, (60, y), cv2.FONT_HERSHEY_SIMPLEX, 0.9, 0, 2)
+    return page
+
+
+@pytest.mark.parametrize("skew", [3.0, -2.0])
+def test_skew_is_measured_and_removed(skew):
+    straightened, turn, angle = straighten_page(rotate_page(text_page(), skew))
+    assert turn is None
+    # Any residual is below the skew that would be corrected
+    assert angle == pytest.approx(-skew, abs=MIN_SKEW)
+    assert straighten_page(straightened)[2] == 0.0
+
+
+def test_small_skew_is_left_alone():
+    skewed = rotate_page(text_page(), 0.1)
+    straightened, turn, angle = straighten_page(skewed)
+    assert (turn, angle) == (None, 0.0)
+    assert straightened is skewed
+
+
+@pytest.mark.parametrize("turned, back", [
+    (cv2.ROTATE_90_CLOCKWISE, cv2.ROTATE_90_COUNTERCLOCKWISE),
+    (cv2.ROTATE_90_COUNTERCLOCKWISE, cv2.ROTATE_90_CLOCKWISE),
+])
+def test_sideways_pages_are_turned_upright(turned, back):
+    page = text_page()
+    assert estimate_quarter_turn(page) is None
+
+    straightened, turn, angle = straighten_page(cv2.rotate(page, turned))
+    assert (turn, angle) == (back, 0.0)
+    assert np.array_equal(straightened, page)
@@ -0,0 +1,16 @@
+from page_regions import parse_header_fields
+
+
+def test_label_and_value_on_one_line():
+    fields = parse_header_fields("Invoice No: SCT/2324/118\nDated: 31-Mar-24")
+    assert fields == {"invoiceNumber": "SCT/2324/118", "date": "2024-03-31"}
+
+
+def test_values_under_labels_on_next_line():
+    text = "Invoice No.          Dated\nSCT/2324/118        31-Mar-24"
+    assert parse_header_fields(text) == {"invoiceNumber": "SCT/2324/118", "date": "2024-03-31"}
+
+
+def test_label_words_are_not_values():
+    text = "Invoice No.   Ref\n\nDated"
+    assert parse_header_fields(text) == {}
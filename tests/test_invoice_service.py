@@ -0,0 +1,109 @@
+import http.client
+import os
+import threading
+from http.server import ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+from invoice_export import InvoiceExporter
+from invoice_service import ExtractionService, make_handler
+
+
+def test_submitted_job_returns_extracted_data(fake_ocr):
+    fake_ocr.text = "LC-0001 Laser cut bracket 10 125.00 1250.00"
+    page = np.full((1200, 900, 3), 255, np.uint8)
+    cv2.putText(page, "LC-0001 Laser cut bracket 10 125.00 1250.00", (40, 300),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+    body = cv2.imencode(".png", page)[1].tobytes()
+
+    service = ExtractionService(InvoiceExporter(ocr_engine=fake_ocr.name))
+    try:
+        job = service.submit("invoice.png", body, want_excel=True)
+        service.queue.join()
+
+        assert job.status == "done", job.error
+        assert job.result is not None
+        assert job.result["items"][0]["amount"] == "1250.00"
+        assert job.excel_path is not None and job.excel_path.startswith(service.upload_dir)
+    finally:
+        service.close()
+
+
+def test_pdf_pages_are_extracted_and_combined(monkeypatch, fake_ocr, tmp_path):
+    import invoice_export
+
+    fake_ocr.text = "LC-0001 Laser cut bracket 10 125.00 1250.00"
+    pages = [np.full((800, 600, 3), 255, np.uint8) for _ in range(2)]
+    for page in pages:
+        cv2.putText(page, fake_ocr.text, (20, 200), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
+    monkeypatch.setattr(invoice_export, "iter_pdf_pages", lambda path, **kwargs: enumerate(pages, 1))
+
+    pdf_path = tmp_path / "invoice.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4")
+    data = invoice_export.process_file(str(pdf_path), InvoiceExporter(ocr_engine=fake_ocr.name))
+
+    assert data["pages"] == 2
+    assert [item["amount"] for item in data["items"]] == ["1250.00", "1250.00"]
+
+
+def serve(service, allowed_origin=None):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(service, 1024 * 1024, allowed_origin))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+
+
+def test_full_queue_rejects_upload_before_writing_it(fake_ocr):
+    # No workers: the single queue slot stays taken
+    service = ExtractionService(InvoiceExporter(ocr_engine=fake_ocr.name), queue_depth=1, workers=0)
+    server, conn = serve(service)
+    try:
+        assert service.submit("first.png", b"queued") is not None
+        assert service.submit("second.png", b"rejected") is None
+
+        conn.request("POST", "/jobs?filename=third.png", body=b"rejected")
+        response = conn.getresponse()
+        assert response.status == 429
+        assert response.getheader("Retry-After") == "1"
+        assert len(os.listdir(service.upload_dir)) == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+
+def test_allowed_origin_adds_cors_headers(fake_ocr):
+    service = ExtractionService(InvoiceExporter(ocr_engine=fake_ocr.name), workers=0)
+    server, conn = serve(service, allowed_origin="http://localhost:8080")
+    try:
+        conn.request("OPTIONS", "/jobs", headers={"Origin": "http://localhost:8080",
+                                                  "Access-Control-Request-Method": "POST"})
+        preflight = conn.getresponse()
+        preflight.read()
+        assert preflight.status == 204
+        assert preflight.getheader("Access-Control-Allow-Origin") == "http://localhost:8080"
+        assert "POST" in preflight.getheader("Access-Control-Allow-Methods")
+        assert "X-Filename" in preflight.getheader("Access-Control-Allow-Headers")
+
+        conn.request("GET", "/health")
+        health = conn.getresponse()
+        health.read()
+        assert health.getheader("Access-Control-Allow-Origin") == "http://localhost:8080"
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
+
+
+def test_no_cors_headers_without_allowed_origin(fake_ocr):
+    service = ExtractionService(InvoiceExporter(ocr_engine=fake_ocr.name), workers=0)
+    server, conn = serve(service)
+    try:
+        conn.request("GET", "/health")
+        response = conn.getresponse()
+        response.read()
+        assert response.getheader("Access-Control-Allow-Origin") is None
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.close()
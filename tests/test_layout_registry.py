@@ -0,0 +1,61 @@
+import cv2
+import numpy as np
+
+from invoice_export import InvoiceExporter
+from layout_registry import LayoutRegistry
+
+COLUMN_EDGES = [60, 260, 900, 1100, 1340]
+TABLE_TOP = 400
+ROW_HEIGHT = 50
+
+
+def ruled_invoice(item_count):
+    """A page of one template: fixed header band, ruled table with item_count rows"""
+    page = np.full((1700, 1400), 255, np.uint8)
+    cv2.putText(page, "ACME COMPONENTS PVT LTD", (80, 120), cv2.FONT_HERSHEY_SIMPLEX, 2, 0, 4)
+    cv2.putText(page, "Invoice No. 118    Dated 31-Mar-24", (80, 250), cv2.FONT_HERSHEY_SIMPLEX, 1.2, 0, 2)
+
+    bottom = TABLE_TOP + ROW_HEIGHT * (item_count + 1)
+    for x in COLUMN_EDGES:
+        cv2.line(page, (x, TABLE_TOP), (x, bottom), 0, 2)
+    for i in range(item_count + 2):
+        y = TABLE_TOP + i * ROW_HEIGHT
+        cv2.line(page, (COLUMN_EDGES[0], y), (COLUMN_EDGES[-1], y), 0, 2)
+    for i in range(item_count + 1):
+        y = TABLE_TOP + i * ROW_HEIGHT + 35
+        for x in COLUMN_EDGES[:-1]:
+            cv2.putText(page, "Item" if i else "Head", (x + 15, y), cv2.FONT_HERSHEY_SIMPLEX, 0.8, 0, 2)
+    return page, (COLUMN_EDGES[0], TABLE_TOP, COLUMN_EDGES[-1] - COLUMN_EDGES[0], bottom - TABLE_TOP)
+
+
+def learned_rows(table_box):
+    """Cells of a ruled table as detection would return them"""
+    x0, top, w, h = table_box
+    return [[(left + 2, y + 2, right - left - 4, ROW_HEIGHT - 4)
+             for left, right in zip(COLUMN_EDGES, COLUMN_EDGES[1:])]
+            for y in range(top, top + h, ROW_HEIGHT)]
+
+
+def test_same_template_matches_with_different_item_counts():
+    registry = LayoutRegistry()
+    page, box = ruled_invoice(item_count=3)
+    rows = learned_rows(box)
+    registry.learn(page, rows, InvoiceExporter.assign_columns(rows), box)
+    assert len(registry) == 1
+
+    longer, longer_box = ruled_invoice(item_count=8)
+    matched = registry.match(longer, longer_box)
+
+    assert matched is not None
+    assert len(matched) == 9
+    assert all(len(row) == 4 for row in matched)
+    assert [x for x, _, _, _ in matched[0]] == [x + 2 for x in COLUMN_EDGES[:-1]]
+
+
+def test_page_without_ruling_lines_is_not_learned():
+    registry = LayoutRegistry()
+    page = np.full((1700, 1400), 255, np.uint8)
+    cv2.putText(page, "Plain letter", (80, 120), cv2.FONT_HERSHEY_SIMPLEX, 2, 0, 4)
+    rows = [[(80, 500, 200, 40), (400, 500, 200, 40)], [(80, 560, 200, 40), (400, 560, 200, 40)]]
+    registry.learn(page, rows, InvoiceExporter.assign_columns(rows), (60, 480, 800, 200))
+    assert len(registry) == 0
@@ -0,0 +1,42 @@
+import os
+
+from openpyxl import load_workbook
+
+import test as cli
+
+
+def items(start, count):
+    return [{"partNo": f"P-{i}", "amount": f"{i}.00"} for i in range(start, start + count)]
+
+
+def numbers(worksheet):
+    return [row[0] for row in worksheet.iter_rows(min_row=4, values_only=True)]
+
+
+def test_appends_continue_numbering_and_roll_over_sheets(tmp_path):
+    ledger = str(tmp_path / "ledger.xlsx")
+    exporter = cli.InvoiceExporter()
+
+    exporter.append_manufacturing_excel(items(0, 2), ledger, max_rows=3)
+    exporter.append_manufacturing_excel(items(2, 3), ledger, max_rows=3)
+
+    sheets = load_workbook(ledger).worksheets
+    assert [numbers(sheet) for sheet in sheets] == [[1, 2, 3], [4, 5]]
+    assert sheets[1]["A3"].value == "SI No."
+
+
+def test_file_rollover_by_rows_and_size(tmp_path):
+    ledger = str(tmp_path / "ledger.xlsx")
+    exporter = cli.InvoiceExporter()
+
+    last = exporter.append_manufacturing_excel(items(0, 5), ledger, max_rows=2, rollover="file")
+    assert last == str(tmp_path / "ledger_003.xlsx")
+    assert [numbers(load_workbook(path).active) for path in
+            (ledger, tmp_path / "ledger_002.xlsx", last)] == [[1, 2], [3, 4], [5]]
+
+    # The latest part is already over the size limit: the next append starts a new file
+    last = exporter.append_manufacturing_excel(items(5, 1), ledger, max_bytes=1)
+    assert last == str(tmp_path / "ledger_004.xlsx")
+    assert numbers(load_workbook(last).active) == [6]
+    assert sorted(os.listdir(tmp_path)) == ["ledger.xlsx", "ledger_002.xlsx",
+                                            "ledger_003.xlsx", "ledger_004.xlsx"]
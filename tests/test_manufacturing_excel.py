@@ -0,0 +1,46 @@
+from openpyxl import load_workbook
+
+import test as cli
+from invoice_export import InvoiceExporter
+
+
+def sheet_rows(path):
+    return [tuple(row) for row in load_workbook(path).active.iter_rows(values_only=True)]
+
+
+def test_cli_and_exporter_write_the_same_sheet(tmp_path, fake_ocr):
+    invoices = [{"invoiceNumber": "INV-1", "items": [{"description": "Bracket", "quantity": "2",
+                                                     "unitPrice": "5.00", "total": "10.00"}]},
+                {"invoiceNumber": "INV-2", "total": "99.00"}]
+    data = {"manufacturingTableData": invoices}
+
+    cli_path = cli.InvoiceExporter().create_manufacturing_excel(data, str(tmp_path), "cli")
+    exporter_path = InvoiceExporter(ocr_engine=fake_ocr.name).create_manufacturing_excel(
+        data, str(tmp_path), "exporter")
+
+    rows = sheet_rows(cli_path)
+    assert rows == sheet_rows(exporter_path)
+    assert rows[2][:3] == ("SI No.", "Part No", "Description of Goods")
+    assert rows[3][:3] == (1, "INV-1", "Bracket")
+    assert rows[4][:3] == (2, "INV-2", "Invoice Total")
+
+
+def test_items_are_written_as_they_arrive(tmp_path):
+    writer = cli.ManufacturingExcelWriter(str(tmp_path / "stream.xlsx"))
+    # Write-only sheets keep no rows in memory
+    assert writer._wb.write_only
+    seen = []
+
+    def items():
+        for i in range(2000):
+            # Every earlier item is already written when the next is produced
+            seen.append(writer.items == i)
+            yield {"partNo": f"P-{i}", "amount": f"{i}.00"}
+
+    writer.write_items(items())
+    path = writer.close()
+
+    assert all(seen) and len(seen) == 2000
+    rows = sheet_rows(path)
+    assert len(rows) == 3 + 2000
+    assert rows[-1][:2] == (2000, "P-1999")
@@ -0,0 +1,30 @@
+import numpy as np
+
+from normalization import invalid_item_indices, normalize_items, validate_arithmetic
+
+ITEMS = [
+    {"quantity": "25 Nos.", "rate": "Rs. 1,200.00", "discountPercentage": "", "amount": "30,000.00"},
+    {"quantity": "1O", "rate": "95,50", "discountPercentage": "10%", "amount": "859.50"},
+    {"quantity": "2", "rate": "100.00", "discountPercentage": "", "amount": "250.00"},
+    {"quantity": "3", "rate": "", "discountPercentage": "", "amount": "300.00"},
+]
+
+
+def test_items_normalize_into_numeric_columns():
+    frame = normalize_items(ITEMS, invoice_ids=["A", "A", "B", "B"])
+
+    assert frame["quantity_value"].tolist() == [25.0, 10.0, 2.0, 3.0]
+    assert frame["unit"].tolist()[0] == "Nos."
+    assert frame["rate_value"].tolist()[:3] == [1200.0, 95.5, 100.0]
+    assert np.isnan(frame["rate_value"].iloc[3])
+    assert frame["discount_value"].tolist()[1] == 10.0
+    assert frame["invoice"].tolist() == ["A", "A", "B", "B"]
+
+
+def test_arithmetic_flags_mismatched_and_incomplete_rows():
+    checked = validate_arithmetic(normalize_items(ITEMS))
+
+    assert checked["issue"].tolist() == ["ok", "ok", "mismatch", "missing"]
+    assert checked["amount_expected"].iloc[2] == 200.0
+    assert invalid_item_indices(ITEMS) == [2, 3]
+    assert invalid_item_indices([]) == []
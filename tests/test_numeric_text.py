@@ -0,0 +1,18 @@
+from decimal import Decimal
+
+import pandas as pd
+
+from normalization import clean_numeric_text
+from numeric_text import parse_decimal
+
+RAW = ["Rs. 2,268.13", "1,00,000.50", "95,50", "1O5", "₹ 7/-", "n/a"]
+
+
+def test_parse_decimal_cleans_ocr_text():
+    assert [parse_decimal(text) for text in RAW] == [
+        Decimal("2268.13"), Decimal("100000.50"), Decimal("95.50"), Decimal("105"), Decimal("7"), None]
+
+
+def test_series_cleaning_matches_scalar_parsing():
+    cleaned = clean_numeric_text(pd.Series(RAW + [None]))
+    assert cleaned.tolist() == ["2268.13", "100000.50", "95.50", "105", "7", pd.NA, pd.NA]
@@ -0,0 +1,68 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from ocr_engines import OCR_ENGINES, OCREnginePool, parse_tesseract_config
+
+
+class CountingEngine:
+    """Engine recording how often it was created and whether calls overlapped"""
+
+    name = "counting"
+    created = 0
+
+    def __init__(self, lang: str = "eng"):
+        CountingEngine.created += 1
+        self.busy = threading.Lock()
+        self.overlapped = False
+        self.closed = False
+
+    def image_to_string(self, image, config: str = "") -> str:
+        if not self.busy.acquire(blocking=False):
+            self.overlapped = True
+            return ""
+        try:
+            time.sleep(0.01)
+            return str(id(self))
+        finally:
+            self.busy.release()
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def counting_engine(monkeypatch):
+    monkeypatch.setitem(OCR_ENGINES, CountingEngine.name, CountingEngine)
+    monkeypatch.setattr(CountingEngine, "created", 0)
+    return CountingEngine
+
+
+def test_pool_creates_engines_once_and_never_shares_one(counting_engine):
+    pool = OCREnginePool(counting_engine.name, size=3)
+    image = np.zeros((10, 10), np.uint8)
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        used = set(executor.map(lambda _: pool.image_to_string(image), range(30)))
+
+    assert counting_engine.created == 3
+    assert used == {str(id(engine)) for engine in pool._all}
+    assert not any(engine.overlapped for engine in pool._all)
+
+    engines = list(pool._all)
+    pool.close()
+    assert all(engine.closed for engine in engines)
+
+
+def test_pool_size_must_be_positive(counting_engine):
+    with pytest.raises(ValueError):
+        OCREnginePool(counting_engine.name, size=0)
+
+
+def test_parse_tesseract_config():
+    assert parse_tesseract_config("--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789.,") == (
+        3, 6, {"tessedit_char_whitelist": "0123456789.,"})
+    assert parse_tesseract_config("") == (None, None, {})
@@ -0,0 +1,45 @@
+import tempfile
+
+import pdf2image
+from PIL import Image
+
+from invoice_export import iter_pdf_pages
+
+
+def test_pages_render_lazily_in_windows_without_temp_files(monkeypatch, tmp_path):
+    calls = []
+
+    def convert_from_path(pdf_path, dpi, poppler_path, first_page, last_page, **kwargs):
+        # Rendering to files would need output_folder/paths_only
+        assert "output_folder" not in kwargs and "paths_only" not in kwargs
+        calls.append((first_page, last_page))
+        return [Image.new("RGB", (20, 10), (255, 0, page)) for page in range(first_page, last_page + 1)]
+
+    monkeypatch.setattr(pdf2image, "convert_from_path", convert_from_path)
+    monkeypatch.setattr(pdf2image, "pdfinfo_from_path", lambda path, poppler_path=None: {"Pages": 5})
+    # Any temporary file or directory would land here
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+
+    pages = iter_pdf_pages("invoice.pdf", window=2)
+    number, image = next(pages)
+    assert calls == [(1, 2)]
+    assert number == 1
+    assert image.shape == (10, 20, 3)
+    # BGR: red ends up in the last channel, the page number in the first
+    assert image[0, 0].tolist() == [1, 0, 255]
+
+    assert [number for number, _ in pages] == [2, 3, 4, 5]
+    assert calls == [(1, 2), (3, 4), (5, 5)]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_page_range_skips_page_count(monkeypatch):
+    calls = []
+    monkeypatch.setattr(pdf2image, "convert_from_path",
+                        lambda path, dpi, poppler_path, first_page, last_page: calls.append(first_page)
+                        or [Image.new("RGB", (4, 4))])
+    monkeypatch.setattr(pdf2image, "pdfinfo_from_path", None)
+
+    assert [number for number, _ in iter_pdf_pages("invoice.pdf", first_page=3, last_page=4)] == [3, 4]
+    assert calls == [3, 4]
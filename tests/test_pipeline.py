@@ -0,0 +1,43 @@
+import cv2
+import numpy as np
+
+import pipeline
+from invoice_export import InvoiceExporter
+from pipeline import StagedPipeline
+
+LINE = "LC-0001 Laser cut bracket 10 125.00 1250.00"
+
+
+def blank_page():
+    page = np.full((800, 600, 3), 255, np.uint8)
+    cv2.putText(page, LINE, (20, 200), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
+    return page
+
+
+def test_pdf_pages_flow_through_stages_and_export(monkeypatch, fake_ocr, tmp_path):
+    fake_ocr.text = LINE
+    monkeypatch.setattr(pipeline, "pdf_page_count", lambda path: 3)
+    rendered = []
+
+    def render(path, first_page, last_page):
+        rendered.append(first_page)
+        yield first_page, blank_page()
+
+    monkeypatch.setattr(pipeline, "iter_pdf_pages", render)
+
+    image_path = tmp_path / "a.png"
+    cv2.imwrite(str(image_path), blank_page())
+    pdf_path = tmp_path / "b.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4")
+
+    exported = []
+    exporter = InvoiceExporter(ocr_engine=fake_ocr.name)
+    results = StagedPipeline(exporter, export=lambda result: exported.append(result.path)).run(
+        [str(image_path), str(pdf_path)])
+
+    assert [result.error for result in results] == [None, None]
+    assert sorted(rendered) == [1, 2, 3]
+    assert len(results[0].data["items"]) == 1
+    assert results[1].data["pages"] == 3
+    assert len(results[1].data["items"]) == 3
+    assert exported == [str(image_path), str(pdf_path)]
@@ -0,0 +1,51 @@
+import cv2
+import numpy as np
+
+import test as cli
+from deskew import straighten_page
+
+
+def ruled_page(rows=10, columns=8):
+    """A4-sized page at 300 dpi with a full-width ruled table"""
+    page = np.full((3000, 2400, 3), 255, np.uint8)
+    for y in range(600, 600 + rows * 100 + 1, 100):
+        cv2.line(page, (100, y), (100 + columns * 275, y), (0, 0, 0), 3)
+    for x in range(100, 100 + columns * 275 + 1, 275):
+        cv2.line(page, (x, 600), (x, 600 + rows * 100), (0, 0, 0), 3)
+    return page
+
+
+def binarize(page):
+    """Binary image as process_image builds it"""
+    gray = cv2.cvtColor(page, cv2.COLOR_BGR2GRAY)
+    return cv2.adaptiveThreshold(~gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, 15, -2)
+
+
+def rotate(page, degrees):
+    height, width = page.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), degrees, 1)
+    return cv2.warpAffine(page, matrix, (width, height), borderValue=(255, 255, 255))
+
+
+def test_level_grid_and_spans():
+    page = ruled_page()
+    # Erase the separator between the first two cells of the second row
+    page[705:795, 370:380] = 255
+
+    grid = cli.detect_grid_projection(binarize(page))
+
+    assert (len(grid["row_lines"]), len(grid["col_lines"])) == (11, 9)
+    assert len(grid["cells"]) == 79
+    merged = next(cell for cell in grid["cells"] if cell["row"] == 1 and cell["col"] == 0)
+    assert (merged["rowspan"], merged["colspan"]) == (1, 2)
+
+
+def test_one_degree_skew_loses_the_grid_until_straightened():
+    # Over a full-width table a 1° tilt moves each ruling across ~38 pixel
+    # rows, so no single row reaches line_ratio of the profile maximum
+    skewed = rotate(ruled_page(), 1)
+    assert cli.detect_grid_projection(binarize(skewed)) is None
+
+    # process_image straightens the page first (deskew=True) for this reason
+    grid = cli.detect_grid_projection(binarize(straighten_page(skewed)[0]))
+    assert grid is not None and len(grid["cells"]) == 80
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from invoice_export import InvoiceExporter
+
+LINE = "LC-0001 Laser cut bracket 10 125.00 1250.00"
+
+
+def test_tiers_set_passes_and_page_segmentation(monkeypatch, fake_ocr):
+    configs = []
+
+    def image_to_string(self, image, config=""):
+        configs.append(config)
+        # Only the spacing-preserving pass reads the second item
+        return f"{LINE}\n{LINE}" if "preserve_interword_spaces" in config else LINE
+
+    monkeypatch.setattr(fake_ocr, "image_to_string", image_to_string)
+    exporter = InvoiceExporter(ocr_engine=fake_ocr.name)
+    page = np.full((200, 300), 255, np.uint8)
+
+    fast = exporter.advanced_ocr_extraction(page)
+    assert configs == ["--oem 3 --psm 6"]
+    assert (fast["qualityTier"], len(fast["items"])) == ("fast", 1)
+
+    configs.clear()
+    thorough = exporter.advanced_ocr_extraction(page, quality_tier="thorough")
+    assert configs == ["--oem 3 --psm 4", "--oem 3 --psm 4 -c preserve_interword_spaces=1"]
+    # The pass parsing into the most items wins
+    assert (thorough["qualityTier"], len(thorough["items"])) == ("thorough", 2)
+    exporter.close()
+
+
+def test_tier_is_part_of_the_cache_key(fake_ocr):
+    fast = InvoiceExporter(ocr_engine=fake_ocr.name)
+    balanced = InvoiceExporter(ocr_engine=fake_ocr.name, quality_tier="balanced")
+    assert fast.extraction_params() != balanced.extraction_params()
+
+    with pytest.raises(ValueError):
+        InvoiceExporter(ocr_engine=fake_ocr.name, quality_tier="best")
+    with pytest.raises(ValueError):
+        fast.advanced_ocr_extraction(np.zeros((10, 10), np.uint8), quality_tier="best")
+    fast.close()
+    balanced.close()
@@ -0,0 +1,73 @@
+import cv2
+import numpy as np
+
+from invoice_export import FullResolutionCrops, InvoiceExporter
+
+
+def write_page(path, width=6400, height=4000):
+    page = np.full((height, width), 255, np.uint8)
+    # Dark strokes in the cell areas used below, so they are not triaged as blank
+    page[240:260, 240:900] = 0
+    page[1240:1380, 240:900] = 0
+    cv2.imwrite(str(path), page)
+
+
+def test_reduced_decode_recrops_small_cells(tmp_path, fake_ocr):
+    path = tmp_path / "large.png"
+    write_page(path)
+    exporter = InvoiceExporter(ocr_engine=fake_ocr.name, decode_mode="reduced")
+
+    page = exporter.load_page(str(path))
+    assert page["image"].shape == (2000, 3200)
+    assert page["full_res"] is not None
+
+    # (x, y, w, h) in the half-resolution page, including CELL_PADDING
+    small = (100, 100, 400, 20 + 2 * exporter.CELL_PADDING)
+    large = (100, 600, 400, 100 + 2 * exporter.CELL_PADDING)
+    exporter.ocr_table_cells(page["image"], [[small], [large]], full_res=page["full_res"])
+
+    small_crop, large_crop = fake_ocr.images
+    assert small_crop.shape == (2 * small[3], 2 * small[2])
+    assert large_crop.shape == (large[3], large[2])
+
+
+def test_full_size_decode_has_nothing_to_recrop(tmp_path, fake_ocr):
+    path = tmp_path / "small.png"
+    write_page(path, width=2000, height=1500)
+    exporter = InvoiceExporter(ocr_engine=fake_ocr.name, decode_mode="reduced")
+
+    assert exporter.load_page(str(path))["full_res"] is None
+
+
+def test_blank_cells_skip_recrop_and_ocr(tmp_path, fake_ocr):
+    path = tmp_path / "large.png"
+    write_page(path)
+    exporter = InvoiceExporter(ocr_engine=fake_ocr.name, decode_mode="reduced")
+    page = exporter.load_page(str(path))
+
+    # A small cell over white paper only: triaged on the reduced crop
+    blank = (1000, 100, 400, 20 + 2 * exporter.CELL_PADDING)
+    text = exporter.ocr_table_cells(page["image"], [[blank]], full_res=page["full_res"])
+
+    assert text == [[""]]
+    assert fake_ocr.images == []
+    assert page["full_res"]._image is None
+
+
+def test_header_recropped_only_when_its_text_is_small(tmp_path, fake_ocr):
+    exporter = InvoiceExporter(ocr_engine=fake_ocr.name, decode_mode="reduced")
+    for scale, thickness, recropped in ((0.5, 1, True), (2.0, 4, False)):
+        full = np.full((2000, 3200), 255, np.uint8)
+        for y in (200, 400, 600):
+            cv2.putText(full, "Invoice No: INV-000123", (100, y), cv2.FONT_HERSHEY_SIMPLEX,
+                        2 * scale, 0, 2 * thickness)
+        path = tmp_path / f"header_{scale}.png"
+        cv2.imwrite(str(path), full)
+        full_res = FullResolutionCrops(path.read_bytes(), str(path))
+        gray = cv2.resize(full, (1600, 1000), interpolation=cv2.INTER_AREA)
+
+        exporter.read_header_fields(gray, (0, 0, 1600, 400), full_res=full_res)
+
+        assert full_res.decoded == recropped
+        assert fake_ocr.images[-1].shape == ((800, 3200) if recropped else (400, 1600))
+    exporter.close()
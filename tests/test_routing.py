@@ -0,0 +1,86 @@
+import cv2
+import numpy as np
+import pytest
+
+import invoice_export
+import routing
+from invoice_export import InvoiceExporter
+from routing import score_table
+
+
+def test_race_needs_more_than_one_engine(fake_ocr, capsys):
+    exporter = InvoiceExporter(ocr_engine=fake_ocr.name, routing="race")
+    assert exporter.routing == "confidence"
+    assert exporter._race_executor is None
+    assert "race routing needs" in capsys.readouterr().out
+    exporter.close()
+
+
+def test_race_executor_is_shared_and_closed(fake_ocr):
+    exporter = InvoiceExporter(ocr_engine=fake_ocr.name, ocr_pool_size=2, routing="race")
+    executor = exporter._race_executor
+    assert exporter.routing == "race"
+    assert executor._max_workers == 2
+    exporter.close()
+    assert exporter._race_executor is None
+    assert executor._shutdown
+
+
+def ruled_table(rows=6, columns=4, cell=(150, 40), origin=(50, 50)):
+    """Page with a ruled grid and the cell rectangles of its rows"""
+    page = np.full((600, 800), 255, np.uint8)
+    (w, h), (x0, y0) = cell, origin
+    for r in range(rows + 1):
+        cv2.line(page, (x0, y0 + r * h), (x0 + columns * w, y0 + r * h), 0, 2)
+    for c in range(columns + 1):
+        cv2.line(page, (x0 + c * w, y0), (x0 + c * w, y0 + rows * h), 0, 2)
+    cells = [[(x0 + c * w, y0 + r * h, w, h) for c in range(columns)] for r in range(rows)]
+    return page, cells, (x0, y0, columns * w, rows * h)
+
+
+def test_table_heavy_page_scores_high_and_routes_to_table(fake_ocr):
+    page, rows, box = ruled_table()
+    result = score_table(page, rows, box)
+    assert result["cellCount"] == 24
+    assert result["gridRegularity"] == 1.0
+    assert result["score"] >= InvoiceExporter.TABLE_ROUTE_SCORE
+
+    exporter = InvoiceExporter(ocr_engine=fake_ocr.name)
+    assert exporter.choose_route(page, rows, box) == "table"
+    exporter.close()
+
+
+def test_text_only_page_scores_low_and_routes_to_fallback(fake_ocr):
+    page = np.full((600, 800), 255, np.uint8)
+    for y in range(60, 560, 40):
+        cv2.putText(page, "Laser cut bracket 10 pcs", (40, y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, 0, 2)
+    # Paragraph lines come out as one wide box each, never two cells a row
+    rows = [[(40, y - 20, 400, 28)] for y in range(60, 560, 40)]
+
+    result = score_table(page, rows)
+    assert result["cellCount"] == 0.0
+    assert result["gridRegularity"] == 0.0
+    assert result["lineDensity"] < routing.FULL_LINE_DENSITY
+    assert result["score"] < InvoiceExporter.FALLBACK_ROUTE_SCORE
+    assert score_table(page, rows[:1])["score"] == 0.0
+
+    exporter = InvoiceExporter(ocr_engine=fake_ocr.name)
+    assert exporter.choose_route(page, rows) == "fallback"
+    exporter.close()
+
+
+@pytest.mark.parametrize("routing_mode, score, route", [
+    ("confidence", 0.299, "fallback"),
+    ("confidence", 0.3, "table"),
+    ("race", 0.299, "fallback"),
+    ("race", 0.3, "race"),
+    ("race", 0.599, "race"),
+    ("race", 0.6, "table"),
+    ("sequential", 0.0, "table"),
+])
+def test_route_thresholds_are_inclusive_lower_bounds(monkeypatch, fake_ocr, routing_mode, score, route):
+    monkeypatch.setattr(invoice_export, "score_table", lambda gray, rows, box=None: {"score": score})
+    exporter = InvoiceExporter(ocr_engine=fake_ocr.name, ocr_pool_size=2, routing=routing_mode)
+    page, rows, box = ruled_table()
+    assert exporter.choose_route(page, rows, box) == route
+    exporter.close()
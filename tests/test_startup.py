@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+import benchmark
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("name", sorted(benchmark.STARTUP_COMMANDS))
+def test_fast_start_paths_import_no_heavy_modules(name, tmp_path):
+    args, _ = benchmark.STARTUP_COMMANDS[name]
+    command = [os.path.join(PACKAGE_DIR, "test.py")] + args + ["-o", str(tmp_path)]
+
+    modules = benchmark.imported_modules(command, PACKAGE_DIR)
+
+    # An empty list would mean the command failed before importing anything
+    assert "argparse" in modules
+    assert [module for module in modules if module in benchmark.HEAVY_MODULES] == []
+
+
+def test_heavy_modules_are_checked_against_a_full_import():
+    # Guards the check itself: the extraction module does load them
+    modules = benchmark.imported_modules(["-c", "import invoice_export"], PACKAGE_DIR)
+    assert {"cv2", "pandas"} <= set(modules)
@@ -0,0 +1,25 @@
+import numpy as np
+
+from invoice_export import InvoiceExporter
+
+
+def test_rows_split_at_centre_gaps_not_first_cell():
+    # A tall description cell opens the second row; its neighbours sit lower
+    # than one anchor tolerance from its top but belong to the same row
+    cells = np.array([
+        [10, 10, 50, 20], [70, 12, 50, 20],
+        [10, 50, 50, 60], [70, 72, 50, 20], [130, 74, 50, 20],
+        [10, 130, 50, 20], [70, 131, 50, 20],
+    ])
+    rows = InvoiceExporter.group_cells_into_rows(cells, y_gap=15)
+    assert [len(row) for row in rows] == [2, 3, 2]
+    assert [cell[0] for cell in rows[1]] == [10, 70, 130]
+
+
+def test_columns_survive_missing_cells():
+    rows = [
+        [(10, 0, 40, 20), (100, 0, 40, 20), (200, 0, 40, 20)],
+        [(12, 30, 40, 20), (201, 30, 40, 20)],
+        [(101, 60, 40, 20)],
+    ]
+    assert InvoiceExporter.assign_columns(rows) == [[0, 1, 2], [0, 2], [1]]
@@ -0,0 +1,41 @@
+import numpy as np
+
+from invoice_export import InvoiceExporter
+
+
+def word_data(words):
+    """image_to_data output for (text, left, top, width, height, line) words"""
+    data = {key: [] for key in ("level", "block_num", "par_num", "line_num", "word_num",
+                                "left", "top", "width", "height", "conf", "text")}
+    for k, (text, left, top, width, height, line) in enumerate(words):
+        for key, value in (("level", 5), ("block_num", 1), ("par_num", 1), ("line_num", line),
+                           ("word_num", k), ("left", left), ("top", top), ("width", width),
+                           ("height", height), ("conf", 90), ("text", text)):
+            data[key].append(value)
+    return data
+
+
+def test_table_mode_reads_region_once_and_assigns_words_to_cells(monkeypatch, fake_ocr):
+    # Padded cells overlap by 10 px; region coordinates start at (10, 10)
+    rows = [[(10, 10, 110, 40), (110, 10, 110, 40)],
+            [(10, 50, 110, 60), (110, 50, 110, 60)]]
+    words = [
+        ("Part", 10, 10, 40, 20, 1), ("Amount", 120, 10, 60, 20, 1),
+        # Centre at x=112 lies in both columns' padding; the nearer cell centre wins
+        ("LC-1", 92, 45, 20, 20, 2),
+        ("Laser", 10, 45, 50, 15, 2), ("cut", 10, 75, 30, 15, 3),
+        ("1250.00", 130, 45, 60, 20, 2),
+        ("noise", 10, 10, 10, 10, 1),
+    ]
+    data = word_data(words)
+    data["conf"][-1] = -1
+    calls = []
+    monkeypatch.setattr(fake_ocr, "image_to_data",
+                        lambda self, image, config="": calls.append(image.shape) or data)
+
+    exporter = InvoiceExporter(ocr_engine=fake_ocr.name, table_ocr_mode="table")
+    table_text = exporter.ocr_table_region(np.full((200, 300), 255, np.uint8), rows)
+
+    assert calls == [(100, 210)]
+    assert table_text == [["Part", "Amount"], ["LC-1 Laser\ncut", "1250.00"]]
+    exporter.close()
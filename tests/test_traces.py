@@ -0,0 +1,29 @@
+import json
+
+import cv2
+import numpy as np
+
+from invoice_export import InvoiceExporter
+from pipeline import StagedPipeline
+
+
+def test_traces_of_equally_named_and_failed_pages_are_kept(fake_ocr, tmp_path):
+    page = np.full((600, 400, 3), 255, np.uint8)
+    paths = []
+    for folder in ("one", "two"):
+        (tmp_path / folder).mkdir()
+        paths.append(tmp_path / folder / "a.png")
+        cv2.imwrite(str(paths[-1]), page)
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"not an image")
+
+    trace_dir = tmp_path / "traces"
+    exporter = InvoiceExporter(ocr_engine=fake_ocr.name, trace_dir=str(trace_dir))
+    results = StagedPipeline(exporter).run([str(path) for path in paths] + [str(broken)])
+
+    assert results[2].error is not None
+    traces = sorted(trace_dir.glob("*.trace.json"))
+    assert len(traces) == 3
+    broken_trace = [json.loads(path.read_text()) for path in traces if path.name.startswith("broken")]
+    assert broken_trace[0]["counters"]["errors"] == 1
+    assert exporter.trace_summary.to_dict()["documents"] == 3
@@ -0,0 +1,64 @@
+import json
+import os
+import sys
+
+import test as cli
+
+
+def test_watch_appends_a_file_arriving_after_start(tmp_path, monkeypatch):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    ledger = tmp_path / "ledger.xlsx"
+    manifest = tmp_path / "manifest.json"
+    invoice = {"invoiceNumber": "INV-7", "items": [{"partNo": "LC-1", "amount": "10.00"}]}
+
+    # Force polling; the first poll finds the new file, the second stops the loop
+    monkeypatch.setitem(sys.modules, "inotify_simple", None)
+    polls = []
+
+    def sleep(seconds):
+        polls.append(seconds)
+        if len(polls) == 1:
+            (inbox / "invoice.json").write_text(json.dumps(invoice))
+        else:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(cli.time, "sleep", sleep)
+    cli.watch_folder(str(inbox), cli.InvoiceExporter(), str(ledger), str(manifest), settle_seconds=0)
+
+    assert ledger.exists()
+    entries = json.loads(manifest.read_text())
+    assert [entry["status"] for entry in entries.values()] == ["processed"]
+
+
+def test_manifest_skips_unchanged_and_touched_files(tmp_path, monkeypatch):
+    invoice = tmp_path / "invoice.json"
+    invoice.write_text("{}")
+    manifest_path = str(tmp_path / "manifest.json")
+
+    manifest = cli.ProcessedManifest(manifest_path)
+    record = manifest.needs_processing(str(invoice))
+    assert record is not None
+    manifest.record(str(invoice), record, "processed")
+    manifest.save()
+
+    hashed = []
+    monkeypatch.setattr(cli, "file_sha256", lambda path: hashed.append(path) or record["sha256"])
+    manifest = cli.ProcessedManifest(manifest_path)
+
+    # Unchanged stat: skipped without reading the file
+    assert manifest.needs_processing(str(invoice)) is None
+    assert hashed == []
+
+    # Touched, same content: skipped, and the new mtime is remembered
+    stat = invoice.stat()
+    os.utime(invoice, (stat.st_atime, stat.st_mtime + 10))
+    assert manifest.needs_processing(str(invoice)) is None
+    assert len(hashed) == 1 and manifest.changed
+    assert manifest.needs_processing(str(invoice)) is None
+    assert len(hashed) == 1
+
+    # New content: processed again
+    monkeypatch.setattr(cli, "file_sha256", lambda path: "changed")
+    invoice.write_text('{"items": []}')
+    assert manifest.needs_processing(str(invoice))["sha256"] == "changed"